@@ -1,5 +1,7 @@
 from app.database import engine, SessionLocal, Base
 from app.models import User, Account, Transaction, Product, ShoppingList
+from app.services.product_fts import drop_product_fts, ensure_product_fts
+from app.services.spending_rollups import rebuild_spending_rollups
 from datetime import datetime, timedelta
 
 # Initialize database schema
@@ -7,6 +9,7 @@ Base.metadata.create_all(bind=engine)
 
 def init_db():
     # Drop all tables to reset
+    drop_product_fts(engine)
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
 
@@ -101,7 +104,13 @@ def init_db():
     
     db.commit()
     print("Database data updated to Tunisian Context (TND currency & Local Products).")
+
+    # Day/month spending sums of the seeded transactions (maintained incrementally afterwards)
+    rebuild_spending_rollups(db)
     db.close()
 
+    # Full-text index over the seeded products (kept in sync by triggers afterwards)
+    ensure_product_fts(engine)
+
 if __name__ == "__main__":
     init_db()
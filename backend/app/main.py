@@ -6,9 +6,16 @@ Application de traduction en Langue des Signes
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
 import os
 
 from app.routers import signs, convert, health, assistant, banking, store, auth, transcribe, agent_listener, lsf
+from app.schema import ensure_schema
+from app.services.vector_search_service import get_vector_search_service
+
+# Load SigLIP + Qdrant client at startup instead of on the first search
+VECTOR_WARMUP_ON_STARTUP = os.getenv("VECTOR_WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -51,6 +58,26 @@ app.include_router(transcribe.router)
 app.include_router(lsf.router)
 app.include_router(agent_listener.router)
 
+logger = logging.getLogger(__name__)
+
+_background_tasks = set()
+
+def _background_task_done(task: asyncio.Task):
+    """Drop the reference and report a failure now, not as "Task exception was never retrieved" at shutdown."""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+@app.on_event("startup")
+async def warmup_vector_search():
+    """Start the vector search warmup in the background; /api/health reports readiness."""
+    if VECTOR_WARMUP_ON_STARTUP:
+        task = asyncio.create_task(get_vector_search_service().warmup_async(), name="vector-search-warmup")
+        _background_tasks.add(task)
+        task.add_done_callback(_background_task_done)
+
+app.on_event("startup")(ensure_schema)
+
 @app.get("/")
 async def root():
     return {
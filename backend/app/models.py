@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -25,6 +25,11 @@ class Account(Base):
     owner = relationship("User", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account")
 
+    # Serves get_account and every "checking account of this user" lookup
+    __table_args__ = (
+        Index("ix_accounts_user_type", user_id, account_type),
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -37,6 +42,24 @@ class Transaction(Base):
 
     account = relationship("Account", back_populates="transactions")
 
+    # Serves the history of one account newest first, and keyset pages on (date, id)
+    __table_args__ = (
+        Index("ix_transactions_account_date_id", account_id, date.desc(), id.desc()),
+    )
+
+class SpendingRollup(Base):
+    """Transaction sums per account, day/month and category, kept up to date by BankingService."""
+    __tablename__ = "spending_rollups"
+
+    # Primary key order serves "one account, one period kind, a date range"
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    period = Column(String, primary_key=True)  # day, month
+    period_start = Column(Date, primary_key=True)  # The day, or the first day of the month
+    category = Column(String, primary_key=True)
+    spent = Column(Float, nullable=False, default=0.0)  # Sum of debits, as a positive amount
+    received = Column(Float, nullable=False, default=0.0)  # Sum of credits
+    count = Column(Integer, nullable=False, default=0)
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -58,3 +81,33 @@ class ShoppingList(Base):
 
     user = relationship("User", back_populates="cart_items")
     product = relationship("Product")
+
+    # Serves the cart of a user, and the (user, product) line lookup on add/remove
+    __table_args__ = (
+        Index("ix_shopping_list_user_product", user_id, product_id),
+    )
+
+class OrderLine(Base):
+    """One product of a paid checkout (its cart line is deleted by the checkout)."""
+    __tablename__ = "order_lines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    product_id = Column(Integer, ForeignKey("products.id"))
+    quantity = Column(Integer)
+    unit_price = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Units sold per product (autocomplete popularity) from the index alone
+    __table_args__ = (
+        Index("ix_order_lines_product_quantity", product_id, quantity),
+    )
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    scope = Column(String)  # checkout, transfer
+    response = Column(String)  # Message returned to the first request, replayed on retries
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.agent_service import AgentService
 from pydantic import BaseModel
+from typing import Optional
 import logging
 
 router = APIRouter(
@@ -21,13 +23,21 @@ class ChatRequest(BaseModel):
     user_id: int = 1
 
 @router.post("/chat")
-async def chat_with_assistant(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_with_assistant(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, description="Same key when the client retries a message: transfers and checkout run once"),
+    db: Session = Depends(get_db)
+):
     try:
         logging.info(f"Chat request from user_id: {request.user_id}")
         agent = AgentService(db)
         # Convert history format if needed, but AgentService can handle list of dicts or objects
         # We will pass the history to process_query
-        response = agent.process_query(request.message, user_id=request.user_id, history=request.history)
+        # The agent (LLM calls, sync tools and DB session) runs in a worker thread, not on the event loop
+        response = await run_in_threadpool(
+            agent.process_query, request.message, user_id=request.user_id, history=request.history,
+            idempotency_key=idempotency_key
+        )
         return {"response": response}
     except Exception as e:
         logging.error(f"Error in chat_with_assistant: {e}")
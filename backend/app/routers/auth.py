@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import User
 from pydantic import BaseModel
 
@@ -22,8 +23,8 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 @router.post("/login", response_model=UserResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.email == request.email))).scalars().first()
     if not user:
         # For demo purposes, auto-create if not exists or return error. 
         # Let's return error to enforce using seeded user 'omar'
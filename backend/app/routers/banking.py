@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.banking_service import BankingService
-from typing import List
+from app.database import get_async_db, get_db
+from app.services.banking_service import AsyncBankingService, BankingService
+from app.services.idempotency import IdempotencyConflict
+from app.services.statement_export import STATEMENT_FORMATS, iter_statement
+from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 
 router = APIRouter(
     prefix="/api/banking",
@@ -21,12 +25,96 @@ class TransactionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TransactionPageResponse(BaseModel):
+    """One page of history, newest first; pass next_cursor back to get the next one."""
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
+class SpendingResponse(BaseModel):
+    period_start: Optional[date] = None
+    category: str
+    spent: float
+    received: float
+    count: int
+
 @router.get("/balance")
-def get_balance(user_id: int = 1, db: Session = Depends(get_db)):
-    service = BankingService(db)
-    return {"balance": service.get_balance(user_id)}
+async def get_balance(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncBankingService(db)
+    return {"balance": await service.get_balance(user_id)}
 
 @router.get("/transactions", response_model=List[TransactionResponse])
-def get_transactions(user_id: int = 1, limit: int = 5, db: Session = Depends(get_db)):
-    service = BankingService(db)
-    return service.get_transactions(user_id, limit)
+async def get_transactions(user_id: int = 1, limit: int = 5, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncBankingService(db)
+    return await service.get_transactions(user_id, limit)
+
+@router.get("/transactions/page", response_model=TransactionPageResponse)
+async def get_transactions_page(
+    user_id: int = 1,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cursor-paginated transaction history (keyset on date, id)."""
+    service = AsyncBankingService(db)
+    try:
+        items, next_cursor = await service.get_transactions_page(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/spending", response_model=List[SpendingResponse])
+async def get_spending(
+    user_id: int = 1,
+    period: str = Query("month", pattern="^(day|month)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None,
+    by_period: bool = True,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Spending/income per period and category from the precomputed rollups (by_period=false: totals per category)."""
+    service = AsyncBankingService(db)
+    return await service.get_spending(user_id, period, start, end, category, by_period)
+
+@router.get("/statement")
+def export_statement(
+    user_id: int = 1,
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Download the checking account history (CSV or JSON lines, oldest first), streamed in constant memory."""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    if BankingService(db).get_account(user_id) is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    filename = f"releve_{user_id}_{start or 'debut'}_{end or date.today()}.{format}"
+    return StreamingResponse(
+        iter_statement(user_id, format, start, end),
+        media_type=STATEMENT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+class TransferRequest(BaseModel):
+    user_id: int = 1
+    recipient_email: str
+    amount: float
+
+@router.post("/transfer")
+async def transfer(
+    request: TransferRequest,
+    idempotency_key: Optional[str] = Header(None, description="Client-generated key, safe to retry with the same one"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Send money to another user (both balances updated in one transaction)."""
+    service = AsyncBankingService(db)
+    try:
+        success, message = await service.transfer_with_status(
+            request.user_id, request.recipient_email, request.amount, idempotency_key
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=409, detail=message)
+    return {"message": message}
@@ -3,14 +3,18 @@ Health check endpoint
 """
 
 from fastapi import APIRouter
+from app.database import database_status
+from app.services.vector_search_service import get_vector_search_service
 
 router = APIRouter()
 
 @router.get("/health")
-async def health_check():
+def health_check():
     """Vérifier que l'API fonctionne"""
     return {
         "status": "healthy",
         "service": "SignLink API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "database": database_status(),
+        "vector_search": get_vector_search_service().status()
     }
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Header, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.store_service import StoreService
+from app.database import get_async_db, get_db
+from app.services.autocomplete_service import get_product_autocomplete
+from app.services.camera_stream_service import FrameStreamMatcher
+from app.services.idempotency import IdempotencyConflict
+from app.services.store_service import AsyncStoreService, StoreService
+from app.services.thumbnail_service import THUMBNAIL_WIDTHS, get_thumbnail_service
 from app.services.vector_search_service import get_vector_search_service
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+# Product image URLs are not content-addressed (the file can be replaced under the same name):
+# browsers reuse them briefly, then revalidate with If-None-Match against the ETag
+PRODUCT_IMAGE_MAX_AGE_SECONDS = int(os.getenv("PRODUCT_IMAGE_MAX_AGE_SECONDS", "300"))
+
 router = APIRouter(
     prefix="/api/store",
     tags=["store"],
@@ -38,6 +52,21 @@ class VectorProductResponse(BaseModel):
     category_folder: Optional[str] = None
     score: Optional[float] = None
 
+class VectorProductPageResponse(BaseModel):
+    """One page of the vector catalog; pass next_cursor back to get the next one."""
+    items: List[VectorProductResponse]
+    next_cursor: Optional[str] = None
+
+class AutocompleteSuggestionResponse(BaseModel):
+    """Type-ahead suggestion from SQLite products and/or the vector catalog."""
+    name: str
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    price: Optional[float] = None
+    product_id: Optional[str] = None
+    image_file: Optional[str] = None
+    category_folder: Optional[str] = None
+
 class CartItemResponse(BaseModel):
     product_name: str
     price: float
@@ -64,54 +93,178 @@ def get_collection_info():
 @router.get("/vector/products", response_model=List[VectorProductResponse])
 def get_vector_products(
     limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    category_folder: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^(price_asc|price_desc)$")
 ):
     """Get all products from vector database (paginated)."""
     service = get_vector_search_service()
-    return service.get_all_products(limit=limit, offset=offset)
+    return service.get_all_products(limit=limit, offset=offset, category_folder=category_folder, sort=sort)
+
+@router.get("/vector/products/page", response_model=VectorProductPageResponse)
+def get_vector_products_page(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    category_folder: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^(price_asc|price_desc)$")
+):
+    """Cursor-paginated products from vector database (served from the payload catalog when enabled)."""
+    service = get_vector_search_service()
+    try:
+        items, next_cursor = service.scroll_products(limit=limit, cursor=cursor, category_folder=category_folder, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/vector/search", response_model=List[VectorProductResponse])
 def search_products_vector(
     q: str = Query(..., min_length=1, description="Search query"),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    category_folder: Optional[str] = None,
+    brand: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price in TND"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price in TND")
 ):
-    """Search products using semantic/AI similarity."""
+    """Search products using semantic/AI similarity, optionally filtered (e.g. a category under 5 TND)."""
     service = get_vector_search_service()
-    return service.search_by_text(q, limit=limit)
+    return service.search_by_text(
+        q, limit=limit, category_folder=category_folder, brand=brand, min_price=min_price, max_price=max_price
+    )
 
 @router.post("/vector/search/image", response_model=List[VectorProductResponse])
 async def search_products_by_image(
     file: UploadFile = File(...),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    category_folder: Optional[str] = None,
+    brand: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price in TND"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price in TND")
 ):
     """Search products by uploading an image."""
     contents = await file.read()
     service = get_vector_search_service()
-    return service.search_by_image(contents, limit=limit)
+    # Embedding is CPU-bound: keep it off the event loop
+    return await run_in_threadpool(
+        service.search_by_image,
+        contents, limit=limit, category_folder=category_folder, brand=brand, min_price=min_price, max_price=max_price
+    )
+
+@router.websocket("/vector/stream")
+async def stream_product_recognition(
+    websocket: WebSocket,
+    limit: int = Query(5, ge=1, le=20),
+    max_batch: int = Query(4, ge=1, le=16),
+    category_folder: Optional[str] = None,
+    brand: Optional[str] = None,
+    min_score: float = Query(0.0, description="Minimum score for the top match to be reported")
+):
+    """
+    Live camera recognition: the client sends JPEG frames as binary messages and
+    receives {"type": "match", "products": [...]} only when the top product changes.
+    """
+    await websocket.accept()
+    service = get_vector_search_service()
+    matcher = FrameStreamMatcher(min_score=min_score)
+    frames: asyncio.Queue = asyncio.Queue(maxsize=max_batch)
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                frame_bytes = message.get("bytes")
+                if frame_bytes is None:
+                    # Text frame (e.g. a client ping): not a camera frame, keep the stream open
+                    logger.warning("Camera stream: ignored a non-binary message")
+                    continue
+                if frames.full():
+                    frames.get_nowait()  # Stay real-time: the oldest pending frame is dropped
+                frames.put_nowait(frame_bytes)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            if frames.full():
+                frames.get_nowait()
+            frames.put_nowait(None)
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            # Block for one frame, then take whatever else arrived meanwhile as one batch
+            batch = [await frames.get()]
+            while not frames.empty():
+                batch.append(frames.get_nowait())
+            closed = None in batch
+            batch = [frame_bytes for frame_bytes in batch if frame_bytes is not None]
+
+            images = await run_in_threadpool(matcher.select, batch) if batch else []
+            if images:
+                results = await run_in_threadpool(
+                    service.search_by_images, images, limit, category_folder=category_folder, brand=brand
+                )
+                for products in results:
+                    if matcher.changed(products):
+                        await websocket.send_json({"type": "match", "products": products, "stats": matcher.stats()})
+            if closed:
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        logger.info("Camera stream closed: %s", matcher.stats())
 
 @router.get("/vector/image/{category_folder}/{image_file}")
-def get_product_image(category_folder: str, image_file: str):
-    """Serve product images from data folder."""
-    # Get the backend directory (where app folder resides)
-    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    
-    # Try multiple paths - prioritize local data folder
-    base_paths = [
-        os.path.join(backend_dir, "data", category_folder, "images", image_file),
-        os.path.join("d:/EspritMaratech2026-Barons-omar/data", category_folder, "images", image_file),
-        os.path.join("d:/BaronsMarket", category_folder, "images", image_file),  # Fallback
-    ]
-    
-    for path in base_paths:
-        if os.path.exists(path):
-            return FileResponse(path)
-    
-    raise HTTPException(status_code=404, detail=f"Image not found: {category_folder}/{image_file}")
+def get_product_image(
+    category_folder: str,
+    image_file: str,
+    w: Optional[int] = Query(None, description=f"Thumbnail width, one of {THUMBNAIL_WIDTHS}"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Serve product images from data folder (WebP thumbnail when `w` is given)."""
+    service = get_thumbnail_service()
+    path = service.resolve(category_folder, image_file)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Image not found: {category_folder}/{image_file}")
+    if w is not None and w not in THUMBNAIL_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"Unsupported width {w}, expected one of {THUMBNAIL_WIDTHS}")
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        service.forget(category_folder, image_file)
+        raise HTTPException(status_code=404, detail=f"Image not found: {category_folder}/{image_file}")
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    media_type = None
+    if w is not None:
+        try:
+            path, etag = service.get_thumbnail(path, w)
+            media_type = "image/webp"
+        except OSError as e:
+            # Undecodable image: serve the original rather than failing the tile
+            logger.warning("Thumbnail error for %s: %s", path, e)
+
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PRODUCT_IMAGE_MAX_AGE_SECONDS}"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 # ===========================
 # SQLite Product Endpoints (Original)
 # ===========================
 
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestionResponse])
+def autocomplete_products(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_db)
+):
+    """Type-ahead: names with a word (or brand) starting with q, accents ignored, most popular first."""
+    autocomplete = get_product_autocomplete()
+    autocomplete.refresh(db)
+    return autocomplete.suggest(q, limit)
+
 @router.get("/products", response_model=List[ProductResponse])
 def get_products(query: str = "", db: Session = Depends(get_db)):
     """Get products from SQLite database (legacy)."""
@@ -125,9 +278,9 @@ def get_products(query: str = "", db: Session = Depends(get_db)):
 # ===========================
 
 @router.get("/cart", response_model=List[CartItemResponse])
-def get_cart(user_id: int = 1, db: Session = Depends(get_db)):
-    service = StoreService(db)
-    return service.get_cart(user_id)
+async def get_cart(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncStoreService(db)
+    return await service.get_cart(user_id)
 
 class AddToCartRequest(BaseModel):
     user_id: int
@@ -142,20 +295,56 @@ def add_to_cart(request: AddToCartRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     return {"message": "Added to cart"}
 
+class CartLineRequest(BaseModel):
+    product_name: str
+    quantity: int = 1
+
+class AddManyToCartRequest(BaseModel):
+    user_id: int
+    items: List[CartLineRequest]
+
+@router.post("/add/batch")
+def add_many_to_cart(request: AddManyToCartRequest, db: Session = Depends(get_db)):
+    """Add several products at once (e.g. all the ingredients of a recipe), in one transaction."""
+    service = StoreService(db)
+    result = service.add_many_to_cart(request.user_id, [(item.product_name, item.quantity) for item in request.items])
+    if not result["added"]:
+        raise HTTPException(status_code=404, detail="Products not found")
+    return result
+
 class RemoveFromCartRequest(BaseModel):
     user_id: int
     product_name: str
 
 @router.post("/remove")
-def remove_from_cart(request: RemoveFromCartRequest, db: Session = Depends(get_db)):
-    service = StoreService(db)
-    success = service.remove_from_cart(request.user_id, request.product_name)
+async def remove_from_cart(request: RemoveFromCartRequest, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncStoreService(db)
+    success = await service.remove_from_cart(request.user_id, request.product_name)
     if not success:
         raise HTTPException(status_code=404, detail="Item not found in cart")
     return {"message": "Removed from cart"}
 
 @router.post("/clear")
-def clear_cart(user_id: int = 1, db: Session = Depends(get_db)):
-    service = StoreService(db)
-    service.clear_cart(user_id)
+async def clear_cart(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncStoreService(db)
+    await service.clear_cart(user_id)
     return {"message": "Cart cleared"}
+
+class CheckoutRequest(BaseModel):
+    user_id: int = 1
+
+@router.post("/checkout")
+async def checkout(
+    request: CheckoutRequest,
+    idempotency_key: Optional[str] = Header(None, description="Client-generated key, safe to retry with the same one"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Pay for the cart (stock, balance and cart updated in one transaction)."""
+    service = AsyncStoreService(db)
+    try:
+        success, message = await service.checkout_with_status(request.user_id, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=409, detail=message)
+    return {"message": message}
@@ -0,0 +1,23 @@
+"""
+Schema upgrades applied at startup (and by tests against a scratch database)
+"""
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import models  # noqa: F401 - registers the tables on Base.metadata
+from app.database import Base, engine as default_engine
+from app.services.product_fts import ensure_product_fts
+from app.services.spending_rollups import ensure_spending_rollups
+
+
+def ensure_schema(engine: Engine = default_engine):
+    """Create tables and indexes added since the database was initialized, the products FTS5 index and the spending rollups."""
+    Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, including their new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    ensure_product_fts(engine)
+    with Session(bind=engine) as db:
+        ensure_spending_rollups(db)
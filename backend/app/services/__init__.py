@@ -1,6 +1,21 @@
 """Services package"""
-from .llm_service import llm_service, LLMService
-from .vector_search_service import get_vector_search_service, VectorSearchService
-from .lsf_service import get_lsf_service, LSFService
+import importlib
 
-__all__ = ["llm_service", "LLMService", "get_vector_search_service", "VectorSearchService", "get_lsf_service", "LSFService"]
+# Re-exports, imported on first access: importing one service module (e.g. from a script)
+# must not build the LLM and LSF clients, which need OPENAI_API_KEY
+_EXPORTS = {
+    "llm_service": ".llm_service",
+    "LLMService": ".llm_service",
+    "get_vector_search_service": ".vector_search_service",
+    "VectorSearchService": ".vector_search_service",
+    "get_lsf_service": ".lsf_service",
+    "LSFService": ".lsf_service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
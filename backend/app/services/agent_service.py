@@ -5,9 +5,13 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from app.services.banking_service import BankingService
 from app.services.store_service import StoreService
-from typing import List
+from datetime import date
+from typing import List, Optional
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Ensure OPENAI_API_KEY is set (should be in .env)
 # os.environ["OPENAI_API_KEY"] = "sk-..."
 
@@ -19,7 +23,7 @@ class AgentService:
         # Use gpt-4o-mini for cost efficiency
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-    def get_tools(self, current_user_id: int):
+    def get_tools(self, current_user_id: int, idempotency_key: Optional[str] = None):
         # --- Banking Tools ---
         @tool
         def check_balance() -> str:
@@ -35,11 +39,26 @@ class AgentService:
                 return "Aucune transaction récente."
             return "\n".join([f"- {t.date.strftime('%Y-%m-%d')}: {t.description} ({t.amount} TND)" for t in transactions])
 
+        @tool
+        def get_spending_summary(category: Optional[str] = None, months: int = 1) -> str:
+            """Dépenses et revenus par catégorie sur les derniers mois (ex: combien ai-je dépensé en courses ?).
+            category: catégorie optionnelle (Groceries, Transport, Housing, Utilities, Payment, Transfer...)
+            months: nombre de mois calendaires, le mois en cours compris."""
+            today = date.today()
+            month_index = today.year * 12 + today.month - 1 - (max(months, 1) - 1)
+            start = date(month_index // 12, month_index % 12 + 1, 1)
+            rows = self.banking_service.get_spending(current_user_id, "month", start=start, category=category, by_period=False)
+            if not rows:
+                return f"Aucune opération depuis le {start.strftime('%d/%m/%Y')}."
+            lines = [f"- {r['category']} : {round(r['spent'], 3)} TND dépensés, {round(r['received'], 3)} TND reçus "
+                     f"({r['count']} opérations)" for r in rows]
+            return f"Depuis le {start.strftime('%d/%m/%Y')} :\n" + "\n".join(lines)
+
         # --- Store Tools ---
         @tool
         def search_product(query: str) -> str:
             """Rechercher un produit dans le magasin par nom."""
-            products = self.store_service.search_products(query)
+            products = self.store_service.search_products_cached(query)
             if not products:
                 return "Aucun produit trouvé."
             return "\n".join([f"- {p.name}: {p.price} TND (Stock: {p.stock})" for p in products])
@@ -47,7 +66,7 @@ class AgentService:
         @tool
         def check_product_stock_price(product_name: str) -> str:
             """Vérifier le prix et le stock d'un produit spécifique."""
-            product = self.store_service.get_product(product_name)
+            product = self.store_service.find_product(product_name)
             if not product:
                 return f"Produit '{product_name}' non trouvé."
             return f"{product.name} coûte {product.price} TND et il en reste {product.stock} en stock."
@@ -56,10 +75,11 @@ class AgentService:
         @tool
         def recommend_products_based_on_history() -> str:
             """Analyse l'historique d'achat et recommande des produits pertinents."""
-            history = self.banking_service.get_transactions(current_user_id, limit=10)
+            # Whole history from the rollups, not just the last few transactions
+            spending = self.banking_service.get_spending(current_user_id, "month", by_period=False)
             
             recommendations = []
-            has_food = any(t.category in ["Groceries", "Food", "Épicerie"] for t in history)
+            has_food = any(r["category"] in ["Groceries", "Food", "Épicerie"] and r["spent"] > 0 for r in spending)
             
             if has_food:
                 recommendations.append("- Harissa Sicam : Indispensable pour cuisiner tunisien.")
@@ -96,6 +116,20 @@ class AgentService:
                 return f"{quantity}x {product_name} ajouté au panier."
             return f"Échec : Impossible d'ajouter {product_name}. Vérifiez le stock ou le nom."
 
+        @tool
+        def add_products_to_cart(product_names: List[str], quantities: Optional[List[int]] = None) -> str:
+            """Ajouter plusieurs produits au panier en une seule fois (ex: tous les ingrédients d'une recette).
+            quantities est optionnel (1 par défaut), dans le même ordre que product_names."""
+            quantities = quantities or []
+            items = [(name, quantities[i] if i < len(quantities) else 1) for i, name in enumerate(product_names)]
+            result = self.store_service.add_many_to_cart(current_user_id, items)
+            lines = []
+            if result["added"]:
+                lines.append("Ajoutés au panier : " + ", ".join(result["added"]) + ".")
+            if result["not_found"]:
+                lines.append("Introuvables : " + ", ".join(result["not_found"]) + ".")
+            return "\n".join(lines) or "Aucun produit à ajouter."
+
         @tool
         def remove_product_from_cart(product_name: str) -> str:
             """Retirer un produit du panier."""
@@ -114,10 +148,7 @@ class AgentService:
         def transfer_money(amount: float, recipient_email: str) -> str:
             """Effectuer un virement bancaire. Nécessite le montant et l'email du destinataire. 
             L'email peut être dicté comme 'alice arobase example point com'."""
-            global logging
-            import logging
             import re
-            logging.basicConfig(filename='backend_debug.log', level=logging.INFO)
             
             def normalize_spoken_email(text: str) -> str:
                 """Convert spoken email to proper format."""
@@ -137,7 +168,7 @@ class AgentService:
             try:
                 # Normalize the email first
                 normalized_email = normalize_spoken_email(recipient_email)
-                logging.info(f"transfer_money: original='{recipient_email}' normalized='{normalized_email}'")
+                logger.info(f"transfer_money: original='{recipient_email}' normalized='{normalized_email}'")
                 
                 # Known user shortcuts
                 if normalized_email.lower() in ["alice", "alice."]:
@@ -151,16 +182,18 @@ class AgentService:
                 if '@' not in normalized_email or '.' not in normalized_email:
                     return f"Format d'email invalide: '{normalized_email}'. Dites par exemple 'alice arobase example point com'."
                     
-                result = self.banking_service.transfer_to_user(current_user_id, normalized_email, amount)
+                # A retried request (same key) replays the transfer's first response instead of sending twice
+                transfer_key = f"{idempotency_key}:transfer:{normalized_email}:{amount}" if idempotency_key else None
+                result = self.banking_service.transfer_to_user(current_user_id, normalized_email, amount, transfer_key)
                 return result
             except Exception as e:
-                logging.error(f"Tool Error transfer_money: {e}")
+                logger.error(f"Tool Error transfer_money: {e}")
                 return f"Erreur outil virement: {str(e)}"
 
         @tool
         def check_product_price(product_name: str) -> str:
             """Vérifier le prix d'un produit (et s'il est en stock)."""
-            products = self.store_service.search_products(product_name)
+            products = self.store_service.search_products_cached(product_name)
             if not products:
                 return f"Désolé, je ne trouve pas de produit correspondant à '{product_name}'."
             p = products[0]
@@ -170,15 +203,16 @@ class AgentService:
         def checkout_cart() -> str:
             """Valider le panier et procéder au paiement."""
             try:
-                result = self.store_service.checkout(current_user_id, self.banking_service)
+                checkout_key = f"{idempotency_key}:checkout" if idempotency_key else None
+                result = self.store_service.checkout(current_user_id, self.banking_service, checkout_key)
                 return result
             except Exception as e:
                 return f"Erreur lors du paiement : {str(e)}"
 
-        return [check_balance, get_transaction_history, search_product, check_product_stock_price, recommend_products_based_on_history, get_my_cart, get_cart_total, add_product_to_cart, remove_product_from_cart, transfer_money, check_product_price, checkout_cart]
+        return [check_balance, get_transaction_history, get_spending_summary, search_product, check_product_stock_price, recommend_products_based_on_history, get_my_cart, get_cart_total, add_product_to_cart, add_products_to_cart, remove_product_from_cart, transfer_money, check_product_price, checkout_cart]
 
-    def process_query(self, query: str, user_id: int = 1, history: List = []):
-        tools = self.get_tools(user_id)
+    def process_query(self, query: str, user_id: int = 1, history: List = [], idempotency_key: Optional[str] = None):
+        tools = self.get_tools(user_id, idempotency_key)
         
         # Convert history (pydantic objects or dicts) to LangChain messages
         from langchain_core.messages import HumanMessage, AIMessage
@@ -196,11 +230,13 @@ class AgentService:
         prompt = ChatPromptTemplate.from_messages([
             ("system", f"Tu es un assistant intelligent expert en courses et finances. ID Utilisateur actuel: {user_id}. "
                        "Tu as accès à des outils pour gérer le panier, le solde et les virements. "
+                       "Pour les questions de dépenses (ex: combien ai-je dépensé en courses ce mois-ci), utilise get_spending_summary. "
                        "Les outils sont automatiquement sécurisés pour cet utilisateur. "
                        "VIREMENTS: L'utilisateur peut dicter un email vocalement comme 'alice arobase example point com'. "
                        "Tu dois passer l'email tel que dicté au tool transfer_money, il sera normalisé automatiquement. "
                        "Tu es aussi un Chef Cuisinier : Si l'utilisateur veut cuisiner un plat (ex: Couscous), propose les ingrédients "
-                       "et demande si tu dois les ajouter au panier. Utilize search_product pour trouver les ingrédients exacts. "
+                       "et demande si tu dois les ajouter au panier. Utilize search_product pour trouver les ingrédients exacts, "
+                       "puis add_products_to_cart pour les ajouter tous en un seul appel. "
                        "Réponds toujours en français, avec des prix en TND."),
             ("placeholder", "{chat_history}"),
             ("human", "{input}"),
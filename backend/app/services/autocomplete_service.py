@@ -0,0 +1,272 @@
+"""
+Product autocomplete
+In-memory prefix index over accent-folded product names and brands, fed by SQLite
+products and the Qdrant payload catalog, ranked by popularity (units bought at checkout)
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import OrderLine, Product
+from app.services.hybrid_search import tokenize
+
+load_dotenv()
+
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "30"))
+# Keys examined per lookup: bounds the cost of one-letter prefixes
+AUTOCOMPLETE_SCAN_LIMIT = 2000
+# Results for prefixes up to this length are memoized until the index changes
+AUTOCOMPLETE_MEMO_PREFIX_LENGTH = 2
+
+
+def _fold(text: Optional[str]) -> str:
+    return " ".join(tokenize(text or ""))
+
+
+class PrefixIndex:
+    """
+    Sorted (key, entry, word_position) tuples searched with bisect.
+    Every word of a name starts a key ("fellah 500g" for "Pâtes Fellah 500g"), and
+    "brand name" is a key too, so any word or the brand can be typed first.
+    Products sharing a folded name share one entry, merged from each source (a SQLite
+    product, a catalog point): it is dropped when its last source is removed.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str, int]] = []
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._popularity: Dict[str, float] = {}
+        # entry key -> {source id: suggestion}, and source id -> entry key (writers only, under the lock)
+        self._sources: Dict[str, Dict[Hashable, Dict[str, Any]]] = {}
+        self._source_keys: Dict[Hashable, str] = {}
+        self._memo: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry_key: str) -> bool:
+        return entry_key in self._entries
+
+    @staticmethod
+    def _keys_for(entry_key: str, suggestion: Dict[str, Any]) -> List[Tuple[str, str, int]]:
+        words = entry_key.split(" ")
+        keys = [(" ".join(words[i:]), entry_key, i) for i in range(len(words))]
+        brand = _fold(suggestion.get("brand"))
+        if brand and not entry_key.startswith(brand):
+            keys.append((f"{brand} {entry_key}", entry_key, 1))
+        return keys
+
+    @staticmethod
+    def _merge(sources: Dict[Hashable, Dict[str, Any]]) -> Dict[str, Any]:
+        """The first source's suggestion, with fields it lacks filled in by the later ones."""
+        merged: Dict[str, Any] = {}
+        for suggestion in sources.values():
+            for field, value in suggestion.items():
+                if merged.get(field) is None:
+                    merged[field] = value
+        return merged
+
+    def upsert_many(self, suggestions: List[Tuple[Hashable, Dict[str, Any]]]):
+        """
+        Add (source id, suggestion) pairs; a suggestion whose folded name is already
+        indexed fills in the missing fields of that entry.
+        """
+        new_keys = []
+        with self._lock:
+            entries = dict(self._entries)
+            for source_id, suggestion in suggestions:
+                entry_key = _fold(suggestion.get("name"))
+                if not entry_key:
+                    continue
+                if entry_key not in self._sources:
+                    self._sources[entry_key] = {}
+                    new_keys.extend(self._keys_for(entry_key, suggestion))
+                self._sources[entry_key][source_id] = suggestion
+                self._source_keys[source_id] = entry_key
+                entries[entry_key] = self._merge(self._sources[entry_key])
+            # Readers never lock: publish complete new structures
+            if new_keys:
+                self._keys = sorted(self._keys + new_keys)
+            self._entries = entries
+            self._memo = {}
+
+    def remove_many(self, source_ids: List[Hashable]):
+        """Remove the suggestions of these sources; an entry other sources still provide is kept (re-merged)."""
+        with self._lock:
+            entries = dict(self._entries)
+            drop = set()
+            for source_id in source_ids:
+                entry_key = self._source_keys.pop(source_id, None)
+                if entry_key is None:
+                    continue
+                sources = self._sources[entry_key]
+                del sources[source_id]
+                if sources:
+                    entries[entry_key] = self._merge(sources)
+                else:
+                    del self._sources[entry_key]
+                    entries.pop(entry_key, None)
+                    drop.add(entry_key)
+            if drop:
+                self._keys = [key for key in self._keys if key[1] not in drop]
+            self._entries = entries
+            self._memo = {}
+
+    def set_popularity(self, popularity: Dict[str, float]):
+        if popularity != self._popularity:
+            self._popularity = popularity
+            self._memo = {}
+
+    def search(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Suggestions whose name (from any word) or brand starts with the query, most popular first."""
+        prefix = _fold(query)
+        if not prefix:
+            return []
+        memo = self._memo
+        memoized = memo.get((prefix, limit))
+        if memoized is not None:
+            return memoized
+        keys, entries, popularity = self._keys, self._entries, self._popularity
+
+        positions: Dict[str, int] = {}
+        index = bisect_left(keys, (prefix,))
+        end = min(len(keys), index + AUTOCOMPLETE_SCAN_LIMIT)
+        while index < end and keys[index][0].startswith(prefix):
+            _, entry_key, position = keys[index]
+            if position < positions.get(entry_key, position + 1):
+                positions[entry_key] = position
+            index += 1
+
+        ranked = sorted(positions, key=lambda k: (-popularity.get(k, 0.0), positions[k], len(k), k))
+        suggestions = [entries[entry_key] for entry_key in ranked[:limit] if entry_key in entries]
+        if len(prefix) <= AUTOCOMPLETE_MEMO_PREFIX_LENGTH:
+            memo[(prefix, limit)] = suggestions
+        return suggestions
+
+
+class ProductAutocomplete:
+    """The prefix index plus incremental loading from SQLite and the payload catalog."""
+
+    def __init__(self):
+        self.index = PrefixIndex()
+        self._product_rows: Dict[int, Tuple] = {}
+        self._product_keys: Dict[int, str] = {}
+        self._catalog_version: Optional[int] = None
+        self._catalog_points: set = set()
+        self._checked_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, db: Session, force: bool = False):
+        """
+        Pick up SQLite product changes (added, edited, deleted), payload catalog changes
+        (by version) and purchase popularity. At most once per AUTOCOMPLETE_REFRESH_SECONDS.
+        """
+        if not force and time.monotonic() - self._checked_at < AUTOCOMPLETE_REFRESH_SECONDS:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # Another request is refreshing; serve the current index
+        try:
+            self._checked_at = time.monotonic()
+            self._refresh_products(db)
+            catalog = self._get_catalog()
+            if catalog is not None and catalog.version != self._catalog_version:
+                self._refresh_catalog(catalog)
+            self._refresh_popularity(db)
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _get_catalog():
+        """The vector payload catalog, or None (disabled or Qdrant unreachable): SQLite products only."""
+        try:
+            from app.services.vector_search_service import get_vector_search_service
+            return get_vector_search_service().get_payload_catalog()
+        except Exception as e:
+            print(f"Autocomplete catalog error: {e}")
+            return None
+
+    def _refresh_products(self, db: Session):
+        """Diff the products table against the rows indexed last time (one scan of the name columns)."""
+        rows = db.query(Product.id, Product.name, Product.price, Product.category, Product.description).all()
+        current = {row.id: tuple(row) for row in rows}
+        changed = [row for row in rows if self._product_rows.get(row.id) != current[row.id]]
+        # Deleted rows, and edited ones (re-added below under their new name)
+        stale = [product_id for product_id in self._product_rows if self._product_rows[product_id] != current.get(product_id)]
+        if not changed and not stale:
+            return
+        self.index.remove_many([("sqlite", product_id) for product_id in stale])
+        for product_id in stale:
+            self._product_keys.pop(product_id, None)
+
+        suggestions = []
+        for row in changed:
+            description = row.description or ""
+            suggestions.append((("sqlite", row.id), {
+                "name": row.name,
+                # Products synced from vector hits carry "Marque: X" as description
+                "brand": description[len("Marque: "):] if description.startswith("Marque: ") else None,
+                "category": row.category,
+                "price": row.price,
+                "product_id": str(row.id),
+                "image_file": None,
+                "category_folder": None,
+            }))
+            self._product_keys[row.id] = _fold(row.name)
+        self.index.upsert_many(suggestions)
+        self._product_rows = current
+
+    def _refresh_catalog(self, catalog):
+        items = dict(catalog.items())
+        removed = [point_id for point_id in self._catalog_points if point_id not in items]
+        self._catalog_points.difference_update(removed)
+        # Entries that another point or SQLite also provides stay
+        self.index.remove_many([("catalog", point_id) for point_id in removed])
+
+        added = []
+        for point_id, item in items.items():
+            if point_id not in self._catalog_points:
+                self._catalog_points.add(point_id)
+                added.append((("catalog", point_id), {
+                    "name": item.get("name"),
+                    "brand": item.get("brand"),
+                    "category": item.get("category_folder"),
+                    "price": item.get("price_value"),
+                    "product_id": item.get("product_id"),
+                    "image_file": item.get("image_file"),
+                    "category_folder": item.get("category_folder"),
+                }))
+        self.index.upsert_many(added)
+        self._catalog_version = catalog.version
+
+    def _refresh_popularity(self, db: Session):
+        rows = db.query(OrderLine.product_id, func.sum(OrderLine.quantity)).group_by(OrderLine.product_id).all()
+        self.index.set_popularity({
+            self._product_keys[product_id]: float(quantity or 0)
+            for product_id, quantity in rows if product_id in self._product_keys
+        })
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+        return self.index.search(query, limit)
+
+
+# Singleton instance for reuse
+_product_autocomplete: Optional[ProductAutocomplete] = None
+_product_autocomplete_lock = threading.Lock()
+
+
+def get_product_autocomplete() -> ProductAutocomplete:
+    """Get or create the product autocomplete singleton."""
+    global _product_autocomplete
+    if _product_autocomplete is None:
+        with _product_autocomplete_lock:
+            if _product_autocomplete is None:
+                _product_autocomplete = ProductAutocomplete()
+    return _product_autocomplete
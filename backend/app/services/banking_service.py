@@ -1,33 +1,218 @@
+import base64
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models import Account, Transaction, User
-from typing import List, Optional
+from app.models import Account, SpendingRollup, Transaction, User
+from app.services.idempotency import IdempotencyConflict, claim_idempotency_key, complete_idempotency_key
+from app.services.spending_rollups import ROLLUP_PERIODS, add_to_rollups
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def encode_transaction_cursor(transaction: Transaction) -> str:
+    """Opaque, URL-safe cursor pointing just after this transaction in newest-first order."""
+    raw = f"{transaction.date.isoformat()}|{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_transaction_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: Malformed cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, transaction_id = raw.split("|")
+        return datetime.fromisoformat(date), int(transaction_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# Statement builders shared by BankingService and AsyncBankingService
+
+def checking_account_id(user_id: int):
+    """Scalar subquery for the user's checking account ID, so history reads are one query."""
+    return select(Account.id).where(
+        Account.user_id == user_id,
+        Account.account_type == "checking"
+    ).limit(1).scalar_subquery()
+
+
+def account_statement(user_id: int, account_type: str = "checking"):
+    return select(Account).where(
+        Account.user_id == user_id,
+        Account.account_type == account_type
+    ).limit(1)
+
+
+def transactions_page_statement(user_id: int, limit: int, cursor: Optional[str] = None):
+    """
+    limit + 1 transactions newest first, after the cursor (the extra row tells whether there is a next page).
+
+    Raises:
+        ValueError: Invalid cursor
+    """
+    statement = select(Transaction).where(Transaction.account_id == checking_account_id(user_id))
+    if cursor:
+        date, transaction_id = decode_transaction_cursor(cursor)
+        statement = statement.where(tuple_(Transaction.date, Transaction.id) < (date, transaction_id))
+    return statement.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+
+
+def split_transactions_page(rows: List[Transaction], limit: int) -> Tuple[List[Transaction], Optional[str]]:
+    if len(rows) > limit:
+        return rows[:limit], encode_transaction_cursor(rows[limit - 1])
+    return rows, None
+
+
+def spending_statement(user_id: int, period: str = "month", start: Optional[date] = None,
+                       end: Optional[date] = None, category: Optional[str] = None, by_period: bool = True):
+    """
+    Raises:
+        ValueError: Unknown period
+    """
+    if period not in ROLLUP_PERIODS:
+        raise ValueError(f"Unknown period: {period} (expected one of {', '.join(ROLLUP_PERIODS)})")
+
+    columns = [SpendingRollup.category]
+    if by_period:
+        columns.insert(0, SpendingRollup.period_start)
+    statement = select(
+        *columns,
+        func.sum(SpendingRollup.spent).label("spent"),
+        func.sum(SpendingRollup.received).label("received"),
+        func.sum(SpendingRollup.count).label("count"),
+    ).where(
+        SpendingRollup.account_id == checking_account_id(user_id),
+        SpendingRollup.period == period
+    )
+    if start is not None:
+        statement = statement.where(SpendingRollup.period_start >= (start if period == "day" else start.replace(day=1)))
+    if end is not None:
+        statement = statement.where(SpendingRollup.period_start <= end)
+    if category:
+        statement = statement.where(func.lower(SpendingRollup.category) == category.lower())
+
+    if by_period:
+        statement = statement.order_by(SpendingRollup.period_start.desc(), SpendingRollup.category)
+    else:
+        statement = statement.order_by(func.sum(SpendingRollup.spent).desc())
+    return statement.group_by(*columns)
+
 
 class BankingService:
     def __init__(self, db: Session):
         self.db = db
 
     def get_account(self, user_id: int, account_type: str = "checking") -> Optional[Account]:
-        return self.db.query(Account).filter(
-            Account.user_id == user_id, 
-            Account.account_type == account_type
-        ).first()
+        return self.db.execute(account_statement(user_id, account_type)).scalars().first()
 
     def get_balance(self, user_id: int, account_type: str = "checking") -> float:
         account = self.get_account(user_id, account_type)
         return account.balance if account else 0.0
 
     def get_transactions(self, user_id: int, limit: int = 5) -> List[Transaction]:
-        account = self.get_account(user_id)
-        if not account:
-            return []
+        return self.get_transactions_page(user_id, limit)[0]
+
+    def get_transactions_page(self, user_id: int, limit: int = 20,
+                              cursor: Optional[str] = None) -> Tuple[List[Transaction], Optional[str]]:
+        """
+        One page of the checking account history, newest first.
+        
+        Keyset pagination on (date, id), served by ix_transactions_account_date_id:
+        every page costs the same, however deep, unlike OFFSET.
+        
+        Args:
+            limit: Page size
+            cursor: next_cursor of the previous page, None for the first page
+            
+        Returns:
+            (transactions, next_cursor) where next_cursor is None on the last page
+            
+        Raises:
+            ValueError: Invalid cursor
+        """
+        rows = self.db.execute(transactions_page_statement(user_id, limit, cursor)).scalars().all()
+        return split_transactions_page(rows, limit)
+
+    def iter_transactions(self, user_id: int, start: Optional[date] = None, end: Optional[date] = None,
+                          batch_size: int = 1000) -> Iterator[List[Any]]:
+        """
+        Checking account history oldest first, as batches of plain rows
+        (id, date, description, category, amount) read from a server-side cursor.
+        
+        Rows are fetched yield_per batch_size, never as ORM objects, so memory use
+        does not depend on the size of the history. The session stays busy until
+        the iterator is exhausted or closed.
+        
+        Args:
+            start: First day included, None for no lower bound
+            end: Last day included, None for no upper bound
+        """
+        statement = select(
+            Transaction.id, Transaction.date, Transaction.description, Transaction.category, Transaction.amount
+        ).where(Transaction.account_id == checking_account_id(user_id))
+        if start is not None:
+            statement = statement.where(Transaction.date >= datetime.combine(start, time.min))
+        if end is not None:
+            statement = statement.where(Transaction.date < datetime.combine(end + timedelta(days=1), time.min))
+        statement = statement.order_by(Transaction.date, Transaction.id).execution_options(yield_per=batch_size)
         
-        return self.db.query(Transaction).filter(
-            Transaction.account_id == account.id
-        ).order_by(Transaction.date.desc()).limit(limit).all()
+        result = self.db.execute(statement)
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
 
-    def process_payment(self, user_id: int, amount: float, description: str) -> bool:
-        account = self.get_account(user_id)
-        if not account or account.balance < amount:
+    def get_spending(self, user_id: int, period: str = "month", start: Optional[date] = None,
+                     end: Optional[date] = None, category: Optional[str] = None,
+                     by_period: bool = True) -> List[Dict[str, Any]]:
+        """
+        Spending and income of the checking account from the rollups (one indexed read).
+        
+        Args:
+            period: "day" or "month"
+            start: First day included (rounded down to its period), None for no lower bound
+            end: Last day included, None for no upper bound
+            category: Only this category (case-insensitive), None for all
+            by_period: One row per period and category, or False for totals per category over the range
+            
+        Returns:
+            Dicts with period_start (when by_period), category, spent, received and count,
+            latest period first, or biggest spending first
+            
+        Raises:
+            ValueError: Unknown period
+        """
+        rows = self.db.execute(spending_statement(user_id, period, start, end, category, by_period)).all()
+        return [row._asdict() for row in rows]
+
+    def process_payment(self, user_id: int, amount: float, description: str, commit: bool = True) -> bool:
+        """
+        Debit the checking account if the balance covers the amount.
+        
+        The check and the debit are one conditional UPDATE, so concurrent payments
+        can never both pass the balance check.
+        
+        Args:
+            commit: False to leave the debit in the caller's open transaction (e.g. checkout)
+        """
+        account_id = self.db.query(Account.id).filter(
+            Account.user_id == user_id,
+            Account.account_type == "checking"
+        ).scalar()
+        if account_id is None:
+            return False
+        
+        result = self.db.execute(
+            update(Account)
+            .where(Account.id == account_id, Account.balance >= amount)
+            .values(balance=Account.balance - amount)
+        )
+        if result.rowcount != 1:
             return False
         
         # Create transaction
@@ -35,78 +220,182 @@ class BankingService:
             amount=-amount,
             description=description,
             category="Payment",
-            account_id=account.id
+            date=datetime.utcnow(),
+            account_id=account_id
         )
-        
-        # Update balance
-        account.balance -= amount
-        
         self.db.add(transaction)
-        self.db.commit()
-        self.db.refresh(account)
+        add_to_rollups(self.db, [transaction])
+        if commit:
+            self.db.commit()
         return True
 
-    def transfer_to_user(self, sender_id: int, recipient_email: str, amount: float) -> str:
-        import logging
-        logging.basicConfig(filename='backend_debug.log', level=logging.INFO)
-        logging.info(f"Attempting transfer: Sender={sender_id}, Recipient={recipient_email}, Amount={amount}")
-
-        # 1. Get Sender Account
-        sender_account = self.get_account(sender_id)
-        if not sender_account:
-            logging.error(f"Sender account not found for user_id={sender_id}")
-            return "Compte expéditeur introuvable."
-        if sender_account.balance < amount:
-            logging.error(f"Insufficient funds: Balance={sender_account.balance}, Amount={amount}")
-            return f"Solde insuffisant ({sender_account.balance} TND) pour envoyer {amount} TND."
-            
-        # 2. Get Recipient
-        recipient_user = self.db.query(User).filter(User.email == recipient_email).first()
-        if not recipient_user:
-            logging.error(f"Recipient not found: {recipient_email}")
-            return f"Destinataire avec l'email '{recipient_email}' introuvable."
-            
-        if recipient_user.id == sender_id:
-            return "Vous ne pouvez pas vous envoyer de l'argent à vous-même."
+    def transfer_to_user(self, sender_id: int, recipient_email: str, amount: float,
+                         idempotency_key: Optional[str] = None) -> str:
+        return self.transfer_with_status(sender_id, recipient_email, amount, idempotency_key)[1]
+
+    def transfer_with_status(self, sender_id: int, recipient_email: str, amount: float,
+                             idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Move money between two checking accounts in a single transaction.
+        
+        The sender is debited with a conditional UPDATE (balance >= amount), so
+        concurrent transfers can never overdraw it, and both balances and both
+        Transaction rows are committed together or not at all. A retried request
+        with the same idempotency key returns the first response without sending twice.
+        
+        Args:
+            idempotency_key: Client-generated key (e.g. the Idempotency-Key header)
             
-        # 3. Get Recipient Account
-        recipient_account = self.get_account(recipient_user.id)
-        if not recipient_account:
-            # Auto-create checking account if not exists (edge case)
-            recipient_account = Account(user_id=recipient_user.id, balance=0.0, account_type="checking")
-            self.db.add(recipient_account)
-            self.db.commit()
-            self.db.refresh(recipient_account)
+        Returns:
+            (success, message)
             
-        # 4. Perform Transfer (Atomic)
+        Raises:
+            IdempotencyConflict: The key was used by another user or request type
+        """
+        logger.info(f"Attempting transfer: Sender={sender_id}, Recipient={recipient_email}, Amount={amount}")
+
+        if not amount or amount <= 0:
+            return False, "Le montant du virement doit être positif."
+
         try:
-            sender_account.balance -= amount
-            recipient_account.balance += amount
-            
-            # Record for sender
-            t_sender = Transaction(
-                amount=-amount, 
-                description=f"Virement vers {recipient_user.full_name}", 
-                category="Transfer", 
-                account_id=sender_account.id
+            if idempotency_key:
+                replay = claim_idempotency_key(self.db, idempotency_key, sender_id, "transfer")
+                if replay is not None:
+                    logger.info("Transfer replayed from idempotency key")
+                    return True, replay
+
+            # 1. Get Sender Account
+            sender = self.db.query(Account.id, User.full_name).join(User, User.id == Account.user_id).filter(
+                Account.user_id == sender_id,
+                Account.account_type == "checking"
+            ).first()
+            if not sender:
+                logger.error(f"Sender account not found for user_id={sender_id}")
+                self.db.rollback()
+                return False, "Compte expéditeur introuvable."
+
+            # 2. Get Recipient
+            recipient_user = self.db.query(User).filter(User.email == recipient_email).first()
+            if not recipient_user:
+                logger.error(f"Recipient not found: {recipient_email}")
+                self.db.rollback()
+                return False, f"Destinataire avec l'email '{recipient_email}' introuvable."
+
+            if recipient_user.id == sender_id:
+                self.db.rollback()
+                return False, "Vous ne pouvez pas vous envoyer de l'argent à vous-même."
+
+            # 3. Get Recipient Account
+            recipient_account_id = self.db.query(Account.id).filter(
+                Account.user_id == recipient_user.id,
+                Account.account_type == "checking"
+            ).scalar()
+            if recipient_account_id is None:
+                # Auto-create checking account if not exists (edge case), in the same transaction
+                recipient_account = Account(user_id=recipient_user.id, balance=0.0, account_type="checking")
+                self.db.add(recipient_account)
+                self.db.flush()
+                recipient_account_id = recipient_account.id
+
+            # 4. Perform Transfer: debit only if covered, credit, both in account ID order
+            # so opposite concurrent transfers lock rows in the same order (no deadlock)
+            debit = update(Account).where(Account.id == sender.id, Account.balance >= amount).values(
+                balance=Account.balance - amount
             )
-            
-            # Record for recipient
-            t_recipient = Transaction(
-                amount=amount, 
-                description=f"Virement reçu de {sender_account.owner.full_name}", 
-                category="Transfer", 
-                account_id=recipient_account.id
+            credit = update(Account).where(Account.id == recipient_account_id).values(
+                balance=Account.balance + amount
             )
-            
-            self.db.add(t_sender)
-            self.db.add(t_recipient)
+            for statement in ([debit, credit] if sender.id < recipient_account_id else [credit, debit]):
+                result = self.db.execute(statement.execution_options(synchronize_session=False))
+                if statement is debit and result.rowcount != 1:
+                    self.db.rollback()
+                    balance = self.db.query(Account.balance).filter(Account.id == sender.id).scalar()
+                    logger.error(f"Insufficient funds: Balance={balance}, Amount={amount}")
+                    return False, f"Solde insuffisant ({balance} TND) pour envoyer {amount} TND."
+
+            now = datetime.utcnow()
+            transactions = [
+                # Record for sender
+                Transaction(
+                    amount=-amount,
+                    description=f"Virement vers {recipient_user.full_name}",
+                    category="Transfer",
+                    date=now,
+                    account_id=sender.id
+                ),
+                # Record for recipient
+                Transaction(
+                    amount=amount,
+                    description=f"Virement reçu de {sender.full_name}",
+                    category="Transfer",
+                    date=now,
+                    account_id=recipient_account_id
+                ),
+            ]
+            self.db.add_all(transactions)
+            add_to_rollups(self.db, transactions)
+
+            message = f"Succès : {amount} TND envoyés à {recipient_user.full_name}."
+            if idempotency_key:
+                complete_idempotency_key(self.db, idempotency_key, message)
             self.db.commit()
-            
-            logging.info("Transfer successful")
-            return f"Succès : {amount} TND envoyés à {recipient_user.full_name}."
-            
+            logger.info("Transfer successful")
+            return True, message
+
+        except IdempotencyConflict:
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()
-            logging.error(f"DB Error during transfer: {e}")
-            return f"Erreur technique lors du virement : {str(e)}"
+            logger.error(f"DB Error during transfer: {e}")
+            return False, f"Erreur technique lors du virement : {str(e)}"
+
+
+class AsyncBankingService:
+    """
+    BankingService for async endpoints. Reads run on the AsyncSession (same statements
+    as the sync service); money-moving writes run the sync implementation through
+    run_sync, so the conditional UPDATEs, idempotency and rollups are shared, not copied.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_account(self, user_id: int, account_type: str = "checking") -> Optional[Account]:
+        return (await self.db.execute(account_statement(user_id, account_type))).scalars().first()
+
+    async def get_balance(self, user_id: int, account_type: str = "checking") -> float:
+        account = await self.get_account(user_id, account_type)
+        return account.balance if account else 0.0
+
+    async def get_transactions(self, user_id: int, limit: int = 5) -> List[Transaction]:
+        return (await self.get_transactions_page(user_id, limit))[0]
+
+    async def get_transactions_page(self, user_id: int, limit: int = 20,
+                                    cursor: Optional[str] = None) -> Tuple[List[Transaction], Optional[str]]:
+        """See BankingService.get_transactions_page."""
+        rows = (await self.db.execute(transactions_page_statement(user_id, limit, cursor))).scalars().all()
+        return split_transactions_page(rows, limit)
+
+    async def get_spending(self, user_id: int, period: str = "month", start: Optional[date] = None,
+                           end: Optional[date] = None, category: Optional[str] = None,
+                           by_period: bool = True) -> List[Dict[str, Any]]:
+        """See BankingService.get_spending."""
+        rows = (await self.db.execute(spending_statement(user_id, period, start, end, category, by_period))).all()
+        return [row._asdict() for row in rows]
+
+    async def process_payment(self, user_id: int, amount: float, description: str) -> bool:
+        return await self.db.run_sync(
+            lambda session: BankingService(session).process_payment(user_id, amount, description)
+        )
+
+    async def transfer_with_status(self, sender_id: int, recipient_email: str, amount: float,
+                                   idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """See BankingService.transfer_with_status."""
+        return await self.db.run_sync(
+            lambda session: BankingService(session).transfer_with_status(sender_id, recipient_email, amount, idempotency_key)
+        )
+
+    async def transfer_to_user(self, sender_id: int, recipient_email: str, amount: float,
+                               idempotency_key: Optional[str] = None) -> str:
+        return (await self.transfer_with_status(sender_id, recipient_email, amount, idempotency_key))[1]
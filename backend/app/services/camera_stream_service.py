@@ -0,0 +1,97 @@
+"""
+Camera stream recognition helpers
+Cheap frame decoding, perceptual-hash deduplication and "top match changed" detection
+"""
+
+import io
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hamming distance (out of 64 bits) under which two frames count as the same view
+DEFAULT_HASH_THRESHOLD = 6
+
+
+def decode_frame(frame_bytes: bytes, size: int = 384):
+    """
+    Decode a JPEG frame close to the model resolution.
+    draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full size.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(frame_bytes))
+    image.draft("RGB", (size, size))
+    image = image.convert("RGB")
+    image.thumbnail((size, size))
+    return image
+
+
+def dhash(image, hash_size: int = 8) -> int:
+    """64-bit difference hash: compares neighbouring pixels of a tiny grayscale copy."""
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FrameStreamMatcher:
+    """Per-connection state: which frames to embed and when to push a new match."""
+
+    def __init__(self, hash_threshold: int = DEFAULT_HASH_THRESHOLD, min_score: float = 0.0):
+        self.hash_threshold = hash_threshold
+        self.min_score = min_score
+        self._last_hash: Optional[int] = None
+        self._last_top: Optional[Tuple[Any, Any]] = None
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_embedded = 0
+
+    def accept(self, frame_hash: int) -> bool:
+        """False for near-duplicates of the last accepted frame."""
+        self.frames_received += 1
+        if self._last_hash is not None and hamming(frame_hash, self._last_hash) <= self.hash_threshold:
+            self.frames_dropped += 1
+            return False
+        self._last_hash = frame_hash
+        self.frames_embedded += 1
+        return True
+
+    def select(self, frames: List[bytes], size: int = 384) -> List[Any]:
+        """Decode a batch of JPEG frames and keep the ones worth embedding (CPU-bound, run off the event loop)."""
+        images = []
+        for frame_bytes in frames:
+            try:
+                image = decode_frame(frame_bytes, size)
+            except Exception as e:
+                logger.warning("Invalid camera frame: %s", e)
+                continue
+            if self.accept(dhash(image)):
+                images.append(image)
+        return images
+
+    def changed(self, results: List[Dict[str, Any]]) -> bool:
+        """True when the top product differs from the last one pushed to the client."""
+        top = results[0] if results and (results[0].get("score") or 0) >= self.min_score else None
+        key = (top.get("product_id"), top.get("name")) if top else None
+        if key == self._last_top:
+            return False
+        self._last_top = key
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "frames_embedded": self.frames_embedded,
+        }
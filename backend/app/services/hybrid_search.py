@@ -0,0 +1,93 @@
+"""
+Hybrid product retrieval helpers
+BM25 lexical index with accent folding + reciprocal rank fusion
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase and strip diacritics: "Pâtes Délice" -> "pates delice"."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold_accents(text))
+
+
+class BM25Index:
+    """Small in-memory Okapi BM25 index; documents are only ever added."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: Hashable, *fields: str):
+        """Index a document made of one or more text fields (name, brand, category...)."""
+        tokens = [token for field in fields for token in tokenize(field)]
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                return
+            for token in tokens:
+                postings = self._postings[token]
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+            self._doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """
+        Rank documents against a free-text query.
+
+        Returns:
+            List of (doc_id, score) tuples, best first
+        """
+        scores: Dict[Hashable, float] = defaultdict(float)
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+
+            for token in set(tokenize(query)):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def reciprocal_rank_fusion(result_lists: Iterable[List[Any]], k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Merge ranked lists of IDs: score(id) = sum(1 / (k + rank)).
+    IDs are deduplicated through a dict, so merging is linear in the total length.
+
+    Returns:
+        List of (id, fused_score) tuples, best first
+    """
+    fused: Dict[Any, float] = {}
+    for results in result_lists:
+        for rank, doc_id in enumerate(results, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,44 @@
+"""
+Idempotency keys for money-moving requests
+A key is claimed inside the request's own transaction and stored with its response on
+commit, so a retried request returns the first response instead of running twice.
+"""
+
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used by another user or for another kind of request."""
+
+
+def claim_idempotency_key(db: Session, key: str, user_id: int, scope: str) -> Optional[str]:
+    """
+    Reserve a key in the current transaction.
+
+    Returns:
+        None when the request should run, or the stored response of the earlier request
+    """
+    record = db.get(IdempotencyKey, key)
+    if record is None:
+        db.add(IdempotencyKey(key=key, user_id=user_id, scope=scope))
+        try:
+            db.flush()
+            return None
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            db.rollback()
+            record = db.get(IdempotencyKey, key)
+
+    if record.user_id != user_id or record.scope != scope:
+        raise IdempotencyConflict(f"Idempotency key already used for another {record.scope} request")
+    return record.response
+
+
+def complete_idempotency_key(db: Session, key: str, response: str):
+    """Attach the response to a claimed key (committed together with the request's changes)."""
+    db.get(IdempotencyKey, key).response = response
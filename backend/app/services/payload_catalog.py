@@ -0,0 +1,129 @@
+"""
+PayloadCatalog - In-memory copy of the product payloads stored in Qdrant
+Serves listing, category filtering and price sorting without Qdrant round-trips
+"""
+
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.services.vector_search_service import payload_to_product
+from app.services.vector_snapshot import iter_point_ids
+from app.utils.prices import parse_price
+
+SORT_OPTIONS = ("price_asc", "price_desc")
+
+
+class PayloadCatalog:
+    """Product payloads keyed by Qdrant point ID, loaded once and refreshed by ID delta."""
+
+    def __init__(self):
+        self._items: Dict[Any, Dict[str, Any]] = {}
+        self._order: List[Any] = []
+        self._views: Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at = 0.0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def _to_item(payload: Dict[str, Any]) -> Dict[str, Any]:
+        item = payload_to_product(payload)
+        item["price_value"] = parse_price(payload.get("price"))
+        return item
+
+    def load(self, client, collection_name: str, page_size: int = 1000):
+        """Scroll the whole collection once (payloads only)."""
+        items, order = {}, []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for record in records:
+                items[record.id] = self._to_item(record.payload or {})
+                order.append(record.id)
+            if offset is None:
+                break
+
+        with self._lock:
+            self._items, self._order = items, order
+            self._views = {}
+            self.version += 1
+            self.loaded_at = time.monotonic()
+
+    def refresh(self, client, collection_name: str, page_size: int = 1000) -> int:
+        """
+        Incremental refresh: list IDs only, fetch payloads of new points, drop deleted ones.
+
+        Returns:
+            Number of points added or removed
+        """
+        remote_ids = list(iter_point_ids(client, collection_name, page_size))
+        remote_set = set(remote_ids)
+        new_ids = [point_id for point_id in remote_ids if point_id not in self._items]
+        removed = [point_id for point_id in self._items if point_id not in remote_set]
+
+        added = {}
+        for start in range(0, len(new_ids), page_size):
+            records = client.retrieve(
+                collection_name=collection_name,
+                ids=new_ids[start:start + page_size],
+                with_payload=True,
+                with_vectors=False,
+            )
+            for record in records:
+                added[record.id] = self._to_item(record.payload or {})
+
+        with self._lock:
+            self.loaded_at = time.monotonic()
+            if not added and not removed:
+                return 0
+            items = {point_id: item for point_id, item in self._items.items() if point_id in remote_set}
+            items.update(added)
+            self._items = items
+            self._order = [point_id for point_id in remote_ids if point_id in items]
+            self._views = {}
+            self.version += 1
+        return len(added) + len(removed)
+
+    def items(self) -> List[Tuple[Any, Dict[str, Any]]]:
+        """(point_id, item) pairs in collection order."""
+        with self._lock:
+            return [(point_id, self._items[point_id]) for point_id in self._order]
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return max_age_seconds > 0 and time.monotonic() - self.loaded_at > max_age_seconds
+
+    def _view(self, category_folder: Optional[str], sort: Optional[str]) -> List[Dict[str, Any]]:
+        """Filtered/sorted list, memoized until the next load or refresh."""
+        key = (category_folder, sort)
+        view = self._views.get(key)
+        if view is None:
+            with self._lock:
+                view = [self._items[point_id] for point_id in self._order]
+                if category_folder:
+                    view = [item for item in view if item["category_folder"] == category_folder]
+                if sort in SORT_OPTIONS:
+                    view.sort(key=lambda item: item["price_value"], reverse=(sort == "price_desc"))
+                self._views[key] = view
+        return view
+
+    def list(self, limit: int = 100, offset: int = 0, category_folder: Optional[str] = None,
+             sort: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Page through the catalog.
+
+        Returns:
+            (items, next_offset) where next_offset is None on the last page
+        """
+        view = self._view(category_folder, sort)
+        page = view[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(view) else None
+        return page, next_offset
@@ -0,0 +1,112 @@
+"""
+ProductCatalogCache - Process-wide cache of product lookups for the assistant tools
+Keyed by normalized name, ID and search query; misses are cached too. Every product
+write bumps a version counter, which empties the cache and discards lookups that
+were computed while the write happened.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.services.hybrid_search import tokenize
+
+load_dotenv()
+
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "60"))
+# Misses expire sooner: the product may be ingested in the meantime
+PRODUCT_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL_SECONDS", "10"))
+PRODUCT_CACHE_MAX_ENTRIES = 10000
+
+
+class CachedProduct(NamedTuple):
+    """Detached copy of a Product row (same attribute names), safe to share across sessions."""
+    id: int
+    name: str
+    price: float
+    stock: int
+    category: str
+    description: str
+
+    @classmethod
+    def from_model(cls, product) -> "CachedProduct":
+        return cls(product.id, product.name, product.price, product.stock, product.category, product.description)
+
+
+def normalize_name(text: str) -> str:
+    """Cache key for a product name or query: "  Pâtes FELLAH (500g)" -> "pates fellah 500g"."""
+    return " ".join(tokenize(text))
+
+
+class ProductCatalogCache:
+    """Thread-safe TTL cache with version-based invalidation."""
+
+    def __init__(self, ttl_seconds: float = PRODUCT_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: float = PRODUCT_CACHE_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = PRODUCT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Returns:
+            (found, value) - value may be None or [] for a cached miss
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry[1]
+
+    def put(self, key: Hashable, value: Any, version: int):
+        """
+        Store a lookup result.
+
+        Args:
+            version: self.version read *before* the lookup started; the result is
+                     dropped if a write happened since, as it may predate that write
+        """
+        ttl = self.negative_ttl_seconds if not value else self.ttl_seconds
+        with self._lock:
+            if version != self.version:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries = {}
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self):
+        """Call after any write to products (insert, stock or price change)."""
+        with self._lock:
+            self.version += 1
+            self._entries = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {"version": self.version, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance for reuse
+_product_catalog_cache: Optional[ProductCatalogCache] = None
+_product_catalog_cache_lock = threading.Lock()
+
+
+def get_product_catalog_cache() -> ProductCatalogCache:
+    """Get or create the product catalog cache singleton."""
+    global _product_catalog_cache
+    if _product_catalog_cache is None:
+        with _product_catalog_cache_lock:
+            if _product_catalog_cache is None:
+                _product_catalog_cache = ProductCatalogCache()
+    return _product_catalog_cache
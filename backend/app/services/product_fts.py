@@ -0,0 +1,129 @@
+"""
+SQLite FTS5 index over products
+External-content table kept in sync by triggers, accent-insensitive, ranked with bm25()
+"""
+
+import threading
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.hybrid_search import tokenize
+
+# name weighs more than description (brand) and category in the ranking
+BM25_WEIGHTS = (10.0, 2.0, 1.0)
+
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+]
+
+# Engines (by URL) on which the FTS table has been checked: True if usable
+_fts_available = {}
+_fts_lock = threading.Lock()
+
+
+def ensure_product_fts(engine: Engine) -> bool:
+    """
+    Create the FTS table and triggers if needed, and rebuild the index when it is
+    out of step with products (first run, or products recreated by init_db).
+
+    Returns:
+        True when FTS5 search can be used on this engine
+    """
+    key = str(engine.url)
+    if key in _fts_available:
+        return _fts_available[key]
+
+    with _fts_lock:
+        if key in _fts_available:
+            return _fts_available[key]
+        available = False
+        if engine.dialect.name == "sqlite":
+            try:
+                with engine.begin() as conn:
+                    if conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products'")).first():
+                        for statement in FTS_SCHEMA:
+                            conn.execute(text(statement))
+                        indexed = conn.execute(text("SELECT COUNT(*) FROM products_fts_docsize")).scalar()
+                        rows = conn.execute(text("SELECT COUNT(*) FROM products")).scalar()
+                        if indexed != rows:
+                            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+                            print(f"✅ Product FTS index rebuilt: {rows} products")
+                        available = True
+            except Exception as e:
+                # SQLite built without FTS5: callers fall back to the in-memory BM25 index
+                print(f"Product FTS unavailable: {e}")
+        _fts_available[key] = available
+        return available
+
+
+def drop_product_fts(engine: Engine):
+    """Drop the FTS table (before products is dropped and recreated)."""
+    if engine.dialect.name != "sqlite":
+        return
+    with _fts_lock:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS products_fts"))
+        _fts_available.pop(str(engine.url), None)
+
+
+def fts_match_query(query: str, match_all: bool = True) -> str:
+    """
+    FTS5 MATCH expression with prefix terms: "pates fel" -> '"pates"* AND "fel"*'.
+    Tokens are folded the same way as the index, and quoted so user input is never FTS syntax.
+    """
+    terms = [f'"{token}"*' for token in tokenize(query)]
+    return (" AND " if match_all else " OR ").join(terms)
+
+
+def search_product_ids(db: Session, query: str, limit: int = 20, match_all: bool = True) -> List[int]:
+    """
+    Product IDs matching the query, best bm25 rank first.
+
+    Args:
+        db: Session bound to a SQLite engine where ensure_product_fts() returned True
+        query: Free text, accents and case ignored, last letters may be missing
+        limit: Maximum number of IDs
+        match_all: Require every term (lookups) or any term (search recall)
+    """
+    match = fts_match_query(query, match_all)
+    if not match:
+        return []
+    rows = db.execute(product_search_statement(match, limit)).all()
+    return [row[0] for row in rows]
+
+
+def product_search_statement(match: str, limit: int):
+    """Product rowids for an FTS5 MATCH expression, best bm25 rank first."""
+    return text(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH :match "
+        f"ORDER BY bm25(products_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) LIMIT :limit"
+    ).bindparams(match=match, limit=limit)
@@ -0,0 +1,151 @@
+"""
+Spending rollups
+Per account, category and day/month sums of Transaction amounts, updated with an upsert
+in the same transaction as the rows they summarize, so aggregate questions are one
+indexed read instead of a scan of the history.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert
+from sqlalchemy.orm import Session
+
+from app.models import SpendingRollup, Transaction
+
+ROLLUP_PERIODS = ("day", "month")
+# Rollup key for transactions without a category
+UNCATEGORIZED = "Autre"
+
+RollupKey = Tuple[int, str, date, str]
+
+
+def period_start(period: str, when: datetime) -> date:
+    """First day of the period containing `when`."""
+    day = when.date() if isinstance(when, datetime) else when
+    return day if period == "day" else day.replace(day=1)
+
+
+def _accumulate(totals: Dict[RollupKey, List[float]], account_id: int, category: Optional[str], day: date,
+                spent: float, received: float, count: int):
+    for period in ROLLUP_PERIODS:
+        key = (account_id, period, period_start(period, day), category or UNCATEGORIZED)
+        entry = totals[key]
+        entry[0] += spent
+        entry[1] += received
+        entry[2] += count
+
+
+def _rows(totals: Dict[RollupKey, List[float]]) -> List[Dict]:
+    return [
+        {"account_id": account_id, "period": period, "period_start": start, "category": category,
+         "spent": spent, "received": received, "count": int(count)}
+        for (account_id, period, start, category), (spent, received, count) in totals.items()
+    ]
+
+
+def _upsert(db: Session, rows: List[Dict]):
+    """INSERT ... ON CONFLICT DO UPDATE adding to the existing sums (SQLite and PostgreSQL)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Spending rollups need an upsert, not available for {dialect}")
+
+    statement = dialect_insert(SpendingRollup).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SpendingRollup.account_id, SpendingRollup.period,
+                        SpendingRollup.period_start, SpendingRollup.category],
+        set_={
+            "spent": SpendingRollup.spent + statement.excluded.spent,
+            "received": SpendingRollup.received + statement.excluded.received,
+            "count": SpendingRollup.count + statement.excluded.count,
+        },
+    )
+    db.execute(statement)
+
+
+def add_to_rollups(db: Session, transactions: Iterable[Transaction]):
+    """
+    Add new transactions to their day and month rollups, in the caller's transaction.
+
+    Args:
+        transactions: Transaction objects being inserted; their date must be set
+                      (the column default is only applied at flush)
+    """
+    totals: Dict[RollupKey, List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+    for transaction in transactions:
+        amount = transaction.amount or 0.0
+        _accumulate(totals, transaction.account_id, transaction.category, transaction.date,
+                    -amount if amount < 0 else 0.0, amount if amount > 0 else 0.0, 1)
+    if totals:
+        _upsert(db, _rows(totals))
+
+
+def rebuild_spending_rollups(db: Session, account_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """
+    Recompute rollups from the transactions table (after a bulk import, or to repair drift).
+    Commits.
+
+    Args:
+        account_id: Only this account, None for all
+
+    Returns:
+        Number of rollup rows written
+    """
+    day = func.date(Transaction.date)
+    query = db.query(
+        Transaction.account_id,
+        Transaction.category,
+        day,
+        func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0)),
+        func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0.0)),
+        func.count(Transaction.id),
+    ).filter(Transaction.date.isnot(None)).group_by(Transaction.account_id, Transaction.category, day)
+    cleared = delete(SpendingRollup)
+    if account_id is not None:
+        query = query.filter(Transaction.account_id == account_id)
+        cleared = cleared.where(SpendingRollup.account_id == account_id)
+
+    def flush(totals: Dict[RollupKey, List[float]]) -> int:
+        rows = _rows(totals)
+        for start in range(0, len(rows), batch_size):
+            # Core executemany on the table: the ORM bulk path costs more than the insert itself
+            db.execute(insert(SpendingRollup.__table__), rows[start:start + batch_size])
+        totals.clear()
+        return len(rows)
+
+    try:
+        # Delete first: on SQLite this takes the write lock, so no transaction lands between read and write
+        db.execute(cleared)
+        totals: Dict[RollupKey, List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+        written, current_account = 0, None
+        # Ordered by account: an account's month rollups are complete once the next account starts,
+        # so memory is bounded by batch_size rather than the size of the history
+        for row_account_id, category, row_day, spent, received, count in \
+                query.order_by(Transaction.account_id).yield_per(batch_size):
+            if row_account_id != current_account:
+                if len(totals) >= batch_size:
+                    written += flush(totals)
+                current_account = row_account_id
+            # SQLite returns date() as text, PostgreSQL as a date
+            row_day = row_day if isinstance(row_day, date) else date.fromisoformat(row_day)
+            _accumulate(totals, row_account_id, category, row_day, spent or 0.0, received or 0.0, count)
+        written += flush(totals)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return written
+
+
+def ensure_spending_rollups(db: Session) -> int:
+    """Build the rollups once for a database that has transactions but no rollups yet (e.g. just upgraded)."""
+    if db.query(SpendingRollup.account_id).first() is not None or db.query(Transaction.id).first() is None:
+        return 0
+    written = rebuild_spending_rollups(db)
+    print(f"✅ Spending rollups built: {written} rows")
+    return written
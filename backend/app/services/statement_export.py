@@ -0,0 +1,64 @@
+"""
+Statement export
+Streams a checking account's transactions as CSV or JSON lines, one chunk per
+cursor batch, so an export of any size runs in constant memory.
+"""
+
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.services.banking_service import BankingService
+
+# Format -> media type
+STATEMENT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+STATEMENT_COLUMNS = ("id", "date", "description", "category", "amount")
+
+
+def format_csv(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(STATEMENT_COLUMNS)
+    writer.writerows((row.id, row.date.isoformat(), row.description, row.category, row.amount) for row in rows)
+    return buffer.getvalue()
+
+
+def format_jsonl(rows) -> str:
+    return "".join(
+        json.dumps({"id": row.id, "date": row.date.isoformat(), "description": row.description,
+                    "category": row.category, "amount": row.amount}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def iter_statement(user_id: int, fmt: str = "csv", start: Optional[date] = None, end: Optional[date] = None,
+                   batch_size: int = 1000, session_factory: Callable[[], Session] = SessionLocal) -> Iterator[str]:
+    """
+    Text chunks of the statement, oldest transaction first (CSV starts with a header row).
+
+    Opens its own session: a StreamingResponse keeps iterating after the request's
+    dependencies (and their session) have been closed.
+
+    Args:
+        fmt: "csv" or "jsonl"
+        start: First day included, None for no lower bound
+        end: Last day included, None for no upper bound
+        batch_size: Rows per cursor fetch and per chunk
+    """
+    if fmt not in STATEMENT_FORMATS:
+        raise ValueError(f"Unknown statement format: {fmt}")
+
+    with session_factory() as db:
+        if fmt == "csv":
+            yield format_csv([], header=True)
+        for rows in BankingService(db).iter_transactions(user_id, start, end, batch_size):
+            yield format_csv(rows) if fmt == "csv" else format_jsonl(rows)
@@ -1,7 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import delete, distinct, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models import Product, ShoppingList
-from typing import List, Optional
-from app.services.vector_search_service import get_vector_search_service
+from app.models import OrderLine, Product, ShoppingList
+from typing import Dict, List, Optional, Tuple
+from app.services.banking_service import BankingService
+from app.services.idempotency import claim_idempotency_key, complete_idempotency_key
+from app.services.hybrid_search import BM25Index, reciprocal_rank_fusion
+from app.services.product_catalog_cache import CachedProduct, get_product_catalog_cache, normalize_name
+from app.services.product_fts import ensure_product_fts, search_product_ids
+from app.services.vector_search_service import VectorSearchError, get_vector_search_service
+from app.utils.prices import parse_price
+
+# Process-wide BM25 index over SQLite products (name, description/brand, category), rebuilt
+# whenever the catalog changed: renamed or deleted products must not keep their old tokens.
+# Only used where FTS5 is unavailable.
+_product_index = BM25Index()
+_product_index_state: Optional[Tuple[int, int, int]] = None
+
+# Runs the vector leg of hybrid search while the lexical leg uses the DB session
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="store-search")
+
+# Minimum similarity for a vector hit to count as the product the user named
+VECTOR_MATCH_THRESHOLD = 0.6
+
+# Statement builders shared by StoreService and AsyncStoreService
+
+def cart_statement(user_id: int):
+    """Cart lines with their product, in one join (insertion order)."""
+    return select(
+        Product.name,
+        Product.price,
+        ShoppingList.quantity,
+        (Product.price * ShoppingList.quantity).label("total")
+    ).join(Product, Product.id == ShoppingList.product_id).where(
+        ShoppingList.user_id == user_id
+    ).order_by(ShoppingList.id)
+
+
+def cart_lines(rows) -> List[dict]:
+    return [
+        {"product_name": row.name, "price": row.price, "quantity": row.quantity, "total": row.total}
+        for row in rows
+    ]
+
+
+def cart_summary_statement(user_id: int):
+    """Cart totals aggregated in SQL: total amount, item count, line count and distinct products."""
+    return select(
+        func.coalesce(func.sum(Product.price * ShoppingList.quantity), 0.0).label("total"),
+        func.coalesce(func.sum(ShoppingList.quantity), 0).label("item_count"),
+        func.count(ShoppingList.id).label("line_count"),
+        func.count(distinct(ShoppingList.product_id)).label("product_count")
+    ).join(Product, Product.id == ShoppingList.product_id).where(
+        ShoppingList.user_id == user_id
+    )
+
 
 class StoreService:
     def __init__(self, db: Session):
@@ -10,65 +65,267 @@ class StoreService:
 
     def _sync_vector_product(self, vector_product: dict) -> Product:
         """Sync a vector product to SQLite if it doesn't exist."""
-        name = vector_product.get("name")
-        if not name:
-            return None
-            
-        # Check if exists
-        existing = self.db.query(Product).filter(Product.name == name).first()
-        if existing:
-            return existing
-            
-        # Parse price string "12,500 DT" -> 12.5
-        price_str = vector_product.get("price", "0")
-        try:
-            price = float(price_str.replace("DT", "").replace("TND", "").replace(",", ".").replace("Â", "").strip())
-        except:
-            price = 0.0
-
-        new_product = Product(
-            name=name,
-            price=price,
-            stock=100,  # Default stock
-            category=vector_product.get("category_folder", "General"),
-            description=f"Marque: {vector_product.get('brand', 'Inconnu')}"
-        )
-        self.db.add(new_product)
-        self.db.commit()
-        self.db.refresh(new_product)
-        return new_product
+        ids = self._sync_vector_products([vector_product])
+        return self.db.get(Product, ids[0]) if ids else None
+
+    def _sync_vector_products(self, vector_products: List[dict]) -> List[int]:
+        """
+        Returns:
+            Product IDs of the synced hits in hit order (hits without a name are skipped)
+        """
+        ids = self._sync_vector_product_ids(vector_products)
+        names = dict.fromkeys(p.get("name") for p in vector_products if p.get("name"))
+        return [ids[name] for name in names if name in ids]
+
+    def _sync_vector_product_ids(self, vector_products: List[dict]) -> Dict[str, int]:
+        """
+        Sync vector hits to SQLite in bulk: names are resolved with one IN query
+        (read per call, so a renamed or deleted product is never served from a stale map)
+        and missing products are inserted in a single transaction.
+
+        Returns:
+            {name: product id}
+        """
+        names = list(dict.fromkeys(p.get("name") for p in vector_products if p.get("name")))
+        if not names:
+            return {}
+        ids = self._product_ids(names)
+        missing = [name for name in names if name not in ids]
+        if missing:
+            hits_by_name = {p.get("name"): p for p in vector_products}
+            new_products = [
+                Product(
+                    name=name,
+                    # Parse price string "12,500 DT" -> 12.5
+                    price=parse_price(hits_by_name[name].get("price", "0")),
+                    stock=100,  # Default stock
+                    category=hits_by_name[name].get("category_folder", "General"),
+                    description=f"Marque: {hits_by_name[name].get('brand', 'Inconnu')}"
+                )
+                for name in missing
+            ]
+            try:
+                self.db.add_all(new_products)
+                self.db.flush()
+                inserted = {product.name: product.id for product in new_products}
+                self.db.commit()
+            except IntegrityError:
+                # Another worker inserted some of these names first: read back their IDs
+                self.db.rollback()
+                ids.update(self._product_ids(missing))
+            else:
+                ids.update(inserted)
+                get_product_catalog_cache().invalidate()
+        return ids
+
+    def _product_ids(self, names: List[str]) -> Dict[str, int]:
+        """IDs of the existing products with these names (one IN query on the unique name index)."""
+        rows = self.db.query(Product.name, Product.id).filter(Product.name.in_(names)).all()
+        return {row.name: row.id for row in rows}
+
+    def _fts_enabled(self) -> bool:
+        return ensure_product_fts(self.db.get_bind())
+
+    def _get_product_sql(self, product_name: str) -> Optional[Product]:
+        """Best-ranked FTS match ("pates" finds "Pâtes Fellah"), or the first ilike match without FTS."""
+        if self._fts_enabled():
+            ids = search_product_ids(self.db, product_name, limit=1)
+            return self.db.get(Product, ids[0]) if ids else None
+        return self.db.query(Product).filter(Product.name.ilike(f"%{product_name}%")).first()
 
-    def get_product(self, product_name: str) -> Optional[Product]:
+    def get_product(self, product_name: str, match_vector: bool = True) -> Optional[Product]:
         # Try SQL first
-        product = self.db.query(Product).filter(Product.name.ilike(f"%{product_name}%")).first()
-        if product:
+        product = self._get_product_sql(product_name)
+        if product or not match_vector:
             return product
             
         # Try Vector Search exact/close match
-        results = self.vector_service.search_by_text(product_name, limit=1)
-        if results and results[0]['score'] > 0.6: # Confidence threshold
+        results = self.vector_service.search_by_text(product_name, limit=1, raise_errors=True)
+        if results and results[0]['score'] > VECTOR_MATCH_THRESHOLD:
             return self._sync_vector_product(results[0])
             
         return None
 
-    def search_products(self, query: str) -> List[Product]:
-        # 1. SQL Search
-        sql_products = self.db.query(Product).filter(Product.name.ilike(f"%{query}%")).all()
-        
-        # 2. Vector Search
-        vector_results = self.vector_service.search_by_text(query, limit=5)
-        
-        # 3. Merge and Sync
-        for res in vector_results:
-            # Sync product to DB so it has an ID
-            db_prod = self._sync_vector_product(res)
-            if db_prod and db_prod.id not in [p.id for p in sql_products]:
-                sql_products.append(db_prod)
-                
-        return sql_products
+    def _refresh_lexical_index(self) -> BM25Index:
+        """
+        The BM25 index, rebuilt when the catalog cache version (product writes in this process)
+        or the product count / max id (writes by other workers) changed since the last build.
+        """
+        global _product_index, _product_index_state
+        count, max_id = self.db.query(func.count(Product.id), func.max(Product.id)).one()
+        # Version read before the rows: a write during the rebuild triggers another one
+        state = (get_product_catalog_cache().version, count, max_id or 0)
+        if state != _product_index_state:
+            index = BM25Index()
+            for row in self.db.query(Product.id, Product.name, Product.description, Product.category):
+                index.add(row.id, row.name, row.description or "", row.category or "")
+            # Searches in flight keep the index they started with
+            _product_index, _product_index_state = index, state
+        return _product_index
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        """Hybrid lexical + vector search; `limit` caps ranked results, an empty query lists the whole catalog."""
+        if not query.strip():
+            return self.db.query(Product).all()
+
+        # 1. Vector Search (in parallel, it does not touch the DB session)
+        vector_future = _search_executor.submit(self.vector_service.search_by_text, query, 5)
+
+        # 2. Lexical Search (BM25 over name, brand and category, accent-insensitive)
+        if self._fts_enabled():
+            lexical_ids = search_product_ids(self.db, query, limit, match_all=False)
+        else:
+            lexical_ids = [doc_id for doc_id, _ in self._refresh_lexical_index().search(query, limit)]
+
+        # 3. Sync vector hits so they have an ID, then fuse both rankings
+        try:
+            vector_results = vector_future.result()
+        except Exception as e:
+            print(f"Vector search error: {e}")
+            vector_results = []
+
+        vector_ids = self._sync_vector_products(vector_results)
+
+        fused_ids = [doc_id for doc_id, _ in reciprocal_rank_fusion([lexical_ids, vector_ids])][:limit]
+        if not fused_ids:
+            return []
+
+        products_by_id = {p.id: p for p in self.db.query(Product).filter(Product.id.in_(fused_ids)).all()}
+        return [products_by_id[doc_id] for doc_id in fused_ids if doc_id in products_by_id]
+
+    def find_product(self, product_name: str, match_vector: bool = True) -> Optional[CachedProduct]:
+        """
+        get_product() through the process-wide catalog cache (misses are cached too,
+        except when the vector search failed: that name is retried on the next call).
+
+        Args:
+            match_vector: False for products that must already be in SQLite (e.g. in a cart):
+                          no embedding or Qdrant call, and misses are not cached
+        """
+        cache = get_product_catalog_cache()
+        key = ("name", normalize_name(product_name))
+        found, product = cache.get(key)
+        if found and (product or match_vector):
+            return product
+
+        version = cache.version
+        try:
+            model = self.get_product(product_name, match_vector)
+        except VectorSearchError as e:
+            print(f"Vector search error: {e}")
+            return None
+        product = CachedProduct.from_model(model) if model else None
+        if product or match_vector:
+            cache.put(key, product, version)
+        if product:
+            cache.put(("id", product.id), product, version)
+        return product
+
+    def search_products_cached(self, query: str, limit: int = 20) -> List[CachedProduct]:
+        """search_products() through the catalog cache: the query maps to IDs, each ID to one product entry."""
+        cache = get_product_catalog_cache()
+        key = ("search", normalize_name(query), limit)
+        found, ids = cache.get(key)
+        if found:
+            products = [cache.get(("id", product_id)) for product_id in ids]
+            if all(hit for hit, _ in products):
+                return [product for _, product in products]
+
+        version = cache.version
+        products = [CachedProduct.from_model(p) for p in self.search_products(query, limit)]
+        for product in products:
+            cache.put(("id", product.id), product, version)
+        cache.put(key, [product.id for product in products], version)
+        return products
+
+    def find_products(self, product_names: List[str]) -> Dict[str, Optional[CachedProduct]]:
+        """
+        Resolve several product names at once: catalog cache, then SQL per name, then
+        one batched SigLIP forward + one Qdrant batch query for whatever is left.
+
+        Returns:
+            {product_name: product or None}
+        """
+        cache = get_product_catalog_cache()
+        version = cache.version
+        resolved: Dict[str, Optional[CachedProduct]] = {}
+        unresolved = []
+        lookup_failed = False
+        for name in dict.fromkeys(product_names):
+            found, product = cache.get(("name", normalize_name(name)))
+            if found:
+                resolved[name] = product
+                continue
+            model = self._get_product_sql(name)
+            if model:
+                resolved[name] = CachedProduct.from_model(model)
+            else:
+                unresolved.append(name)
+
+        if unresolved:
+            try:
+                vectors = self.vector_service.embed_texts(unresolved)
+                results = self.vector_service.search_by_vectors(vectors, limit=1, raise_errors=True)
+            except Exception as e:
+                print(f"Vector search error: {e}")
+                results = [[] for _ in unresolved]
+                lookup_failed = True
+            hits = {
+                name: hits[0] for name, hits in zip(unresolved, results)
+                if hits and hits[0].get("name") and (hits[0].get("score") or 0) > VECTOR_MATCH_THRESHOLD
+            }
+            synced = self._sync_vector_product_ids(list(hits.values()))
+            ids = {name: synced.get(hit["name"]) for name, hit in hits.items()}
+            products = {
+                p.id: CachedProduct.from_model(p)
+                for p in self.db.query(Product).filter(Product.id.in_([i for i in ids.values() if i]))
+            }
+            for name in unresolved:
+                resolved[name] = products.get(ids.get(name))
+
+        for name, product in resolved.items():
+            # A name the vector search could not look up is unknown, not a miss: retry it next time
+            if product is None and lookup_failed:
+                continue
+            cache.put(("name", normalize_name(name)), product, version)
+        return resolved
+
+    def add_many_to_cart(self, user_id: int, items: List[Tuple[str, int]]) -> Dict[str, List[str]]:
+        """
+        Add several (product_name, quantity) pairs to the cart in one transaction.
+
+        Returns:
+            {"added": [product names as stored], "not_found": [requested names]}
+        """
+        products = self.find_products([name for name, _ in items])
+        quantities: Dict[int, int] = {}
+        added, not_found = [], []
+        for name, quantity in items:
+            product = products.get(name)
+            if product is None:
+                not_found.append(name)
+                continue
+            quantities[product.id] = quantities.get(product.id, 0) + quantity
+            added.append(product.name)
+
+        if quantities:
+            existing = {
+                item.product_id: item
+                for item in self.db.query(ShoppingList).filter(
+                    ShoppingList.user_id == user_id,
+                    ShoppingList.product_id.in_(quantities.keys())
+                )
+            }
+            for product_id, quantity in quantities.items():
+                if product_id in existing:
+                    existing[product_id].quantity += quantity
+                else:
+                    self.db.add(ShoppingList(user_id=user_id, product_id=product_id, quantity=quantity))
+            self.db.commit()
+        return {"added": added, "not_found": not_found}
 
     def add_to_cart(self, user_id: int, product_name: str, quantity: int = 1) -> bool:
-        product = self.get_product(product_name)
+        product = self.find_product(product_name)
         if not product:
             return False
         
@@ -88,7 +345,8 @@ class StoreService:
         return True
 
     def remove_from_cart(self, user_id: int, product_name: str) -> bool:
-        product = self.get_product(product_name)
+        # A product in the cart is in SQLite: no vector lookup
+        product = self.find_product(product_name, match_vector=False)
         if not product:
             return False
             
@@ -109,41 +367,160 @@ class StoreService:
         return True
 
     def get_cart(self, user_id: int) -> List[dict]:
-        items = self.db.query(ShoppingList).filter(ShoppingList.user_id == user_id).all()
-        result = []
-        for item in items:
-            product = self.db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                result.append({
-                    "product_name": product.name,
-                    "price": product.price,
-                    "quantity": item.quantity,
-                    "total": product.price * item.quantity
-                })
-        return result
+        return cart_lines(self.db.execute(cart_statement(user_id)).all())
+
+    def get_cart_summary(self, user_id: int) -> dict:
+        """Cart totals aggregated in SQL: total amount, item count and line count."""
+        return self.db.execute(cart_summary_statement(user_id)).one()._asdict()
 
     def calculate_cart_total(self, user_id: int) -> float:
-        cart = self.get_cart(user_id)
-        return sum(item["total"] for item in cart)
-
-    def checkout(self, user_id: int, banking_service) -> str:
-        # 1. Calculate Total
-        total_amount = self.calculate_cart_total(user_id)
-        if total_amount <= 0:
-            return "Votre panier est vide."
-
-        # 2. Process Payment
-        cart_items = self.get_cart(user_id)
-        item_count = sum(item['quantity'] for item in cart_items)
-        description = f"Achat magasin ({item_count} articles)"
-        
-        success = banking_service.process_payment(user_id, total_amount, description)
-        
-        if not success:
-            return f"Paiement refusé. Solde insuffisant ({total_amount} TND requis)."
+        return self.get_cart_summary(user_id)["total"]
 
-        # 3. Clear Cart
-        self.db.query(ShoppingList).filter(ShoppingList.user_id == user_id).delete()
-        self.db.commit()
-        
-        return f"Paiement de {total_amount} TND accepté. Merci pour votre achat !"
+    def checkout(self, user_id: int, banking_service, idempotency_key: Optional[str] = None) -> str:
+        return self.checkout_with_status(user_id, banking_service, idempotency_key)[1]
+
+    def checkout_with_status(self, user_id: int, banking_service,
+                             idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Pay for the cart in a single transaction: reserve stock, debit the balance,
+        record the payment and the order lines and empty the cart, or change nothing at all.
+
+        The cart lines are read once under the write lock (BEGIN IMMEDIATE on SQLite,
+        FOR UPDATE elsewhere), and the total, the stock reservation and the deletion all
+        come from that set: a cart edited during checkout is never charged for one
+        quantity and reserved for another. Stock and balance are only modified through
+        conditional UPDATEs (stock >= quantity, balance >= total), so concurrent
+        checkouts cannot oversell or overdraw. A retried request with the same idempotency key
+        returns the first response without paying twice.
+
+        Args:
+            banking_service: BankingService bound to the same session
+            idempotency_key: Client-generated key (e.g. the Idempotency-Key header)
+
+        Returns:
+            (success, message)
+        """
+        try:
+            # Lock first: the lines read below are exactly the ones charged, reserved and deleted
+            self._begin_write()
+            if idempotency_key:
+                replay = claim_idempotency_key(self.db, idempotency_key, user_id, "checkout")
+                if replay is not None:
+                    self.db.rollback()  # Release the write lock
+                    return True, replay
+
+            # 1. Calculate Total from the locked cart lines
+            lines = self._lock_cart_lines(user_id)
+            total_amount = round(sum(line.price * line.quantity for line in lines), 3)  # TND: millimes
+            if total_amount <= 0:
+                self.db.rollback()
+                return False, "Votre panier est vide."
+
+            # 2. Reserve stock for every product, all or nothing
+            quantities: Dict[int, int] = {}
+            names: Dict[int, str] = {}
+            prices: Dict[int, float] = {}
+            for line in lines:
+                quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+                names[line.product_id] = line.name
+                prices[line.product_id] = line.price
+            missing = [names[product_id] for product_id, quantity in quantities.items()
+                       if not self._reserve_stock(product_id, quantity)]
+            if missing:
+                self.db.rollback()
+                return False, f"Stock insuffisant pour : {', '.join(missing)}."
+
+            # 3. Process Payment (same transaction)
+            description = f"Achat magasin ({sum(quantities.values())} articles)"
+            if not banking_service.process_payment(user_id, total_amount, description, commit=False):
+                self.db.rollback()
+                return False, f"Paiement refusé. Solde insuffisant ({total_amount} TND requis)."
+
+            # 4. Record what was bought, then clear the paid lines (a line added meanwhile stays in the cart)
+            self.db.execute(insert(OrderLine), [
+                {"user_id": user_id, "product_id": product_id, "quantity": quantity, "unit_price": prices[product_id]}
+                for product_id, quantity in quantities.items()
+            ])
+            self.db.execute(
+                delete(ShoppingList)
+                .where(ShoppingList.id.in_([line.id for line in lines]))
+                .execution_options(synchronize_session=False)
+            )
+
+            message = f"Paiement de {total_amount} TND accepté. Merci pour votre achat !"
+            if idempotency_key:
+                complete_idempotency_key(self.db, idempotency_key, message)
+            self.db.commit()
+            get_product_catalog_cache().invalidate()  # Stock changed
+            return True, message
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _begin_write(self):
+        """
+        Take the write lock before the first read of the transaction.
+
+        pysqlite only sends BEGIN before the first INSERT/UPDATE/DELETE, so reads before
+        it see a cart that may change before the writes: start with BEGIN IMMEDIATE instead.
+        Other databases lock the rows read (see _lock_cart_lines).
+        """
+        connection = self.db.connection()
+        if connection.dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _lock_cart_lines(self, user_id: int):
+        """Cart lines with their product, locked until the end of the transaction (FOR UPDATE)."""
+        return self.db.execute(
+            select(ShoppingList.id, ShoppingList.product_id, ShoppingList.quantity, Product.price, Product.name)
+            .join(Product, Product.id == ShoppingList.product_id)
+            .where(ShoppingList.user_id == user_id)
+            .order_by(ShoppingList.product_id)  # Same lock order in every checkout
+            .with_for_update()
+        ).all()
+
+    def _reserve_stock(self, product_id: int, quantity: int) -> bool:
+        """Decrement stock if enough is left (one conditional UPDATE)."""
+        result = self.db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+
+class AsyncStoreService:
+    """
+    StoreService for async endpoints. Cart reads and clearing run on the AsyncSession;
+    checkout and removal run the sync implementation through run_sync (database work
+    only). Flows that may embed text or query Qdrant (add to cart, search) have no
+    async variant: their endpoints stay sync and run in the threadpool.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_cart(self, user_id: int) -> List[dict]:
+        return cart_lines((await self.db.execute(cart_statement(user_id))).all())
+
+    async def get_cart_summary(self, user_id: int) -> dict:
+        return (await self.db.execute(cart_summary_statement(user_id))).one()._asdict()
+
+    async def calculate_cart_total(self, user_id: int) -> float:
+        return (await self.get_cart_summary(user_id))["total"]
+
+    async def clear_cart(self, user_id: int) -> bool:
+        await self.db.execute(delete(ShoppingList).where(ShoppingList.user_id == user_id))
+        await self.db.commit()
+        return True
+
+    async def remove_from_cart(self, user_id: int, product_name: str) -> bool:
+        return await self.db.run_sync(lambda session: StoreService(session).remove_from_cart(user_id, product_name))
+
+    async def checkout_with_status(self, user_id: int, idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """See StoreService.checkout_with_status."""
+        def checkout(session: Session) -> Tuple[bool, str]:
+            return StoreService(session).checkout_with_status(user_id, BankingService(session), idempotency_key)
+
+        return await self.db.run_sync(checkout)
@@ -0,0 +1,154 @@
+"""
+ThumbnailService - Product image lookup and WebP thumbnails
+Image locations are resolved once into an index; thumbnails live in a content-addressed cache
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+# Folders laid out as {root}/{category_folder}/images/{image_file}, first match wins
+PRODUCT_IMAGE_ROOTS = [
+    path for path in os.getenv(
+        "PRODUCT_IMAGE_ROOTS",
+        os.pathsep.join([
+            os.path.join(BACKEND_DIR, "data"),
+            "d:/EspritMaratech2026-Barons-omar/data",
+            "d:/BaronsMarket",
+        ])
+    ).split(os.pathsep) if path
+]
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", os.path.join(BACKEND_DIR, "data", ".thumbnails"))
+THUMBNAIL_WIDTHS = (128, 256, 512)
+THUMBNAIL_QUALITY = 80
+
+
+class ThumbnailService:
+    """Resolves product images and serves cached WebP thumbnails at fixed widths."""
+
+    def __init__(self, roots: List[str] = PRODUCT_IMAGE_ROOTS, cache_dir: str = THUMBNAIL_CACHE_DIR):
+        self.roots = roots
+        self.cache_dir = cache_dir
+        self._index: Optional[Dict[Tuple[str, str], str]] = None
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _build_index(self) -> Dict[Tuple[str, str], str]:
+        """Scan every root once: (category_folder, image_file) -> absolute path."""
+        index: Dict[Tuple[str, str], str] = {}
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            for category_folder in os.listdir(root):
+                images_dir = os.path.join(root, category_folder, "images")
+                if not os.path.isdir(images_dir):
+                    continue
+                for image_file in os.listdir(images_dir):
+                    index.setdefault((category_folder, image_file), os.path.join(images_dir, image_file))
+        return index
+
+    def index(self) -> Dict[Tuple[str, str], str]:
+        """The image index, built on first use."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+                    print(f"✅ Product image index built: {len(self._index)} images")
+        return self._index
+
+    def resolve(self, category_folder: str, image_file: str) -> Optional[str]:
+        """Path of a product image, or None. Images added after startup are found on first request."""
+        key = (category_folder, image_file)
+        path = self.index().get(key)
+        if path is not None:
+            return path
+
+        # Reject anything that could escape the images folder
+        if os.path.basename(category_folder) != category_folder or os.path.basename(image_file) != image_file:
+            return None
+        for root in self.roots:
+            candidate = os.path.join(root, category_folder, "images", image_file)
+            if os.path.isfile(candidate):
+                self._index[key] = candidate
+                return candidate
+        return None
+
+    def forget(self, category_folder: str, image_file: str):
+        """Drop an index entry whose file disappeared."""
+        if self._index is not None:
+            self._index.pop((category_folder, image_file), None)
+
+    def digest(self, path: str) -> str:
+        """SHA-256 of the image content, memoized on (mtime, size)."""
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def thumbnail_path(self, digest: str, width: int) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{width}.webp")
+
+    def get_thumbnail(self, source_path: str, width: int) -> Tuple[str, str]:
+        """
+        Thumbnail of an image, generated on first access.
+
+        Args:
+            source_path: Original image (from resolve())
+            width: One of THUMBNAIL_WIDTHS
+
+        Returns:
+            (thumbnail_path, etag)
+        """
+        if width not in THUMBNAIL_WIDTHS:
+            raise ValueError(f"Unsupported thumbnail width {width}, expected one of {THUMBNAIL_WIDTHS}")
+
+        digest = self.digest(source_path)
+        path = self.thumbnail_path(digest, width)
+        if not os.path.exists(path):
+            render_thumbnail(source_path, path, width)
+        return path, f'"{digest}-{width}"'
+
+
+def render_thumbnail(source_path: str, target_path: str, width: int):
+    """Write a WebP thumbnail (never upscaled) atomically to target_path."""
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with Image.open(source_path) as image:
+        # JPEG draft mode decodes directly at a reduced scale
+        image.draft("RGB", (width, width))
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+    os.replace(tmp_path, target_path)
+
+
+# Singleton instance for reuse
+_thumbnail_service: Optional[ThumbnailService] = None
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Get or create the thumbnail service singleton."""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        _thumbnail_service = ThumbnailService()
+    return _thumbnail_service
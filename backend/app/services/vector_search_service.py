@@ -3,8 +3,12 @@ VectorSearchService - Semantic product search using Qdrant + SigLIP
 Uses pre-ingested product embeddings from BaronsMarket
 """
 
+import asyncio
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,23 +18,108 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)
 QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "products")
 MODEL_PATH = os.getenv("MODEL_PATH", "google/siglip-so400m-patch14-384")
 
+# Numeric price stored next to the "12,500 DT" payload string, and the indexed payload fields
+PRICE_VALUE_FIELD = "price_value"
+PAYLOAD_INDEXES = {"category_folder": "KEYWORD", "brand": "KEYWORD", PRICE_VALUE_FIELD: "FLOAT"}
+
+# Vector storage: scalar (int8, 4x smaller) or binary (1 bit/dim, 32x smaller) quantized copies
+# kept in RAM, originals optionally on disk and only read to rescore the oversampled candidates
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() in ("1", "true", "yes")
+QDRANT_RESCORE_OVERSAMPLING = float(os.getenv("QDRANT_RESCORE_OVERSAMPLING", "2.0"))
+QUANTIZATION_OPTIONS = ("none", "scalar", "binary")
+
+# Local snapshot of the collection (see app/services/vector_snapshot.py)
+# off: never used | fallback: used when Qdrant fails | primary: always used, Qdrant only for refresh
+VECTOR_SNAPSHOT_PATH = os.getenv("VECTOR_SNAPSHOT_PATH", "")
+VECTOR_SNAPSHOT_MODE = os.getenv("VECTOR_SNAPSHOT_MODE", "fallback")
+VECTOR_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("VECTOR_SNAPSHOT_REFRESH_SECONDS", "600"))
+
+# In-memory payload catalog for listing/sorting (see app/services/payload_catalog.py)
+VECTOR_PAYLOAD_CATALOG = os.getenv("VECTOR_PAYLOAD_CATALOG", "false").lower() in ("1", "true", "yes")
+VECTOR_CATALOG_REFRESH_SECONDS = float(os.getenv("VECTOR_CATALOG_REFRESH_SECONDS", "300"))
+
+
+def payload_to_product(payload: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
+    """Map a Qdrant payload to the product dictionary returned by the API."""
+    product = {
+        "product_id": payload.get("product_id"),
+        "name": payload.get("name"),
+        "brand": payload.get("brand"),
+        "price": payload.get("price"),
+        "image_file": payload.get("image_file"),
+        "category_folder": payload.get("category_folder")
+    }
+    if score is not None:
+        product["score"] = score
+    return product
+
+
+def build_quantization_config(quantization: str = QDRANT_QUANTIZATION):
+    """Qdrant quantization config for "scalar" or "binary" (None for "none")."""
+    from qdrant_client import models
+    
+    if quantization not in QUANTIZATION_OPTIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATION_OPTIONS}")
+    if quantization == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+        ))
+    if quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def build_search_params(quantization: str = QDRANT_QUANTIZATION, oversampling: float = QDRANT_RESCORE_OVERSAMPLING):
+    """Default search params: rescore oversampled candidates with the original vectors when quantized."""
+    if quantization == "none":
+        return None
+    
+    from qdrant_client import models
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=True, oversampling=oversampling
+    ))
+
+
+class VectorSearchError(Exception):
+    """Qdrant could not be queried and no local snapshot answered instead (raised with raise_errors=True)."""
+
 
 class VectorSearchService:
     """Service for semantic product search using Qdrant vector database."""
     
-    def __init__(self, lazy_load: bool = True):
+    def __init__(self, lazy_load: bool = True, client=None, collection_name: str = QDRANT_COLLECTION_NAME,
+                 snapshot_path: str = VECTOR_SNAPSHOT_PATH):
         """
         Initialize the vector search service.
         
         Args:
             lazy_load: If True, load ML model only when first search is performed.
                       This speeds up server startup.
+            client: Existing QdrantClient (e.g. QdrantClient(":memory:") in benchmarks)
+            collection_name: Collection to search and maintain
+            snapshot_path: Local snapshot directory ("" to never use one)
         """
+        self.collection_name = collection_name
+        self.snapshot_path = snapshot_path
+        self._search_params = build_search_params()
         self._model = None
         self._processor = None
-        self._client = None
+        self._client = client
         self._device = None
         self._lazy_load = lazy_load
+        self._snapshot = None
+        self._snapshot_checked = False
+        self._snapshot_lock = threading.Lock()
+        self._catalog = None
+        self._catalog_lock = threading.Lock()
+        
+        # Single-flight initialization: concurrent first requests wait on one load
+        self._client_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self._warmup_future: Optional[Future] = None
+        self._warmup_error: Optional[str] = None
         
         if not lazy_load:
             self._initialize()
@@ -39,37 +128,138 @@ class VectorSearchService:
         """Initialize Qdrant client and optionally load ML model."""
         from qdrant_client import QdrantClient
         
-        self._client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-        print(f"✅ Connected to Qdrant: {QDRANT_URL}")
+        with self._client_lock:
+            if self._client is not None:
+                return
+            self._client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+            print(f"✅ Connected to Qdrant: {QDRANT_URL}")
     
     def _load_model(self):
-        """Load SigLIP model for embedding generation (lazy loading)."""
+        """Load SigLIP model for embedding generation (lazy loading, once per process)."""
         if self._model is not None:
             return
-            
-        import torch
-        from transformers import SiglipModel, SiglipProcessor
-        
-        self._device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading model: {MODEL_PATH} on {self._device}...")
         
-        token = os.getenv("HF_TOKEN")
-        self._model = SiglipModel.from_pretrained(MODEL_PATH, token=token).to(self._device)
-        self._processor = SiglipProcessor.from_pretrained(MODEL_PATH, token=token)
-        print(f"✅ Model loaded on {self._device}")
+        with self._model_lock:
+            if self._model is not None:
+                return
+            
+            import torch
+            from transformers import SiglipModel, SiglipProcessor
+            
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"Loading model: {MODEL_PATH} on {device}...")
+            
+            token = os.getenv("HF_TOKEN")
+            model = SiglipModel.from_pretrained(MODEL_PATH, token=token).to(device)
+            processor = SiglipProcessor.from_pretrained(MODEL_PATH, token=token)
+            
+            # Publish the model last: other threads test _model without the lock
+            self._device = device
+            self._processor = processor
+            self._model = model
+            print(f"✅ Model loaded on {self._device}")
     
     def _ensure_initialized(self):
         """Ensure client is initialized."""
         if self._client is None:
             self._initialize()
     
+    def warmup(self):
+        """
+        Connect to Qdrant, load the model and the optional snapshot/catalog now,
+        instead of on the first search. Safe to call from several threads at once.
+        """
+        self._ensure_initialized()
+        self._load_model()
+        self._get_snapshot()
+        self._get_catalog()
+    
+    async def warmup_async(self):
+        """
+        Asyncio-friendly warmup: runs warmup() in one background thread and lets
+        any number of coroutines await that same load without blocking the loop.
+        """
+        with self._warmup_lock:
+            if self._warmup_future is None or (self._warmup_future.done() and self._warmup_future.exception()):
+                self._warmup_error = None
+                self._warmup_future = Future()
+                threading.Thread(target=self._run_warmup, args=(self._warmup_future,), daemon=True).start()
+            future = self._warmup_future
+        await asyncio.wrap_future(future)
+    
+    def _run_warmup(self, future: Future):
+        try:
+            self.warmup()
+            future.set_result(True)
+        except Exception as e:
+            print(f"Warmup error: {e}")
+            self._warmup_error = str(e)
+            future.set_exception(e)
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once the Qdrant client and the embedding model are loaded."""
+        return self._client is not None and self._model is not None
+    
+    def status(self) -> Dict[str, Any]:
+        """Readiness report for the health endpoint (never triggers a load)."""
+        return {
+            "ready": self.is_ready,
+            "model_loaded": self._model is not None,
+            "client_initialized": self._client is not None,
+            "warming_up": self._warmup_future is not None and not self._warmup_future.done(),
+            "snapshot_points": len(self._snapshot) if self._snapshot is not None else None,
+            "error": self._warmup_error,
+        }
+    
+    def get_client(self):
+        """Qdrant client, connected on first use (for scripts and maintenance tasks)."""
+        self._ensure_initialized()
+        return self._client
+    
+    def _get_snapshot(self):
+        """Load the local vector snapshot once, if one is configured."""
+        if not self._snapshot_checked:
+            with self._snapshot_lock:
+                if not self._snapshot_checked:
+                    if VECTOR_SNAPSHOT_MODE != "off" and self.snapshot_path and os.path.isdir(self.snapshot_path):
+                        from app.services.vector_snapshot import VectorSnapshot
+                        try:
+                            self._snapshot = VectorSnapshot.load(self.snapshot_path)
+                            print(f"✅ Vector snapshot loaded: {len(self._snapshot)} points from {self.snapshot_path}")
+                        except Exception as e:
+                            print(f"Snapshot load error: {e}")
+                    self._snapshot_checked = True
+        
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.is_stale(VECTOR_SNAPSHOT_REFRESH_SECONDS):
+            snapshot.loaded_at = float("inf")  # Only one refresh per period
+            threading.Thread(target=self._refresh_snapshot, args=(snapshot,), daemon=True).start()
+        return snapshot
+    
+    def _refresh_snapshot(self, snapshot):
+        """Apply a Qdrant delta to the snapshot (runs in a background thread)."""
+        try:
+            self._ensure_initialized()
+            refreshed = snapshot.refresh(self._client, self.collection_name)
+            if refreshed is not None:
+                self._snapshot = refreshed
+        except Exception as e:
+            print(f"Snapshot refresh error: {e}")
+            snapshot.loaded_at = time.monotonic()  # Retry next period
+    
     def _get_text_embedding(self, text: str) -> List[float]:
         """Generate embedding for text query."""
+        embeddings = self.embed_texts([text])
+        return embeddings[0] if embeddings else []
+    
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Generate normalized embeddings for a batch of texts (one forward pass)."""
         import torch
         
         self._load_model()
         
-        inputs = self._processor(text=[text], padding="max_length", return_tensors="pt")
+        inputs = self._processor(text=texts, padding="max_length", return_tensors="pt")
         inputs = {k: v.to(self._device) for k, v in inputs.items()}
         
         with torch.no_grad():
@@ -100,20 +290,26 @@ class VectorSearchService:
             # Normalize
             if embedding is not None and hasattr(embedding, 'norm'):
                 embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-                return embedding.cpu().numpy()[0].tolist()
+                return embedding.cpu().numpy().tolist()
             
             return []
     
     def _get_image_embedding(self, image_bytes: bytes) -> List[float]:
         """Generate embedding for image query."""
-        import torch
         from PIL import Image
         import io
         
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        embeddings = self.embed_images([image])
+        return embeddings[0] if embeddings else []
+    
+    def embed_images(self, images: List[Any]) -> List[List[float]]:
+        """Generate normalized embeddings for a batch of RGB PIL images (one forward pass)."""
+        import torch
+        
         self._load_model()
         
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        inputs = self._processor(images=[image], padding="max_length", return_tensors="pt")
+        inputs = self._processor(images=images, padding="max_length", return_tensors="pt")
         inputs = {k: v.to(self._device) for k, v in inputs.items()}
         
         with torch.no_grad():
@@ -144,123 +340,471 @@ class VectorSearchService:
             # Normalize
             if embedding is not None and hasattr(embedding, 'norm'):
                 embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-                return embedding.cpu().numpy()[0].tolist()
+                return embedding.cpu().numpy().tolist()
             
             return []
     
-    def search_by_text(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_by_text(self, query: str, limit: int = 10, raise_errors: bool = False, **filters) -> List[Dict[str, Any]]:
         """
         Search products by text query using semantic similarity.
         
         Args:
             query: Text search query (e.g., "tomato sauce", "chocolate")
             limit: Maximum number of results to return
+            raise_errors: Raise VectorSearchError when Qdrant fails instead of returning []
+                          (for callers that must not take an outage for "no match")
+            **filters: category_folder, brand, min_price, max_price (pushed down to Qdrant)
             
         Returns:
             List of product dictionaries with name, brand, price, score, etc.
         """
         self._ensure_initialized()
         embedding = self._get_text_embedding(query)
-        return self._search(embedding, limit)
+        return self._search(embedding, limit, filters, raise_errors=raise_errors)
     
-    def search_by_image(self, image_bytes: bytes, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_by_image(self, image_bytes: bytes, limit: int = 10, **filters) -> List[Dict[str, Any]]:
         """
         Search products by image using visual similarity.
         
         Args:
             image_bytes: Raw image bytes
             limit: Maximum number of results to return
+            **filters: category_folder, brand, min_price, max_price (pushed down to Qdrant)
             
         Returns:
             List of product dictionaries with name, brand, price, score, etc.
         """
         self._ensure_initialized()
         embedding = self._get_image_embedding(image_bytes)
-        return self._search(embedding, limit)
+        return self._search(embedding, limit, filters)
+
+    def search_by_images(self, images: List[Any], limit: int = 10, **filters) -> List[List[Dict[str, Any]]]:
+        """
+        Search products for several already decoded PIL images at once.
+
+        Args:
+            images: PIL images (one SigLIP forward pass for all of them)
+            limit: Maximum number of results per image
+            **filters: category_folder, brand, min_price, max_price (pushed down to Qdrant)
+
+        Returns:
+            One result list per image, in input order
+        """
+        if not images:
+            return []
+        self._ensure_initialized()
+        return self.search_by_vectors(self.embed_images(images), limit, **filters)
+
+    def search_by_vectors(self, query_vectors: List[List[float]], limit: int = 10, search_params=None,
+                          raise_errors: bool = False, **filters) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches in a single Qdrant request (one result list per vector).
+
+        Args:
+            raise_errors: Raise VectorSearchError when Qdrant fails instead of returning empty lists
+        """
+        self._ensure_initialized()
+        filters = {k: v for k, v in filters.items() if v is not None}
+        snapshot = self._get_snapshot()
+        if not hasattr(self._client, "query_batch_points") or (snapshot is not None and VECTOR_SNAPSHOT_MODE == "primary"):
+            return [self._search(vector, limit, filters, search_params, raise_errors) for vector in query_vectors]
+
+        from qdrant_client import models
+
+        query_filter = self._build_filter(**filters)
+        if search_params is None:
+            search_params = self._search_params
+        try:
+            responses = self._client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(query=vector, filter=query_filter, params=search_params, limit=limit, with_payload=True)
+                    for vector in query_vectors
+                ]
+            )
+        except Exception as e:
+            print(f"Batch search error: {e}")
+            return [self._search(vector, limit, filters, search_params, raise_errors) for vector in query_vectors]
+
+        return [[payload_to_product(hit.payload, hit.score) for hit in response.points] for response in responses]
+
+    def search_by_vector(self, query_vector: List[float], limit: int = 10, search_params=None, **filters) -> List[Dict[str, Any]]:
+        """
+        Search with a precomputed embedding.
+        
+        Args:
+            query_vector: Normalized embedding (same space as the collection)
+            limit: Maximum number of results to return
+            search_params: Optional qdrant_client.models.SearchParams (hnsw_ef, exact, quantization)
+            **filters: category_folder, brand, min_price, max_price (pushed down to Qdrant)
+            
+        Returns:
+            List of product dictionaries with name, brand, price, score, etc.
+        """
+        self._ensure_initialized()
+        return self._search(query_vector, limit, filters, search_params)
     
-    def _search(self, query_vector: List[float], limit: int) -> List[Dict[str, Any]]:
-        """Execute search against Qdrant."""
+    def _search(self, query_vector: List[float], limit: int, filters: Optional[Dict[str, Any]] = None,
+                search_params=None, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Execute search against the local snapshot or Qdrant."""
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        snapshot = self._get_snapshot()
+        if snapshot is not None and VECTOR_SNAPSHOT_MODE == "primary":
+            return [payload_to_product(payload, score) for payload, score in snapshot.search(query_vector, limit, **filters)]
+        
+        query_filter = self._build_filter(**filters)
+        if search_params is None:
+            search_params = self._search_params
         try:
             # Try modern API first
             if hasattr(self._client, "query_points"):
                 results = self._client.query_points(
-                    collection_name=QDRANT_COLLECTION_NAME,
+                    collection_name=self.collection_name,
                     query=query_vector,
+                    query_filter=query_filter,
+                    search_params=search_params,
                     limit=limit
                 ).points
             else:
                 # Fallback to older API
                 results = self._client.search(
-                    collection_name=QDRANT_COLLECTION_NAME,
+                    collection_name=self.collection_name,
                     query_vector=query_vector,
+                    query_filter=query_filter,
+                    search_params=search_params,
                     limit=limit
                 )
         except Exception as e:
             print(f"Search error: {e}")
+            if snapshot is not None:
+                return [payload_to_product(payload, score) for payload, score in snapshot.search(query_vector, limit, **filters)]
+            if raise_errors:
+                raise VectorSearchError(str(e)) from e
             return []
         
-        products = []
-        for hit in results:
-            payload = hit.payload
-            products.append({
-                "product_id": payload.get("product_id"),
-                "name": payload.get("name"),
-                "brand": payload.get("brand"),
-                "price": payload.get("price"),
-                "image_file": payload.get("image_file"),
-                "category_folder": payload.get("category_folder"),
-                "score": hit.score
-            })
-        
-        return products
-    
-    def get_all_products(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        return [payload_to_product(hit.payload, hit.score) for hit in results]
+    
+    def _get_catalog(self):
+        """Load the in-memory payload catalog on first use, if enabled."""
+        if not VECTOR_PAYLOAD_CATALOG:
+            return None
+        
+        if self._catalog is None:
+            with self._catalog_lock:
+                if self._catalog is None:
+                    from app.services.payload_catalog import PayloadCatalog
+                    self._ensure_initialized()
+                    catalog = PayloadCatalog()
+                    try:
+                        catalog.load(self._client, self.collection_name)
+                    except Exception as e:
+                        print(f"Catalog load error: {e}")
+                        return None
+                    print(f"✅ Payload catalog loaded: {len(catalog)} products")
+                    self._catalog = catalog
+        elif self._catalog.is_stale(VECTOR_CATALOG_REFRESH_SECONDS):
+            self._catalog.loaded_at = float("inf")  # Only one refresh per period
+            threading.Thread(target=self._refresh_catalog, daemon=True).start()
+        return self._catalog
+    
+    def get_payload_catalog(self):
+        """The in-memory payload catalog, or None when disabled or unavailable."""
+        return self._get_catalog()
+    
+    def _refresh_catalog(self):
+        """Apply a Qdrant ID delta to the payload catalog (runs in a background thread)."""
+        try:
+            changed = self._catalog.refresh(self._client, self.collection_name)
+            if changed:
+                print(f"✅ Payload catalog refreshed: {changed} points changed")
+        except Exception as e:
+            print(f"Catalog refresh error: {e}")
+            self._catalog.loaded_at = time.monotonic()  # Retry next period
+    
+    @staticmethod
+    def _build_filter(category_folder: Optional[str] = None, brand: Optional[str] = None,
+                      min_price: Optional[float] = None, max_price: Optional[float] = None):
+        """Qdrant payload filter for the given constraints (None when unconstrained)."""
+        from qdrant_client import models
+        
+        conditions = []
+        if category_folder:
+            conditions.append(models.FieldCondition(key="category_folder", match=models.MatchValue(value=category_folder)))
+        if brand:
+            conditions.append(models.FieldCondition(key="brand", match=models.MatchValue(value=brand)))
+        if min_price is not None or max_price is not None:
+            conditions.append(models.FieldCondition(key=PRICE_VALUE_FIELD, range=models.Range(gte=min_price, lte=max_price)))
+        return models.Filter(must=conditions) if conditions else None
+    
+    def ensure_collection(self, vector_size: int, quantization: str = QDRANT_QUANTIZATION,
+                          on_disk: bool = QDRANT_VECTORS_ON_DISK, collection_name: Optional[str] = None):
+        """
+        Create the products collection (cosine distance) if it does not exist yet.
+        
+        Args:
+            vector_size: Embedding dimension (1152 for SigLIP so400m)
+            quantization: "none", "scalar" or "binary"
+            on_disk: Keep the original float32 vectors on disk (quantized copies stay in RAM)
+            collection_name: Another collection to create (defaults to this service's)
+        """
+        from qdrant_client import models
+        
+        self._ensure_initialized()
+        collection_name = collection_name or self.collection_name
+        if self._client.collection_exists(collection_name):
+            return
+        self._client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=on_disk),
+            quantization_config=build_quantization_config(quantization)
+        )
+        print(f"✅ Collection created: {collection_name} (dim={vector_size}, quantization={quantization}, on_disk={on_disk})")
+    
+    def get_vector_config(self, collection_name: Optional[str] = None) -> Dict[str, Any]:
+        """Size, point count, quantization and on_disk setting of a collection."""
+        self._ensure_initialized()
+        info = self._client.get_collection(collection_name or self.collection_name)
+        vectors = info.config.params.vectors
+        quantization = info.config.quantization_config
+        if quantization is None:
+            kind = "none"
+        elif getattr(quantization, "binary", None) is not None:
+            kind = "binary"
+        else:
+            kind = "scalar"
+        return {
+            "size": vectors.size,
+            "points_count": info.points_count or 0,
+            "quantization": kind,
+            "on_disk": bool(vectors.on_disk),
+        }
+    
+    def migrate_collection(self, quantization: str, on_disk: bool, target: Optional[str] = None,
+                           batch_size: int = 256) -> str:
+        """
+        Apply a quantization/on_disk setting to an existing collection.
+        
+        Args:
+            quantization: "none", "scalar" or "binary"
+            on_disk: Keep the original vectors on disk
+            target: None to update the collection in place (Qdrant rebuilds the quantized
+                    segments in the background), or the name of a new collection to copy into
+            batch_size: Points per scroll/upsert request when copying
+            
+        Returns:
+            Name of the migrated collection
+        """
+        from qdrant_client import models
+        
+        self._ensure_initialized()
+        if target is None:
+            self._client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": models.VectorParamsDiff(on_disk=on_disk)},
+                quantization_config=build_quantization_config(quantization) or models.Disabled.DISABLED
+            )
+            print(f"✅ Collection updated: {self.collection_name} (quantization={quantization}, on_disk={on_disk})")
+            return self.collection_name
+        
+        source = self.get_vector_config()
+        self.ensure_collection(source["size"], quantization, on_disk, collection_name=target)
+        copied = 0
+        offset = None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                self._client.upsert(
+                    collection_name=target,
+                    points=[models.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+                    wait=True
+                )
+                copied += len(records)
+            if offset is None:
+                break
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            self._client.create_payload_index(
+                collection_name=target,
+                field_name=field_name,
+                field_schema=getattr(models.PayloadSchemaType, schema),
+                wait=True
+            )
+        print(f"✅ Copied {copied} points: {self.collection_name} -> {target}")
+        return target
+    
+    def ensure_payload_indexes(self):
+        """Create the payload indexes used by filtered search (no-op when they exist)."""
+        from qdrant_client import models
+        
+        self._ensure_initialized()
+        existing = self._client.get_collection(self.collection_name).payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name not in existing:
+                self._client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=getattr(models.PayloadSchemaType, schema),
+                    wait=True
+                )
+                print(f"✅ Payload index created: {field_name} ({schema})")
+    
+    def backfill_price_values(self, batch_size: int = 256) -> int:
+        """
+        Store the parsed numeric price (price_value) on points that only have the "12,500 DT" string.
+        Points without a parsable price are left without price_value, so price filters never match them.
+        
+        Returns:
+            Number of points updated
+        """
+        from qdrant_client import models
+        from app.utils.prices import parse_price
+        
+        self._ensure_initialized()
+        updated = 0
+        offset = None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key=PRICE_VALUE_FIELD))]),
+                limit=batch_size,
+                offset=offset,
+                with_payload=["price"],
+                with_vectors=False
+            )
+            # One set_payload request per distinct price on the page
+            ids_by_price: Dict[float, List[Any]] = {}
+            for record in records:
+                price = parse_price((record.payload or {}).get("price"), default=None)
+                if price is not None:
+                    ids_by_price.setdefault(price, []).append(record.id)
+            for price, point_ids in ids_by_price.items():
+                self._client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={PRICE_VALUE_FIELD: price},
+                    points=point_ids,
+                    wait=True
+                )
+                updated += len(point_ids)
+            if offset is None:
+                break
+        return updated
+    
+    def get_all_products(self, limit: int = 100, offset: int = 0, category_folder: Optional[str] = None,
+                         sort: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get all products from the collection (paginated).
         
         Args:
             limit: Number of products to return
             offset: Offset for pagination
+            category_folder: Only return products of this category
+            sort: "price_asc" or "price_desc" (payload catalog only)
             
         Returns:
             List of product dictionaries
         """
+        catalog = self._get_catalog()
+        if catalog is not None:
+            return catalog.list(limit, offset, category_folder, sort)[0]
+        
         self._ensure_initialized()
         
         try:
             # Scroll through all points
             records, _ = self._client.scroll(
-                collection_name=QDRANT_COLLECTION_NAME,
+                collection_name=self.collection_name,
+                scroll_filter=self._build_filter(category_folder),
                 limit=limit,
                 offset=offset,
                 with_payload=True,
                 with_vectors=False
             )
             
-            products = []
-            for record in records:
-                payload = record.payload
-                products.append({
-                    "product_id": payload.get("product_id"),
-                    "name": payload.get("name"),
-                    "brand": payload.get("brand"),
-                    "price": payload.get("price"),
-                    "image_file": payload.get("image_file"),
-                    "category_folder": payload.get("category_folder")
-                })
-            
-            return products
+            return [payload_to_product(record.payload) for record in records]
             
         except Exception as e:
             print(f"Error fetching products: {e}")
             return []
     
+    def scroll_products(self, limit: int = 100, cursor: Optional[str] = None, category_folder: Optional[str] = None,
+                        sort: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Cursor-based pagination over the collection.
+        
+        Served from the payload catalog when enabled ("c:<position>" cursors),
+        otherwise from Qdrant's next_page_offset ("q:<point id>" cursors).
+        
+        Args:
+            limit: Number of products to return
+            cursor: next_cursor of the previous page, None for the first page
+            category_folder: Only return products of this category
+            sort: "price_asc" or "price_desc" (payload catalog only)
+            
+        Returns:
+            (products, next_cursor) where next_cursor is None on the last page
+            
+        Raises:
+            ValueError: Invalid cursor, or sorting requested without the catalog
+        """
+        catalog = self._get_catalog()
+        if catalog is not None:
+            if cursor and not cursor.startswith("c:"):
+                raise ValueError(f"Invalid cursor: {cursor}")
+            position = int(cursor[2:]) if cursor else 0
+            if position < 0:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            items, next_position = catalog.list(limit, position, category_folder, sort)
+            return items, (f"c:{next_position}" if next_position is not None else None)
+        
+        if sort:
+            raise ValueError("Sorting requires the payload catalog (VECTOR_PAYLOAD_CATALOG=true)")
+        if cursor and not cursor.startswith("q:"):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        offset = cursor[2:] if cursor else None
+        if offset is not None and offset.isdigit():
+            offset = int(offset)
+        
+        self._ensure_initialized()
+        records, next_offset = self._client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=self._build_filter(category_folder),
+            limit=limit,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        products = [payload_to_product(record.payload) for record in records]
+        return products, (f"q:{next_offset}" if next_offset is not None else None)
+    
+    def export_snapshot(self, path: str = VECTOR_SNAPSHOT_PATH, batch_size: int = 256):
+        """
+        Export the whole collection (vectors + payloads) to a local snapshot.
+        
+        Args:
+            path: Snapshot directory
+            batch_size: Points fetched per scroll request
+            
+        Returns:
+            The loaded VectorSnapshot, which this service then searches
+        """
+        from app.services.vector_snapshot import export_snapshot
+        
+        self._ensure_initialized()
+        self._snapshot = export_snapshot(self._client, self.collection_name, path, batch_size)
+        self._snapshot_checked = True
+        return self._snapshot
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the Qdrant collection."""
         self._ensure_initialized()
         
         try:
-            info = self._client.get_collection(QDRANT_COLLECTION_NAME)
+            info = self._client.get_collection(self.collection_name)
             # Handle different Qdrant client versions
             vectors_count = getattr(info, 'vectors_count', None) or getattr(info, 'points_count', None)
             points_count = getattr(info, 'points_count', None)
@@ -275,25 +819,28 @@ class VectorSearchService:
                 status = str(status)
             
             return {
-                "name": QDRANT_COLLECTION_NAME,
+                "name": self.collection_name,
                 "vectors_count": vectors_count,
                 "points_count": points_count,
                 "status": status
             }
         except Exception as e:
             return {
-                "name": QDRANT_COLLECTION_NAME,
+                "name": self.collection_name,
                 "error": str(e)
             }
 
 
 # Singleton instance for reuse
 _vector_search_service: Optional[VectorSearchService] = None
+_vector_search_service_lock = threading.Lock()
 
 
 def get_vector_search_service() -> VectorSearchService:
     """Get or create the vector search service singleton."""
     global _vector_search_service
     if _vector_search_service is None:
-        _vector_search_service = VectorSearchService(lazy_load=True)
+        with _vector_search_service_lock:
+            if _vector_search_service is None:
+                _vector_search_service = VectorSearchService(lazy_load=True)
     return _vector_search_service
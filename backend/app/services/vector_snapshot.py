@@ -0,0 +1,333 @@
+"""
+VectorSnapshot - Local copy of the Qdrant product collection
+Vectors are stored as a memory-mapped float16 matrix and searched by exact dot product
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.utils.prices import parse_price
+
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.json"
+META_FILE = "meta.json"
+# Names the version directory in use; each export/refresh writes a new one, then replaces this file
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+# Rows upcast to float32 per matmul while scoring: bounds the temporary copy (~8 MB)
+SCORE_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class VectorSnapshot:
+    """In-process exact search index over an exported product collection."""
+
+    def __init__(self, path: str, ids: List[Any], payloads: List[Dict[str, Any]], vectors: np.ndarray):
+        """
+        Args:
+            path: Snapshot root directory on disk (holds CURRENT and the version directories)
+            ids: Qdrant point IDs, one per row of ``vectors``
+            payloads: Qdrant payloads, one per row of ``vectors``
+            vectors: (n, dim) float16 matrix, usually memory-mapped from ``path``
+        """
+        self.path = path
+        self.ids = ids
+        self.payloads = payloads
+        self.vectors = vectors
+        self.loaded_at = time.monotonic()
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0
+
+    # ===========================
+    # Persistence
+    # ===========================
+
+    @classmethod
+    def load(cls, path: str) -> "VectorSnapshot":
+        """Open the current version of a snapshot; the vector matrix is memory-mapped, not read."""
+        version_path = current_version_path(path)
+        try:
+            vectors = np.load(os.path.join(version_path, VECTORS_FILE), mmap_mode="r")
+        except ValueError:
+            # Empty collections cannot be mmapped
+            vectors = np.load(os.path.join(version_path, VECTORS_FILE))
+        with open(os.path.join(version_path, PAYLOADS_FILE), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        ids = [r["id"] for r in records]
+        payloads = [r["payload"] for r in records]
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(f"Corrupt snapshot {version_path}: {len(ids)} payloads for {vectors.shape[0]} vectors")
+        return cls(path, ids, payloads, vectors)
+
+    @staticmethod
+    def write(path: str, ids: List[Any], payloads: List[Dict[str, Any]], vectors: np.ndarray, collection_name: str):
+        """
+        Write a new snapshot version, then point CURRENT at it.
+
+        Nothing that is already written is renamed or overwritten: a running process keeps its
+        memory map of the previous version (which Windows would refuse to move) until it reloads.
+        """
+        os.makedirs(path, exist_ok=True)
+        version = f"{VERSION_PREFIX}{time.time_ns()}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+
+        np.save(os.path.join(version_path, VECTORS_FILE), np.asarray(vectors, dtype=np.float16))
+        with open(os.path.join(version_path, PAYLOADS_FILE), "w", encoding="utf-8") as f:
+            json.dump([{"id": i, "payload": p} for i, p in zip(ids, payloads)], f, ensure_ascii=False)
+        with open(os.path.join(version_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "collection_name": collection_name,
+                "points_count": len(ids),
+                "dim": int(vectors.shape[1]) if len(ids) else 0,
+                "exported_at": time.time(),
+            }, f)
+
+        previous = _read_current(path)
+        pointer_tmp = os.path.join(path, f"{CURRENT_FILE}.tmp")
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(path, CURRENT_FILE))
+        _prune_versions(path, keep={version, previous})
+
+    # ===========================
+    # Search
+    # ===========================
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Dot product of every row with the query, read straight from the float16 matrix.
+
+        Rows are upcast to float32 a chunk at a time for the BLAS matmul, so memory stays
+        at the page cache of the memory map plus one chunk instead of a dense float32 copy.
+        """
+        n = self.vectors.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        step = max(1, SCORE_CHUNK_BYTES // (max(self.dim, 1) * 4))
+        for start in range(0, n, step):
+            block = np.asarray(self.vectors[start:start + step], dtype=np.float32)
+            np.dot(block, query, out=scores[start:start + step])
+        return scores
+
+    def _payload_columns(self) -> Dict[str, np.ndarray]:
+        """Filterable payload fields as arrays, so filters are vectorized masks."""
+        if self._columns is None:
+            self._columns = {
+                "category_folder": np.array([p.get("category_folder") for p in self.payloads], dtype=object),
+                "brand": np.array([p.get("brand") for p in self.payloads], dtype=object),
+                # NaN for an unknown price: no min_price/max_price comparison matches it, as in Qdrant
+                "price_value": np.array(
+                    [p.get("price_value", parse_price(p.get("price"), default=None)) for p in self.payloads],
+                    dtype=np.float64
+                ),
+            }
+        return self._columns
+
+    def _filter_mask(self, category_folder: Optional[str] = None, brand: Optional[str] = None,
+                     min_price: Optional[float] = None, max_price: Optional[float] = None) -> Optional[np.ndarray]:
+        if not (category_folder or brand or min_price is not None or max_price is not None):
+            return None
+        columns = self._payload_columns()
+        mask = np.ones(len(self.ids), dtype=bool)
+        if category_folder:
+            mask &= columns["category_folder"] == category_folder
+        if brand:
+            mask &= columns["brand"] == brand
+        if min_price is not None:
+            mask &= columns["price_value"] >= min_price
+        if max_price is not None:
+            mask &= columns["price_value"] <= max_price
+        return mask
+
+    def search(self, query_vector: List[float], limit: int, **filters) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Exact top-k search by dot product (vectors are L2-normalized, so this is cosine).
+
+        Args:
+            query_vector: Normalized query embedding
+            limit: Maximum number of results
+            **filters: category_folder, brand, min_price, max_price (same semantics as the Qdrant filter)
+
+        Returns:
+            List of (payload, score) tuples, best first
+        """
+        if not self.ids or limit <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = self._scores(query)
+
+        mask = self._filter_mask(**filters)
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+            if not candidates.size:
+                return []
+            hits = self._top_k(scores[candidates], limit)
+            return [(self.payloads[candidates[i]], float(scores[candidates[i]])) for i in hits]
+
+        return [(self.payloads[i], float(scores[i])) for i in self._top_k(scores, limit)]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+        k = min(limit, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top])]
+
+    # ===========================
+    # Refresh
+    # ===========================
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return max_age_seconds > 0 and time.monotonic() - self.loaded_at > max_age_seconds
+
+    def refresh(self, client, collection_name: str, batch_size: int = 256) -> Optional["VectorSnapshot"]:
+        """
+        Apply a delta from Qdrant: fetch vectors for new point IDs, drop deleted ones.
+        Payload edits on existing points are not detected; re-export for those.
+
+        Returns:
+            The refreshed snapshot, or None if a refresh is already in progress
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return None
+        try:
+            remote_ids = list(iter_point_ids(client, collection_name, batch_size * 4))
+            remote_set = set(remote_ids)
+            local_index = {point_id: i for i, point_id in enumerate(self.ids)}
+
+            keep_rows = [i for i, point_id in enumerate(self.ids) if point_id in remote_set]
+            new_ids = [point_id for point_id in remote_ids if point_id not in local_index]
+
+            if not new_ids and len(keep_rows) == len(self.ids):
+                self.loaded_at = time.monotonic()
+                return self
+
+            ids = [self.ids[i] for i in keep_rows]
+            payloads = [self.payloads[i] for i in keep_rows]
+            blocks = [np.asarray(self.vectors[keep_rows], dtype=np.float16)] if keep_rows else []
+
+            for start in range(0, len(new_ids), batch_size):
+                records = client.retrieve(
+                    collection_name=collection_name,
+                    ids=new_ids[start:start + batch_size],
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                chunk_ids, chunk_payloads, chunk_vectors = _unpack_records(records)
+                ids.extend(chunk_ids)
+                payloads.extend(chunk_payloads)
+                if chunk_vectors:
+                    blocks.append(np.asarray(chunk_vectors, dtype=np.float16))
+
+            vectors = np.vstack(blocks) if blocks else np.zeros((0, self.dim), dtype=np.float16)
+            VectorSnapshot.write(self.path, ids, payloads, vectors, collection_name)
+            print(f"✅ Vector snapshot refreshed: +{len(new_ids)} / -{len(self.ids) - len(keep_rows)} points")
+            return VectorSnapshot.load(self.path)
+        finally:
+            self._refresh_lock.release()
+
+
+def _read_current(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version_path(path: str) -> str:
+    """Directory of the version CURRENT points to (``path`` itself for snapshots written before versioning)."""
+    version = _read_current(path)
+    return os.path.join(path, version) if version else path
+
+
+def _prune_versions(path: str, keep: set):
+    """Delete older version directories; one still memory-mapped elsewhere is retried on the next write."""
+    for name in os.listdir(path):
+        if name.startswith(VERSION_PREFIX) and name not in keep and os.path.isdir(os.path.join(path, name)):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def iter_point_ids(client, collection_name: str, page_size: int):
+    """Yield every point ID in the collection without payloads or vectors."""
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        for record in records:
+            yield record.id
+        if offset is None:
+            break
+
+
+def _unpack_records(records) -> Tuple[List[Any], List[Dict[str, Any]], List[List[float]]]:
+    ids, payloads, vectors = [], [], []
+    for record in records:
+        vector = record.vector
+        if isinstance(vector, dict):
+            # Named vectors: the products collection uses the default (unnamed) one
+            vector = next(iter(vector.values()), None)
+        if vector is None:
+            continue
+        ids.append(record.id)
+        payloads.append(record.payload or {})
+        vectors.append(vector)
+    return ids, payloads, vectors
+
+
+def export_snapshot(client, collection_name: str, path: str, batch_size: int = 256) -> VectorSnapshot:
+    """
+    Pull every vector and payload of a Qdrant collection into a local snapshot.
+
+    Args:
+        client: QdrantClient instance
+        collection_name: Collection to export
+        path: Snapshot root directory (a new version is written, then made current)
+        batch_size: Points fetched per scroll request
+
+    Returns:
+        The loaded snapshot
+    """
+    ids, payloads, blocks = [], [], []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        chunk_ids, chunk_payloads, chunk_vectors = _unpack_records(records)
+        ids.extend(chunk_ids)
+        payloads.extend(chunk_payloads)
+        if chunk_vectors:
+            blocks.append(np.asarray(chunk_vectors, dtype=np.float16))
+        if offset is None:
+            break
+
+    vectors = np.vstack(blocks) if blocks else np.zeros((0, 0), dtype=np.float16)
+    VectorSnapshot.write(path, ids, payloads, vectors, collection_name)
+    return VectorSnapshot.load(path)
@@ -0,0 +1,23 @@
+"""
+Price helpers for catalog payloads ("12,500 DT" strings from BaronsMarket)
+"""
+
+from typing import Any, Optional
+
+
+def parse_price(value: Any, default: Optional[float] = 0.0) -> Optional[float]:
+    """
+    Parse a price payload into TND: "12,500 DT" -> 12.5, "3.8 TND" -> 3.8.
+
+    Args:
+        default: Returned for a missing or unparsable price (None where an unknown
+                 price must not be stored as 0, e.g. the filterable price_value)
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace("DT", "").replace("TND", "").replace(",", ".").replace("Â", "").replace("\xa0", "").strip())
+    except ValueError:
+        return default
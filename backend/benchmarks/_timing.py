@@ -0,0 +1,34 @@
+"""
+Shared timing helpers for the benchmark scripts
+"""
+
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": percentile(latencies_ms, 50),
+        "p99_ms": percentile(latencies_ms, 99),
+        "mean_ms": sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0,
+    }
+
+
+def time_call(fn: Callable, *args, **kwargs):
+    """Run fn once; returns (result, elapsed_ms)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def format_row(label: str, stats: Dict[str, float], extra: str = "") -> str:
+    return f"{label:<28} p50={stats['p50_ms']:8.3f}ms  p99={stats['p99_ms']:8.3f}ms  mean={stats['mean_ms']:8.3f}ms  {extra}"
@@ -0,0 +1,281 @@
+"""
+ANN recall/latency evaluation for the product collection.
+
+Ground truth is the exact top-k computed by brute force (float32 dot product
+on normalized vectors) over an exported snapshot. Each configuration is then
+scored by recall@k against that ground truth, next to its p50/p99 latency.
+
+Backends:
+    numpy   float32 / float16 / int8 / binary copies of the snapshot, with
+            optional oversampling + float32 rescoring (what Qdrant does with
+            quantization), no server needed
+    qdrant  the snapshot loaded into a scratch collection and searched through
+            VectorSearchService.search_by_vector, sweeping hnsw_ef and the
+            quantization rescore/oversampling parameters. Uses an in-memory
+            local Qdrant unless --qdrant-url is given; the local mode is always
+            exact, so hnsw_ef only matters against a real server.
+
+Queries are snapshot vectors perturbed with gaussian noise (re-normalized),
+which keeps them in the SigLIP embedding distribution without a model.
+
+Usage (from backend/):
+    python -m scripts.export_vector_snapshot --output data/vector_snapshot
+    python -m benchmarks.ann_eval --snapshot data/vector_snapshot
+    python -m benchmarks.ann_eval --synthetic 20000 --dim 1152   # no data needed
+    python -m benchmarks.ann_eval --snapshot data/vector_snapshot --backend qdrant \\
+        --qdrant-url http://localhost:6333 --quantization scalar
+"""
+
+import argparse
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.vector_search_service import QUANTIZATION_OPTIONS, VectorSearchService, build_quantization_config
+from benchmarks._timing import format_row, summarize, time_call
+
+SCRATCH_COLLECTION = "ann_eval"
+
+
+# ---------------------------------------------------------------------------
+# Data and ground truth
+# ---------------------------------------------------------------------------
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def load_vectors(snapshot_path: Optional[str], synthetic: int = 0, dim: int = 1152,
+                 seed: int = 0) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Corpus for the evaluation: an exported snapshot, or clustered random vectors.
+
+    Returns:
+        (normalized float32 matrix, payloads) where payload["product_id"] is the result key
+    """
+    if snapshot_path:
+        from app.services.vector_snapshot import VectorSnapshot
+
+        snapshot = VectorSnapshot.load(snapshot_path)
+        matrix = _normalize(np.asarray(snapshot.vectors, dtype=np.float32))
+        payloads = [
+            {**payload, "product_id": str(payload.get("product_id") or point_id)}
+            for point_id, payload in zip(snapshot.ids, snapshot.payloads)
+        ]
+        return matrix, payloads
+
+    # Products cluster by category in embedding space; mimic that with a gaussian mixture
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, synthetic // 200), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), synthetic)
+    matrix = _normalize(centers[labels] + 0.6 * rng.standard_normal((synthetic, dim)).astype(np.float32))
+    payloads = [{"product_id": str(i), "name": f"synthetic {i}", "category_folder": f"c{labels[i]}"} for i in range(synthetic)]
+    return matrix, payloads
+
+
+def make_queries(matrix: np.ndarray, count: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """Noisy copies of random corpus vectors."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(matrix), size=min(count, len(matrix)), replace=False)
+    perturbed = matrix[rows] + noise * rng.standard_normal((len(rows), matrix.shape[1])).astype(np.float32)
+    return _normalize(perturbed)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> List[np.ndarray]:
+    """Brute-force float32 top-k row indices for every query."""
+    scores = queries @ matrix.T
+    return [_top_k(row, k) for row in scores]
+
+
+def recall_at_k(found: List[Any], expected: List[Any], k: int) -> float:
+    expected = set(expected[:k])
+    return len(expected.intersection(found[:k])) / len(expected) if expected else 1.0
+
+
+def evaluate(label: str, search: Callable[[np.ndarray, int], List[str]], queries: np.ndarray,
+             truth: List[List[str]], k: int) -> Dict[str, Any]:
+    """Time `search(query, k)` on every query and score it against the exact keys."""
+    latencies, recalls = [], []
+    search(queries[0], k)  # Warm caches / lazy state outside the measurement
+    for query, expected in zip(queries, truth):
+        found, elapsed = time_call(search, query, k)
+        latencies.append(elapsed)
+        recalls.append(recall_at_k(found, expected, k))
+    stats = summarize(latencies)
+    row = {"label": label, "k": k, "recall": float(np.mean(recalls)), **stats}
+    print(format_row(label, stats, f"recall@{k}={row['recall']:.4f}"))
+    return row
+
+
+# ---------------------------------------------------------------------------
+# numpy stand-in
+# ---------------------------------------------------------------------------
+
+def numpy_searchers(matrix: np.ndarray, keys: List[str], oversampling: List[float]) -> Dict[str, Callable]:
+    """Search functions over float32/float16/int8/binary copies of the corpus."""
+    # Quantized copies are widened back to float32 once: numpy has no fast float16/int8
+    # matmul, so this measures the precision loss without penalizing latency
+    float16 = matrix.astype(np.float16).astype(np.float32)
+    # Symmetric per-dimension int8 quantization (the idea behind Qdrant's scalar quantization)
+    scale = np.maximum(np.abs(matrix).max(axis=0), 1e-12) / 127.0
+    int8 = np.round(matrix / scale).astype(np.int8).astype(np.float32)
+    # 1 bit per dimension: sign, compared by hamming distance
+    binary = np.packbits(matrix > 0, axis=1)
+
+    def plain(encoded_scores: Callable[[np.ndarray], np.ndarray]):
+        def search(query: np.ndarray, k: int) -> List[str]:
+            return [keys[i] for i in _top_k(encoded_scores(query), k)]
+        return search
+
+    def rescored(encoded_scores: Callable[[np.ndarray], np.ndarray], factor: float):
+        def search(query: np.ndarray, k: int) -> List[str]:
+            candidates = _top_k(encoded_scores(query), max(k, int(k * factor)))
+            exact = matrix[candidates] @ query
+            return [keys[i] for i in candidates[_top_k(exact, k)]]
+        return search
+
+    int8_scores = lambda q: int8 @ (q * scale)  # noqa: E731
+    binary_scores = lambda q: -np.unpackbits(binary ^ np.packbits(q > 0), axis=1).sum(axis=1)  # noqa: E731
+
+    searchers = {
+        "numpy float32": plain(lambda q: matrix @ q),
+        "numpy float16": plain(lambda q: float16 @ q),
+        "numpy int8": plain(int8_scores),
+        "numpy binary": plain(binary_scores),
+    }
+    for factor in oversampling:
+        searchers[f"numpy int8 rescore x{factor:g}"] = rescored(int8_scores, factor)
+        searchers[f"numpy binary rescore x{factor:g}"] = rescored(binary_scores, factor)
+    return searchers
+
+
+# ---------------------------------------------------------------------------
+# Qdrant through VectorSearchService
+# ---------------------------------------------------------------------------
+
+def load_scratch_collection(client, matrix: np.ndarray, payloads: List[Dict[str, Any]],
+                            quantization_config=None, batch_size: int = 512):
+    """(Re)create the scratch collection with the corpus (point id = row index)."""
+    from qdrant_client import models
+
+    if client.collection_exists(SCRATCH_COLLECTION):
+        client.delete_collection(SCRATCH_COLLECTION)
+    client.create_collection(
+        collection_name=SCRATCH_COLLECTION,
+        vectors_config=models.VectorParams(size=matrix.shape[1], distance=models.Distance.COSINE),
+        quantization_config=quantization_config,
+    )
+    for start in range(0, len(matrix), batch_size):
+        client.upsert(
+            collection_name=SCRATCH_COLLECTION,
+            points=models.Batch(
+                ids=list(range(start, min(start + batch_size, len(matrix)))),
+                vectors=matrix[start:start + batch_size].tolist(),
+                payloads=payloads[start:start + batch_size],
+            ),
+            wait=True,
+        )
+
+
+def qdrant_searchers(service: VectorSearchService, ef_values: List[int], oversampling: List[float],
+                     quantized: bool) -> Dict[str, Callable]:
+    """One search function per SearchParams combination."""
+    from qdrant_client import models
+
+    def searcher(params):
+        def search(query: np.ndarray, k: int) -> List[str]:
+            return [hit["product_id"] for hit in service.search_by_vector(query.tolist(), k, search_params=params)]
+        return search
+
+    searchers = {"qdrant exact": searcher(models.SearchParams(exact=True))}
+    for ef in ef_values:
+        if not quantized:
+            searchers[f"qdrant hnsw_ef={ef}"] = searcher(models.SearchParams(hnsw_ef=ef))
+            continue
+        searchers[f"qdrant hnsw_ef={ef} no-rescore"] = searcher(models.SearchParams(
+            hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=False)
+        ))
+        for factor in oversampling:
+            searchers[f"qdrant hnsw_ef={ef} rescore x{factor:g}"] = searcher(models.SearchParams(
+                hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=True, oversampling=factor)
+            ))
+    return searchers
+
+
+def run(searchers: Dict[str, Callable], queries: np.ndarray, truth_keys: List[List[str]],
+        limits: List[int]) -> List[Dict[str, Any]]:
+    rows = []
+    for k in limits:
+        print(f"\n--- limit={k} ---")
+        for label, search in searchers.items():
+            rows.append(evaluate(label, search, queries, truth_keys, k))
+    return rows
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall/latency evaluation for the product collection")
+    parser.add_argument("--snapshot", default=None, help="Snapshot directory (scripts.export_vector_snapshot)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of a snapshot")
+    parser.add_argument("--dim", type=int, default=1152, help="Synthetic vector size (SigLIP so400m: 1152)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--noise", type=float, default=0.05, help="Query perturbation (std of gaussian noise)")
+    parser.add_argument("--limits", type=_int_list, default=[1, 10, 50], help="Comma-separated limits (k)")
+    parser.add_argument("--backend", choices=["numpy", "qdrant", "both"], default="numpy")
+    parser.add_argument("--qdrant-url", default=None, help="Qdrant server (default: in-memory local mode)")
+    parser.add_argument("--hnsw-ef", type=_int_list, default=[16, 32, 64, 128, 256], help="hnsw_ef values")
+    parser.add_argument("--oversampling", type=_float_list, default=[1.0, 2.0, 4.0], help="Rescoring oversampling factors")
+    parser.add_argument("--quantization", choices=QUANTIZATION_OPTIONS, default="none",
+                        help="Quantize the scratch Qdrant collection")
+    parser.add_argument("--json", default=None, help="Write the result rows to this file")
+    args = parser.parse_args()
+
+    if not args.snapshot and not args.synthetic:
+        parser.error("--snapshot or --synthetic is required")
+
+    matrix, payloads = load_vectors(args.snapshot, args.synthetic, args.dim)
+    keys = [payload["product_id"] for payload in payloads]
+    queries = make_queries(matrix, args.queries, args.noise)
+    truth = exact_top_k(matrix, queries, max(args.limits))
+    truth_keys = [[keys[i] for i in rows] for rows in truth]
+    print(f"{len(matrix)} vectors (dim={matrix.shape[1]}), {len(queries)} queries")
+
+    rows = []
+    if args.backend in ("numpy", "both"):
+        rows += run(numpy_searchers(matrix, keys, args.oversampling), queries, truth_keys, args.limits)
+
+    if args.backend in ("qdrant", "both"):
+        from qdrant_client import QdrantClient
+
+        client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(":memory:")
+        load_scratch_collection(client, matrix, payloads, build_quantization_config(args.quantization))
+        service = VectorSearchService(client=client, collection_name=SCRATCH_COLLECTION, snapshot_path="")
+        searchers = qdrant_searchers(service, args.hnsw_ef, args.oversampling, args.quantization != "none")
+        try:
+            rows += run(searchers, queries, truth_keys, args.limits)
+        finally:
+            client.delete_collection(SCRATCH_COLLECTION)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cart read-path benchmark: legacy N+1 queries vs the joined/aggregated queries.
+
+Runs against a throwaway in-memory SQLite database seeded with one cart per
+size, and reports latency plus the number of SQL statements per call for
+get_cart, the cart total, and the reads done by a checkout.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cart
+    python -m benchmarks.bench_cart --lines 10,100,500 --repeat 50
+"""
+
+import argparse
+from typing import Callable, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Product, ShoppingList, User
+from app.services.store_service import StoreService
+from benchmarks._timing import format_row, summarize, time_call
+
+
+def _legacy_get_cart(db, user_id: int) -> List[dict]:
+    """Previous implementation: one SELECT Product per cart line."""
+    items = db.query(ShoppingList).filter(ShoppingList.user_id == user_id).all()
+    result = []
+    for item in items:
+        product = db.query(Product).filter(Product.id == item.product_id).first()
+        if product:
+            result.append({
+                "product_name": product.name,
+                "price": product.price,
+                "quantity": item.quantity,
+                "total": product.price * item.quantity
+            })
+    return result
+
+
+def _legacy_checkout_reads(db, user_id: int):
+    """Reads done by the previous checkout: total (get_cart) + get_cart again for the item count."""
+    total = sum(item["total"] for item in _legacy_get_cart(db, user_id))
+    items = sum(item["quantity"] for item in _legacy_get_cart(db, user_id))
+    return total, items
+
+
+def _seed(db, carts: List[int]):
+    """One user per cart size, each with `lines` distinct products."""
+    products = [
+        Product(name=f"Produit {i}", price=1.0 + (i % 50) * 0.25, stock=100, category="Bench", description="")
+        for i in range(max(carts))
+    ]
+    db.add_all(products)
+    db.flush()
+    for user_id, lines in enumerate(carts, start=1):
+        db.add(User(id=user_id, username=f"bench{user_id}", email=f"bench{user_id}@example.com", full_name="Bench"))
+        db.add_all(ShoppingList(user_id=user_id, product_id=p.id, quantity=1 + p.id % 3) for p in products[:lines])
+    db.commit()
+
+
+def _measure(label: str, fn: Callable, repeat: int, statements: List[int]):
+    latencies = []
+    for _ in range(repeat):
+        before = statements[0]
+        _, elapsed = time_call(fn)
+        latencies.append(elapsed)
+    print(format_row(label, summarize(latencies), f"{statements[0] - before} queries"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cart query benchmark (N+1 vs joined)")
+    parser.add_argument("--lines", default="10,100,500", help="Comma-separated cart sizes")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per case")
+    args = parser.parse_args()
+    carts = [int(v) for v in args.lines.split(",") if v]
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.__setitem__(0, statements[0] + 1))
+
+    db = sessionmaker(bind=engine)()
+    _seed(db, carts)
+    service = StoreService(db)
+
+    for user_id, lines in enumerate(carts, start=1):
+        print(f"\n--- cart with {lines} lines ---")
+        assert service.get_cart(user_id) == _legacy_get_cart(db, user_id)
+        _measure("get_cart (legacy N+1)", lambda: _legacy_get_cart(db, user_id), args.repeat, statements)
+        _measure("get_cart (join)", lambda: service.get_cart(user_id), args.repeat, statements)
+        _measure("checkout reads (legacy)", lambda: _legacy_checkout_reads(db, user_id), args.repeat, statements)
+        _measure("checkout reads (summary)", lambda: service.get_cart_summary(user_id), args.repeat, statements)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
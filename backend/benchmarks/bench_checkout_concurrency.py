@@ -0,0 +1,239 @@
+"""
+Concurrent checkout/payment load test.
+
+Hammers a throwaway SQLite file database from many threads and checks the
+invariants that a read-modify-write implementation breaks:
+
+    stock      U users race for a product with S < U units: exactly S checkouts
+               succeed and stock ends at 0, never below
+    balance    M concurrent payments against one account that covers only some
+               of them: balance = initial - successes * amount, never negative,
+               and one Transaction row per success
+    retries    R concurrent checkouts with the same Idempotency-Key: one charge,
+               every caller gets the same message
+    edits      a cart edited by another session right after the checkout's first
+               read (line raised to 50 units, a line added): the checkout charges
+               exactly the units it takes from stock, and never fails for stock
+               that is there
+
+The legacy Python read-modify-write payment runs on the same scenario for
+comparison. Exits non-zero if an invariant of the new code is violated.
+
+Usage (from backend/):
+    python -m benchmarks.bench_checkout_concurrency
+    python -m benchmarks.bench_checkout_concurrency --threads 32 --requests 400
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Account, Product, ShoppingList, Transaction, User
+from app.services.banking_service import BankingService
+from app.services.store_service import StoreService
+
+
+def _legacy_process_payment(db, user_id: int, amount: float) -> bool:
+    """Previous implementation: balance checked and decremented in Python."""
+    account = db.query(Account).filter(Account.user_id == user_id, Account.account_type == "checking").first()
+    if not account or account.balance < amount:
+        return False
+    db.add(Transaction(amount=-amount, description="legacy", category="Payment", account_id=account.id))
+    account.balance -= amount
+    db.commit()
+    return True
+
+
+def _run(label: str, count: int, threads: int, fn: Callable[[int], object]) -> List[object]:
+    """Call fn(i) for i in range(count) from a thread pool; database lock timeouts count as errors."""
+    def guarded(i):
+        try:
+            return fn(i)
+        except OperationalError:
+            return "error"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(guarded, range(count)))
+    elapsed = time.perf_counter() - start
+    errors = sum(result == "error" for result in results)
+    print(f"{label:<34} {count / elapsed:8.1f} req/s  ({errors} lock errors)")
+    return results
+
+
+def _check(name: str, ok: bool, detail: str) -> bool:
+    print(f"  {'✅' if ok else '❌'} {name}: {detail}")
+    return ok
+
+
+def _edited_cart_checkouts(engine, Session, first_user_id: int, rounds: int) -> bool:
+    """Checkouts whose cart is edited by another session between their first cart read and their writes."""
+    price = 10.0
+    with Session() as db:
+        edited, added = (Product(name=f"Article édité {tag}", price=price, stock=10 ** 6, category="Bench", description="")
+                         for tag in ("A", "B"))
+        db.add_all([edited, added])
+        db.flush()
+        edited_id, added_id = edited.id, added.id
+        user_ids = list(range(first_user_id, first_user_id + rounds))
+        for user_id in user_ids:
+            db.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", full_name=f"U{user_id}"))
+            db.add(Account(user_id=user_id, balance=1e6, account_type="checking"))
+            db.add(ShoppingList(user_id=user_id, product_id=edited_id, quantity=1))
+        db.commit()
+
+    def edit(user_id):
+        try:
+            with Session() as db:
+                db.query(ShoppingList).filter(ShoppingList.user_id == user_id).update({"quantity": 50})
+                db.add(ShoppingList(user_id=user_id, product_id=added_id, quantity=1))
+                db.commit()
+        except OperationalError:
+            pass
+
+    paused, editors = threading.local(), []
+
+    def edit_after_cart_read(conn, cursor, statement, parameters, context, executemany):
+        user_id = getattr(paused, "user_id", None)
+        if user_id and statement.lstrip().upper().startswith("SELECT") and "shopping_list" in statement:
+            paused.user_id = None
+            editor = threading.Thread(target=edit, args=(user_id,))
+            editor.start()
+            editor.join(timeout=0.5)  # The edit lands here unless the checkout already holds the write lock
+            editors.append(editor)
+
+    event.listen(engine, "after_cursor_execute", edit_after_cart_read)
+    start = time.perf_counter()
+    results = []
+    for user_id in user_ids:
+        paused.user_id = user_id
+        with Session() as db:
+            results.append(StoreService(db).checkout_with_status(user_id, BankingService(db)))
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "after_cursor_execute", edit_after_cart_read)
+    for editor in editors:
+        editor.join()
+
+    with Session() as db:
+        taken = sum(10 ** 6 - db.get(Product, product_id).stock for product_id in (edited_id, added_id))
+        charged = -(db.query(func.sum(Transaction.amount)).join(Account, Account.id == Transaction.account_id)
+                    .filter(Account.user_id.in_(user_ids)).scalar() or 0.0)
+    failures = [message for success, message in results if not success]
+    print(f"{'checkout (cart edited mid-checkout)':<34} {rounds / elapsed:8.1f} req/s")
+    ok = _check("charged = units taken", abs(charged - taken * price) < 1e-6,
+                f"{charged:.1f} TND charged for {taken} units at {price} TND")
+    ok &= _check("no spurious failure", not failures, f"{len(failures)} failed {failures[:1]}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent checkout/payment invariants")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent workers")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--edits", type=int, default=10, help="Checkouts with a concurrent cart edit")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_checkout_")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=args.threads, max_overflow=0
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    users = args.requests
+    stock = users // 4
+    balance_payments = args.requests
+    amount = 10.0
+    initial_balance = amount * (balance_payments // 3)
+
+    with Session() as db:
+        product = Product(name="Article limité", price=amount, stock=stock, category="Bench", description="")
+        db.add(product)
+        db.flush()
+        for user_id in range(1, users + 3):
+            db.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", full_name=f"U{user_id}"))
+            db.add(Account(user_id=user_id, balance=1e6, account_type="checking"))
+            db.add(ShoppingList(user_id=user_id, product_id=product.id, quantity=1))
+        db.commit()
+        product_id = product.id
+    payer, legacy_payer = users + 1, users + 2
+    with Session() as db:
+        db.query(Account).filter(Account.user_id.in_([payer, legacy_payer])).update({"balance": initial_balance})
+        db.commit()
+
+    ok = True
+
+    # --- stock ---
+    def checkout(i):
+        with Session() as db:
+            return StoreService(db).checkout_with_status(i + 1, BankingService(db))[0]
+
+    results = _run("checkout (stock race)", users, args.threads, checkout)
+    with Session() as db:
+        final_stock = db.get(Product, product_id).stock
+    successes = sum(result is True for result in results)
+    ok &= _check("no oversell", final_stock >= 0 and successes + final_stock == stock,
+                 f"{successes} sold, stock {stock} -> {final_stock}")
+
+    # --- balance ---
+    def pay(_):
+        with Session() as db:
+            return BankingService(db).process_payment(payer, amount, "bench")
+
+    def legacy_pay(_):
+        with Session() as db:
+            return _legacy_process_payment(db, legacy_payer, amount)
+
+    for label, user_id, fn, strict in (("payment (conditional UPDATE)", payer, pay, True),
+                                       ("payment (legacy read-modify-write)", legacy_payer, legacy_pay, False)):
+        results = _run(label, balance_payments, args.threads, fn)
+        with Session() as db:
+            account = db.query(Account).filter(Account.user_id == user_id).one()
+            recorded = db.query(func.count(Transaction.id)).filter(Transaction.account_id == account.id).scalar()
+        successes = sum(result is True for result in results)
+        consistent = account.balance >= 0 and abs(initial_balance - successes * amount - account.balance) < 1e-6 \
+            and recorded == successes
+        detail = f"{successes} paid, {recorded} recorded, balance {initial_balance} -> {account.balance}"
+        if strict:
+            ok &= _check("no lost update / overdraft", consistent, detail)
+        else:
+            print(f"  {'consistent' if consistent else 'inconsistent'} (expected under contention): {detail}")
+
+    # --- retries with one idempotency key ---
+    with Session() as db:
+        retry_user = db.query(ShoppingList.user_id).first()[0]  # A user whose checkout failed above
+        db.query(Product).filter(Product.id == product_id).update({"stock": 1000})
+        db.commit()
+        transactions_before = db.query(func.count(Transaction.id)).scalar()
+
+    def retried_checkout(_):
+        with Session() as db:
+            return StoreService(db).checkout_with_status(retry_user, BankingService(db), "bench-retry-key")
+
+    results = _run("checkout (same idempotency key)", args.threads * 4, args.threads, retried_checkout)
+    with Session() as db:
+        charged = db.query(func.count(Transaction.id)).scalar() - transactions_before
+    messages = {result[1] for result in results if result != "error"}
+    ok &= _check("single charge", charged == 1 and len(messages) == 1, f"{charged} charge(s), {len(messages)} distinct response(s)")
+
+    # --- cart edited during checkout ---
+    ok &= _edited_cart_checkouts(engine, Session, users + 3, args.edits)
+
+    engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
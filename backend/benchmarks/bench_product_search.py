@@ -0,0 +1,113 @@
+"""
+Relevance and latency benchmark for product search.
+
+Compares the legacy ilike scan, the in-memory BM25 index, the SQLite FTS5
+index, the vector leg and the fused hybrid retriever
+(StoreService.search_products) on labelled queries against the seeded catalog.
+
+Usage (from backend/, after `python -m app.init_db`):
+    python -m benchmarks.bench_product_search
+    python -m benchmarks.bench_product_search --no-vector   # without SigLIP/Qdrant
+"""
+
+import argparse
+from typing import Callable, List
+
+from app.database import SessionLocal, engine
+from app.models import Product
+from app.services.product_fts import ensure_product_fts, search_product_ids
+from app.services.store_service import StoreService
+from benchmarks._timing import format_row, summarize, time_call
+
+# query -> substring expected in the name of a relevant product
+LABELLED_QUERIES = {
+    "harissa": "Harissa",
+    "pates": "Pâtes",
+    "cafe moulu": "Café",
+    "the vert menthe": "Thé Vert",
+    "huile olive": "Huile d'Olive",
+    "lait": "Lait",
+    "fromage fondu": "Fromage",
+    "thon": "Thon",
+    "couscous": "Couscous",
+    "oeufs frais": "Oeufs",
+    "chechia": "Chéchia",
+    "ecouteurs sans fil": "Écouteurs",
+    "savon hammam": "Savon Noir",
+    "epices": "Tabel",
+    "pois chiches lablabi": "Pois Chiches",
+    "eau minerale": "Eau Minérale",
+}
+
+
+class _NoVectorSearch:
+    """Vector leg disabled (--no-vector)."""
+
+    def search_by_text(self, query: str, limit: int = 10):
+        return []
+
+
+def _evaluate(label: str, search: Callable[[str], List[str]], k: int, repeat: int):
+    latencies, reciprocal_ranks, hits = [], [], 0
+    for query, expected in LABELLED_QUERIES.items():
+        names = []
+        for _ in range(repeat):
+            names, elapsed = time_call(search, query)
+            latencies.append(elapsed)
+        rank = next((i for i, name in enumerate(names[:k], start=1) if expected in name), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    recall = hits / len(LABELLED_QUERIES)
+    mrr = sum(reciprocal_ranks) / len(reciprocal_ranks)
+    print(format_row(label, summarize(latencies), f"recall@{k}={recall:.2f}  MRR={mrr:.2f}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product search relevance/latency benchmark")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall and MRR")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--no-vector", action="store_true", help="Skip SigLIP + Qdrant")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    service = StoreService(db)
+    if args.no_vector:
+        service.vector_service = _NoVectorSearch()
+    vector_service = service.vector_service
+
+    def ilike(query):
+        # Legacy implementation: substring scan on the name only
+        return [p.name for p in db.query(Product).filter(Product.name.ilike(f"%{query}%")).all()]
+
+    def bm25(query):
+        index = service._refresh_lexical_index()
+        ids = [doc_id for doc_id, _ in index.search(query, args.k)]
+        names = dict(db.query(Product.id, Product.name).filter(Product.id.in_(ids)).all())
+        return [names[i] for i in ids if i in names]
+
+    def fts5(query):
+        ids = search_product_ids(db, query, args.k, match_all=False)
+        names = dict(db.query(Product.id, Product.name).filter(Product.id.in_(ids)).all())
+        return [names[i] for i in ids if i in names]
+
+    def vector(query):
+        return [r["name"] or "" for r in vector_service.search_by_text(query, args.k)]
+
+    def hybrid(query):
+        return [p.name for p in service.search_products(query, limit=args.k)]
+
+    print(f"{db.query(Product).count()} products, {len(LABELLED_QUERIES)} labelled queries\n")
+    _evaluate("ilike (legacy)", ilike, args.k, args.repeat)
+    _evaluate("bm25", bm25, args.k, args.repeat)
+    if ensure_product_fts(engine):
+        _evaluate("fts5", fts5, args.k, args.repeat)
+    if not args.no_vector:
+        _evaluate("vector (SigLIP + Qdrant)", vector, args.k, args.repeat)
+    _evaluate("hybrid (RRF)", hybrid, args.k, args.repeat)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
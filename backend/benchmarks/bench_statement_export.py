@@ -0,0 +1,91 @@
+"""
+Statement export memory benchmark.
+
+For each history size, seeds a throwaway SQLite file and compares peak Python
+memory (tracemalloc) and throughput of:
+
+    materialized   every Transaction loaded as ORM objects, then serialized
+                   (what /transactions with a huge limit would do)
+    streamed       iter_statement: yield_per cursor batches, one chunk each
+
+The streamed peak should stay flat as the history grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_statement_export
+    python -m benchmarks.bench_statement_export --rows 10000,100000,1000000 --format jsonl
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Account, Transaction, User
+from app.services.statement_export import format_csv, format_jsonl, iter_statement
+
+
+def _seed(engine, rows: int, batch_size: int = 50000):
+    rng = random.Random(7)
+    start = datetime(2015, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "u1", "email": "u1@example.com", "full_name": "U1"}])
+        conn.execute(insert(Account), [{"id": 1, "user_id": 1, "balance": 0.0, "account_type": "checking"}])
+        for offset in range(0, rows, batch_size):
+            conn.execute(insert(Transaction), [
+                {"amount": round(rng.uniform(-200, 200), 2), "description": f"Opération {offset + i}",
+                 "category": rng.choice(["Groceries", "Transport", "Payment", "Transfer"]),
+                 "date": start + timedelta(minutes=offset + i), "account_id": 1}
+                for i in range(min(batch_size, rows - offset))
+            ])
+
+
+def _materialized(Session, fmt: str) -> int:
+    """Load everything, then serialize: memory grows with the history."""
+    with Session() as db:
+        transactions = db.query(Transaction).filter(Transaction.account_id == 1).order_by(Transaction.date).all()
+        text = format_csv(transactions, header=True) if fmt == "csv" else format_jsonl(transactions)
+        return len(text)
+
+
+def _streamed(Session, fmt: str) -> int:
+    return sum(len(chunk) for chunk in iter_statement(1, fmt, session_factory=Session))
+
+
+def _measure(label: str, fn, rows: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} peak={peak / 1e6:8.1f} MB  {rows / elapsed:10.0f} rows/s  output={size / 1e6:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statement export memory benchmark")
+    parser.add_argument("--rows", default="10000,100000,300000", help="Comma-separated history sizes")
+    parser.add_argument("--format", default="csv", choices=["csv", "jsonl"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_statement_")
+    for rows in [int(v) for v in args.rows.split(",") if v]:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, f'bench_{rows}.db')}")
+        Base.metadata.create_all(bind=engine)
+        _seed(engine, rows)
+        Session = sessionmaker(bind=engine)
+
+        print(f"\n--- {rows} transactions ---")
+        _measure("materialized", lambda: _materialized(Session, args.format), rows)
+        _measure("streamed", lambda: _streamed(Session, args.format), rows)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
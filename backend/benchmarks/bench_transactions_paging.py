@@ -0,0 +1,138 @@
+"""
+Transaction history paging benchmark: OFFSET vs keyset on (date, id).
+
+Seeds a throwaway SQLite file with one account holding --rows transactions
+(1M by default, timestamps with many ties) next to a few noise accounts, then
+times one page at increasing depths:
+
+    offset, no index     previous query shape, ORDER BY date LIMIT/OFFSET
+    offset, index        same with ix_transactions_account_date_id
+    keyset, index        BankingService.get_transactions_page with a cursor
+
+Keyset latency should stay flat with depth; OFFSET grows linearly. Also checks
+that walking every keyset page returns each transaction exactly once (with
+--verify, slow on 1M rows).
+
+Usage (from backend/):
+    python -m benchmarks.bench_transactions_paging
+    python -m benchmarks.bench_transactions_paging --rows 200000 --verify
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Account, Transaction, User
+from app.services.banking_service import BankingService, encode_transaction_cursor
+from benchmarks._timing import format_row, summarize, time_call
+
+INDEX_NAME = "ix_transactions_account_date_id"
+
+
+def _seed(engine, rows: int, noise_accounts: int = 4, batch_size: int = 50000):
+    """User 1 owns account 1 with `rows` transactions; other accounts get rows // 10 each."""
+    rng = random.Random(42)
+    start = datetime(2015, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"u{i}", "email": f"u{i}@example.com", "full_name": f"U{i}"}
+            for i in range(1, noise_accounts + 2)
+        ])
+        conn.execute(insert(Account), [
+            {"id": i, "user_id": i, "balance": 0.0, "account_type": "checking"} for i in range(1, noise_accounts + 2)
+        ])
+        for account_id, count in [(1, rows)] + [(i, rows // 10) for i in range(2, noise_accounts + 2)]:
+            for offset in range(0, count, batch_size):
+                conn.execute(insert(Transaction), [
+                    {
+                        "amount": round(rng.uniform(-200, 200), 2),
+                        "description": "bench",
+                        "category": "Payment",
+                        # Minute resolution over ~10 years: plenty of equal timestamps
+                        "date": start + timedelta(minutes=rng.randrange(10 * 365 * 24 * 60) // 7 * 7),
+                        "account_id": account_id,
+                    }
+                    for _ in range(min(batch_size, count - offset))
+                ])
+
+
+def _offset_page(db, limit: int, offset: int):
+    return db.query(Transaction).filter(Transaction.account_id == 1).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).offset(offset).limit(limit).all()
+
+
+def _time(label: str, fn, repeat: int):
+    latencies = [time_call(fn)[1] for _ in range(repeat)]
+    print(format_row(label, summarize(latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction history paging benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Transactions on the paged account")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case")
+    parser.add_argument("--verify", action="store_true", help="Walk every keyset page and check completeness")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_paging_")
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} transactions...")
+    _seed(engine, args.rows)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    db = sessionmaker(bind=engine)()
+    service = BankingService(db)
+
+    depths = [d for d in (0, 100, 1000, 10000, 49000) if d * args.limit < args.rows]
+    cursors = {}
+    for depth in depths:
+        if depth:
+            before = _offset_page(db, 1, depth * args.limit - 1)[0]
+            cursors[depth] = encode_transaction_cursor(before)
+        else:
+            cursors[depth] = None
+    assert [t.id for t in service.get_transactions_page(1, args.limit, cursors[depths[-1]])[0]] == \
+        [t.id for t in _offset_page(db, args.limit, depths[-1] * args.limit)]
+
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM transactions WHERE account_id = 1 AND (date, id) < ('2020-01-01', 1) "
+        "ORDER BY date DESC, id DESC LIMIT 20"
+    )).all()
+    print(f"Keyset plan: {' / '.join(row[-1] for row in plan)}")
+
+    for indexed in (False, True):
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+            if indexed:
+                next(i for i in Transaction.__table__.indexes if i.name == INDEX_NAME).create(conn)
+        print(f"\n--- {'with' if indexed else 'without'} {INDEX_NAME} ---")
+        for depth in depths:
+            _time(f"offset, page {depth}", lambda: _offset_page(db, args.limit, depth * args.limit), args.repeat)
+        if indexed:
+            for depth in depths:
+                _time(f"keyset, page {depth}", lambda: service.get_transactions_page(1, args.limit, cursors[depth]),
+                      args.repeat)
+
+    if args.verify:
+        seen, cursor = set(), None
+        while True:
+            items, cursor = service.get_transactions_page(1, 500, cursor)
+            seen.update(t.id for t in items)
+            if cursor is None:
+                break
+        print(f"\n{'✅' if len(seen) == args.rows else '❌'} keyset walk returned {len(seen)}/{args.rows} transactions")
+
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
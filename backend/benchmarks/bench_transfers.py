@@ -0,0 +1,178 @@
+"""
+Concurrent transfer stress test.
+
+Many threads send random amounts between a small set of accounts in a
+throwaway SQLite file database (amounts sometimes exceed the balance), then
+check the invariants:
+
+    conservation   the sum of all balances is unchanged
+    no overdraft   no balance is negative
+    ledger         every balance = initial + sum of its Transaction rows
+    rollups        the monthly spending rollups agree with the Transaction rows
+    retries        concurrent transfers with one Idempotency-Key send once
+
+Reports transfers per second. The legacy read-modify-write transfer runs on
+the same scenario for comparison. Exits non-zero if an invariant of the new
+code is violated.
+
+Usage (from backend/):
+    python -m benchmarks.bench_transfers
+    python -m benchmarks.bench_transfers --threads 32 --transfers 2000 --accounts 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Account, SpendingRollup, Transaction, User
+from app.services.banking_service import BankingService
+
+INITIAL_BALANCE = 1000.0
+
+
+def _legacy_transfer(db, sender_id: int, recipient_email: str, amount: float) -> bool:
+    """Previous implementation: balance checked in Python, both balances written back."""
+    sender = db.query(Account).filter(Account.user_id == sender_id, Account.account_type == "checking").first()
+    if sender.balance < amount:
+        return False
+    recipient_user = db.query(User).filter(User.email == recipient_email).first()
+    recipient = db.query(Account).filter(Account.user_id == recipient_user.id).first()
+    sender.balance -= amount
+    recipient.balance += amount
+    db.add(Transaction(amount=-amount, description="legacy", category="Transfer", account_id=sender.id))
+    db.add(Transaction(amount=amount, description="legacy", category="Transfer", account_id=recipient.id))
+    db.commit()
+    return True
+
+
+def _run(label: str, count: int, threads: int, fn: Callable[[int], object]) -> List[object]:
+    """Call fn(i) for i in range(count) from a thread pool; database lock timeouts count as errors."""
+    def guarded(i):
+        try:
+            return fn(i)
+        except OperationalError:
+            return "error"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(guarded, range(count)))
+    elapsed = time.perf_counter() - start
+    errors = sum(result == "error" for result in results)
+    print(f"{label:<36} {count / elapsed:8.1f} transfers/s  ({errors} lock errors)")
+    return results
+
+
+def _check(name: str, ok: bool, detail: str) -> bool:
+    print(f"  {'✅' if ok else '❌'} {name}: {detail}")
+    return ok
+
+
+def _invariants(Session, user_ids: List[int]):
+    """(total balance, lowest balance, accounts whose balance disagrees with their ledger, or their rollups with it)."""
+    with Session() as db:
+        accounts = db.query(Account).filter(Account.user_id.in_(user_ids)).all()
+        ledger = dict(db.query(Transaction.account_id, func.sum(Transaction.amount)).filter(
+            Transaction.account_id.in_([a.id for a in accounts])
+        ).group_by(Transaction.account_id).all())
+        rollups = dict(db.query(SpendingRollup.account_id, func.sum(SpendingRollup.received - SpendingRollup.spent)).filter(
+            SpendingRollup.account_id.in_([a.id for a in accounts]),
+            SpendingRollup.period == "month"
+        ).group_by(SpendingRollup.account_id).all())
+    mismatched = [a.user_id for a in accounts if abs(INITIAL_BALANCE + (ledger.get(a.id) or 0.0) - a.balance) > 1e-6]
+    off_rollups = [a.user_id for a in accounts if abs((ledger.get(a.id) or 0.0) - (rollups.get(a.id) or 0.0)) > 1e-6]
+    return sum(a.balance for a in accounts), min(a.balance for a in accounts), mismatched, off_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent transfer invariants and throughput")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent workers")
+    parser.add_argument("--transfers", type=int, default=1000, help="Transfers per scenario")
+    parser.add_argument("--accounts", type=int, default=8, help="Accounts per scenario (fewer = more contention)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_transfers_")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=args.threads, max_overflow=0
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    # Two disjoint groups of accounts: one for the new code, one for the legacy transfer
+    groups = [list(range(1, args.accounts + 1)), list(range(args.accounts + 1, 2 * args.accounts + 1))]
+    with Session() as db:
+        for user_id in groups[0] + groups[1]:
+            db.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", full_name=f"U{user_id}"))
+            db.add(Account(user_id=user_id, balance=INITIAL_BALANCE, account_type="checking"))
+        db.commit()
+
+    def plan(user_ids: List[int], seed: int):
+        """Deterministic random (sender, recipient, amount) per transfer; amounts up to 40% of a starting balance."""
+        rng = random.Random(seed)
+        return [(*rng.sample(user_ids, 2), round(rng.uniform(1, INITIAL_BALANCE * 0.4), 2)) for _ in range(args.transfers)]
+
+    ok = True
+    for label, user_ids, strict in (("transfer (conditional UPDATE)", groups[0], True),
+                                    ("transfer (legacy read-modify-write)", groups[1], False)):
+        transfers = plan(user_ids, seed=1)
+
+        def send(i):
+            sender, recipient, amount = transfers[i]
+            with Session() as db:
+                if strict:
+                    return BankingService(db).transfer_with_status(sender, f"u{recipient}@example.com", amount)[0]
+                return _legacy_transfer(db, sender, f"u{recipient}@example.com", amount)
+
+        results = _run(label, args.transfers, args.threads, send)
+        total, lowest, mismatched, off_rollups = _invariants(Session, user_ids)
+        expected = INITIAL_BALANCE * len(user_ids)
+        successes = sum(result is True for result in results)
+        conserved = abs(total - expected) < 1e-6
+        detail = f"{successes} sent, total {expected:.2f} -> {total:.2f}, lowest balance {lowest:.2f}, " \
+                 f"{len(mismatched)} account(s) off their ledger"
+        if strict:
+            ok &= _check("conservation", conserved, f"total {expected:.2f} -> {total:.2f}")
+            ok &= _check("no overdraft", lowest >= 0, f"lowest balance {lowest:.2f}")
+            ok &= _check("ledger", not mismatched, f"{successes} sent, {len(mismatched)} account(s) off their ledger")
+            ok &= _check("rollups", not off_rollups, f"{len(off_rollups)} account(s) with rollups off their ledger")
+        else:
+            consistent = conserved and lowest >= 0 and not mismatched
+            print(f"  {'consistent' if consistent else 'inconsistent'} (expected under contention): {detail}")
+
+    # --- retries with one idempotency key ---
+    sender, recipient = groups[0][0], groups[0][1]
+    with Session() as db:
+        db.query(Account).filter(Account.user_id == sender).update({"balance": Account.balance + 100.0})
+        db.add(Transaction(amount=100.0, description="bench top-up", category="Deposit",
+                           account_id=db.query(Account.id).filter(Account.user_id == sender).scalar()))
+        db.commit()
+        transactions_before = db.query(func.count(Transaction.id)).scalar()
+
+    def retried_transfer(_):
+        with Session() as db:
+            return BankingService(db).transfer_with_status(sender, f"u{recipient}@example.com", 50.0, "bench-retry-key")
+
+    results = _run("transfer (same idempotency key)", args.threads * 4, args.threads, retried_transfer)
+    with Session() as db:
+        recorded = db.query(func.count(Transaction.id)).scalar() - transactions_before
+    messages = {result[1] for result in results if result != "error"}
+    ok &= _check("single transfer", recorded == 2 and len(messages) == 1,
+                 f"{recorded // 2} transfer(s), {len(messages)} distinct response(s)")
+
+    engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Query-plan regression check for the hot ORM queries.
+
+For each hot lookup, runs the statement the services issue through EXPLAIN
+QUERY PLAN (SQLite) or EXPLAIN (FORMAT JSON) with enable_seqscan=off
+(PostgreSQL), and fails when a guarded table is scanned instead of searched
+through an index, or when an ordered read needs a sort the index should
+have served. Then times each query over a sample of real ids and names.
+
+Run it against a seeded database (python -m scripts.generate_load_data)
+for meaningful latencies; the plan checks hold at any size.
+
+    --output FILE     write plans and latencies as JSON (e.g. the baseline)
+    --baseline FILE   also fail when a query's p50 is more than
+                      --latency-factor times its baseline p50
+
+Exits non-zero on any regression.
+
+Usage (from backend/):
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --database-url sqlite:///./load.db --output plans_baseline.json
+    python -m benchmarks.query_plans --database-url sqlite:///./load.db --baseline plans_baseline.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import SQLALCHEMY_DATABASE_URL, create_database_engine
+from app.models import Account, Product, ShoppingList, User
+from app.services.banking_service import account_statement, encode_transaction_cursor, spending_statement, \
+    transactions_page_statement
+from app.services.product_fts import ensure_product_fts, fts_match_query, product_search_statement
+from app.services.store_service import cart_statement
+
+from benchmarks._timing import format_row, summarize
+
+
+class Sample(NamedTuple):
+    user_id: int
+    email: str
+    product_id: int
+    product_name: str
+    cursor: Optional[str]
+
+
+class HotQuery(NamedTuple):
+    name: str
+    guarded: Tuple[str, ...]  # Tables that must be reached through an index
+    build: Callable[[Sample], object]  # Statement for one sample
+    ordered: bool = False  # The index must also provide the ORDER BY (no temp B-tree / Sort)
+    sqlite_only: bool = False
+
+
+HOT_QUERIES = [
+    HotQuery("account_by_user", ("accounts",), lambda s: account_statement(s.user_id)),
+    HotQuery("user_by_email", ("users",), lambda s: select(User).where(User.email == s.email).limit(1)),
+    HotQuery("cart_lines", ("shopping_list", "products"), lambda s: cart_statement(s.user_id)),
+    HotQuery("cart_line_by_product", ("shopping_list",), lambda s: select(ShoppingList).where(
+        ShoppingList.user_id == s.user_id, ShoppingList.product_id == s.product_id).limit(1)),
+    HotQuery("product_by_name", ("products",), lambda s: select(Product.name, Product.id).where(
+        Product.name.in_([s.product_name]))),
+    HotQuery("product_by_id", ("products",), lambda s: select(Product).where(Product.id == s.product_id)),
+    HotQuery("product_name_fts", ("products_fts",),
+             lambda s: product_search_statement(fts_match_query(s.product_name), 1), sqlite_only=True),
+    HotQuery("transactions_first_page", ("transactions", "accounts"),
+             lambda s: transactions_page_statement(s.user_id, 20), ordered=True),
+    HotQuery("transactions_next_page", ("transactions", "accounts"),
+             lambda s: transactions_page_statement(s.user_id, 20, s.cursor), ordered=True),
+    HotQuery("spending_by_month", ("spending_rollups", "accounts"), lambda s: spending_statement(s.user_id, "month")),
+]
+
+
+def _samples(db: Session, count: int, seed: int) -> List[Sample]:
+    """Users that have a checking account, with a product and a mid-history cursor each."""
+    rng = random.Random(seed)
+    max_user = db.execute(select(func.max(Account.user_id))).scalar() or 0
+    max_product = db.execute(select(func.max(Product.id))).scalar() or 0
+    if not max_user or not max_product:
+        raise SystemExit("❌ The database has no accounts or products: seed it first")
+
+    samples = []
+    for _ in range(count * 4):
+        if len(samples) >= count:
+            break
+        user = db.execute(select(User.id, User.email).join(Account, Account.user_id == User.id).where(
+            User.id >= rng.randint(1, max_user), Account.account_type == "checking").order_by(User.id).limit(1)).first()
+        product = db.execute(select(Product.id, Product.name).where(
+            Product.id >= rng.randint(1, max_product)).order_by(Product.id).limit(1)).first()
+        if not user or not product:
+            continue
+        history = db.execute(transactions_page_statement(user.id, 50)).scalars().all()
+        cursor = encode_transaction_cursor(history[len(history) // 2]) if history else None
+        samples.append(Sample(user.id, user.email, product.id, product.name, cursor))
+    return samples
+
+
+def _compile(statement, dialect) -> str:
+    return str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _sqlite_plan(conn, sql: str) -> List[str]:
+    return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def _sqlite_problems(plan: List[str], query: HotQuery) -> List[str]:
+    problems = []
+    for detail in plan:
+        words = detail.split()
+        # "SCAN t" / "SCAN t USING [COVERING] INDEX i" read the whole table or index;
+        # "SCAN fts VIRTUAL TABLE INDEX n:M..." is the full-text index answering MATCH
+        if words[:1] == ["SCAN"] and len(words) > 1 and words[1] in query.guarded and "VIRTUAL" not in words:
+            problems.append(f"full scan: {detail}")
+        if query.ordered and "TEMP B-TREE" in detail and "ORDER BY" in detail:
+            problems.append(f"sort not served by an index: {detail}")
+    return problems
+
+
+def _postgres_plan(conn, sql: str) -> List[Dict]:
+    # With seq scans priced out, a Seq Scan in the plan means no index can answer the query
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    nodes, pending = [], [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        nodes.append({key: node[key] for key in ("Node Type", "Relation Name", "Index Name") if key in node})
+        pending.extend(node.get("Plans", []))
+    return nodes
+
+
+def _postgres_problems(plan: List[Dict], query: HotQuery) -> List[str]:
+    problems = []
+    for node in plan:
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in query.guarded:
+            problems.append(f"full scan: Seq Scan on {node['Relation Name']}")
+        if query.ordered and node["Node Type"] in ("Sort", "Incremental Sort"):
+            problems.append(f"sort not served by an index: {node['Node Type']}")
+    return problems
+
+
+def _explain(engine, query: HotQuery, sample: Sample) -> Tuple[list, List[str]]:
+    sql = _compile(query.build(sample), engine.dialect)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            plan = _sqlite_plan(conn, sql)
+            return plan, _sqlite_problems(plan, query)
+        plan = _postgres_plan(conn, sql)
+        return plan, _postgres_problems(plan, query)
+
+
+def _time(Session, query: HotQuery, samples: List[Sample], repeat: int) -> List[float]:
+    latencies = []
+    with Session() as db:
+        for i in range(repeat):
+            statement = query.build(samples[i % len(samples)])
+            start = time.perf_counter()
+            db.execute(statement).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-plan regression check for the hot queries")
+    parser.add_argument("--database-url", default=SQLALCHEMY_DATABASE_URL, help="Seeded database (default: DATABASE_URL)")
+    parser.add_argument("--samples", type=int, default=50, help="Distinct users/products timed")
+    parser.add_argument("--repeat", type=int, default=500, help="Timed executions per query")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write plans and latencies to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from --output to compare latencies with")
+    parser.add_argument("--latency-factor", type=float, default=3.0, help="Allowed p50 slowdown vs the baseline")
+    args = parser.parse_args()
+
+    engine = create_database_engine(args.database_url)
+    fts = ensure_product_fts(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        samples = _samples(db, args.samples, args.seed)
+    baseline = json.load(open(args.baseline, encoding="utf-8"))["queries"] if args.baseline else {}
+
+    report, failures = {}, 0
+    for query in HOT_QUERIES:
+        if query.sqlite_only and (engine.dialect.name != "sqlite" or not fts):
+            continue
+        plan, problems = _explain(engine, query, samples[0])
+        stats = summarize(_time(Session, query, samples, args.repeat))
+
+        reference = baseline.get(query.name, {}).get("p50_ms")
+        if reference and stats["p50_ms"] > reference * args.latency_factor:
+            problems.append(f"p50 {stats['p50_ms']:.3f}ms > {args.latency_factor}x baseline {reference:.3f}ms")
+        failures += bool(problems)
+
+        print(format_row(f"{'❌' if problems else '✅'} {query.name}", stats))
+        for line in plan:
+            print(f"      {line}")
+        for problem in problems:
+            print(f"    ❌ {problem}")
+        report[query.name] = {**stats, "plan": plan, "problems": problems}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"dialect": engine.dialect.name, "queries": report}, f, ensure_ascii=False, indent=2)
+    print(f"\n{'❌' if failures else '✅'} {failures} of {len(report)} hot queries regressed")
+    engine.dispose()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
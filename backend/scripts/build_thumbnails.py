@@ -0,0 +1,54 @@
+"""
+Pre-generate WebP thumbnails for every product image.
+
+Thumbnails are otherwise rendered on first request; running this after an
+ingest keeps the first page views fast.
+
+Usage (from backend/):
+    python -m scripts.build_thumbnails
+    python -m scripts.build_thumbnails --widths 256
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.thumbnail_service import THUMBNAIL_WIDTHS, get_thumbnail_service, render_thumbnail
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the product thumbnail cache")
+    parser.add_argument("--widths", type=int, nargs="+", default=list(THUMBNAIL_WIDTHS), choices=THUMBNAIL_WIDTHS)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    args = parser.parse_args()
+
+    service = get_thumbnail_service()
+    sources = set(service.index().values())
+
+    jobs = []
+    for source_path in sources:
+        digest = service.digest(source_path)
+        for width in args.widths:
+            target_path = service.thumbnail_path(digest, width)
+            if not os.path.exists(target_path):
+                jobs.append((source_path, target_path, width))
+
+    print(f"{len(sources)} images, {len(jobs)} thumbnails to render")
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(render_thumbnail, *job) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ {job[0]} ({job[2]}px): {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(jobs) - failed} thumbnails in {elapsed:.1f}s ({failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
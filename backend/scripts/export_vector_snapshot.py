@@ -0,0 +1,32 @@
+"""
+Export the Qdrant product collection to a local vector snapshot.
+
+Usage (from backend/):
+    python -m scripts.export_vector_snapshot --output data/vector_snapshot
+
+Then set VECTOR_SNAPSHOT_PATH to the output directory so VectorSearchService
+can fall back to it (VECTOR_SNAPSHOT_MODE=fallback) or serve from it
+(VECTOR_SNAPSHOT_MODE=primary).
+"""
+
+import argparse
+import time
+
+from app.services.vector_search_service import VECTOR_SNAPSHOT_PATH, get_vector_search_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Qdrant vectors to a local snapshot")
+    parser.add_argument("--output", default=VECTOR_SNAPSHOT_PATH or "data/vector_snapshot",
+                        help="Snapshot directory (default: VECTOR_SNAPSHOT_PATH)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per scroll request")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = get_vector_search_service().export_snapshot(args.output, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Exported {len(snapshot)} points (dim={snapshot.dim}) to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Generate a large synthetic dataset for load and scaling tests.
+
+Bulk-inserts users, checking/savings accounts, products, carts and
+transactions into the tables of app.models, in batches through the driver's
+executemany (COPY on PostgreSQL with psycopg2), with secondary indexes
+created after the load. Then rebuilds the spending rollups and, on SQLite,
+the product full-text index.
+
+Distributions:
+    transactions   spread over --months, skewed towards active accounts;
+                   category mix and amounts per category (salaries early in
+                   the month, rent, groceries, transport, transfers...)
+    products       the init_db categories, with brands, sizes and prices
+                   per category
+    carts          --cart-share of the users have 1-8 items
+
+Balances are random and not derived from the generated history.
+
+Usage (from backend/):
+    python -m scripts.generate_load_data --reset
+    python -m scripts.generate_load_data --reset --users 100000 --transactions 10000000 --products 50000
+    python -m scripts.generate_load_data --database-url sqlite:///./load.db --reset --transactions 1000000
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SQLALCHEMY_DATABASE_URL, SQLITE_PRAGMAS, Base, create_database_engine
+from app.models import Account, Product, ShoppingList, Transaction, User
+from app.services.product_fts import drop_product_fts, ensure_product_fts
+from app.services.spending_rollups import rebuild_spending_rollups
+
+FIRST_NAMES = ["Omar", "Alice", "Mohamed", "Amira", "Youssef", "Salma", "Ahmed", "Ines", "Karim", "Nour",
+               "Sami", "Yasmine", "Hichem", "Rania", "Walid", "Emna", "Bilel", "Mariem", "Anis", "Sarra"]
+LAST_NAMES = ["Ben Ali", "Trabelsi", "Gharbi", "Jebali", "Bouazizi", "Hammami", "Mejri", "Ayari", "Chaabane",
+              "Dridi", "Sassi", "Khelifi", "Jlassi", "Mansouri", "Ferchichi", "Tlili", "Zouari", "Baccouche"]
+
+# category: (weight, lognormal mu, sigma, sign, merchants)
+TRANSACTION_CATEGORIES = {
+    "Groceries": (30, 3.4, 0.7, -1, ["Carrefour Market", "Monoprix", "Magasin Général", "Aziza", "Géant"]),
+    "Transport": (15, 2.5, 0.6, -1, ["Taxi Bolt", "Agil Carburant", "Transtu Abonnement", "SNCFT", "Louage"]),
+    "Restaurants": (12, 3.0, 0.6, -1, ["Café de Paris", "Pizzeria", "Fast Food", "Restaurant Dar El Jeld"]),
+    "Shopping": (10, 4.0, 0.9, -1, ["Zara", "Mytek", "Tunisianet", "Jumia", "Décathlon"]),
+    "Utilities": (8, 4.0, 0.4, -1, ["STEG Facture", "SONEDE Facture", "Ooredoo", "Orange Tunisie", "Topnet"]),
+    "Transfer": (10, 4.5, 1.0, 0, ["Virement"]),
+    "Income": (6, 7.3, 0.3, 1, ["Salaire", "Prime", "Remboursement CNAM"]),
+    "Housing": (5, 6.2, 0.3, -1, ["Loyer", "Syndic"]),
+    "Health": (4, 3.8, 0.8, -1, ["Pharmacie", "Clinique", "Laboratoire"]),
+}
+
+# category: (price mu, sigma, kinds, brands, sizes)
+PRODUCT_CATEGORIES = {
+    "Épicerie": (1.3, 0.7, ["Harissa", "Thon", "Couscous", "Pâtes", "Huile d'Olive", "Café", "Thé Vert", "Tomates Concentrées"],
+                 ["Sicam", "El Manar", "Diari", "Fellah", "Bondin", "Randa", "Warda"], ["250g", "500g", "1kg", "1L"]),
+    "Produits Laitiers": (0.8, 0.6, ["Lait", "Yaourt", "Fromage", "Beurre", "Lben"],
+                          ["Délice", "Natilait", "Vitalait", "Président", "Jaouda"], ["1L", "125g", "16p", "200g"]),
+    "Fruits": (1.8, 0.5, ["Dattes", "Oranges", "Pommes", "Raisins", "Figues"],
+               ["Deglet Nour", "Maltaise", "Bio", "Cap Bon"], ["500g", "1kg", "2kg"]),
+    "Légumes": (1.2, 0.5, ["Ail", "Piment", "Tomates", "Oignons", "Pommes de terre"],
+                ["Local", "Bio", "Sahel"], ["500g", "1kg", "3kg"]),
+    "Boissons": (0.9, 0.5, ["Boga Cidre", "Eau Minérale", "Jus d'Orange", "Soda"],
+                 ["Boga", "Safia", "Sabrine", "Délice"], ["33cl", "1L", "1.5L"]),
+    "Épices": (1.1, 0.4, ["Cumin", "Tabel & Karouia", "Paprika", "Curcuma"],
+               ["Sidi Bou", "Epices du Sud", "Le Moulin"], ["50g", "100g", "250g"]),
+    "Artisanat": (3.8, 0.7, ["Service à Thé", "Fouta", "Cage", "Tapis Margoum", "Poterie"],
+                  ["Nabeul", "Sidi Bou Said", "Kairouan", "Djerba"], ["S", "M", "L"]),
+    "Électronique": (6.0, 1.0, ["Smartphone", "Smart TV", "Écouteurs", "Tablette", "Chargeur"],
+                     ["Samsung", "Xiaomi", "Oppo", "Infinix", "Tecno"], ["64Go", "128Go", "43 pouces", "Bluetooth"]),
+    "Vêtements": (3.5, 0.8, ["Chéchia", "Jebba", "T-shirt", "Jean", "Sandales"],
+                  ["Medina", "Sousse Textile", "Artisan"], ["S", "M", "L", "XL"]),
+}
+
+
+def _batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkLoader:
+    """Inserts tuples into one table per call: COPY on psycopg2, executemany otherwise."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+        self.placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+
+    def load(self, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int) -> int:
+        names = ", ".join(columns)
+        sql = f"INSERT INTO {table} ({names}) VALUES ({', '.join([self.placeholder] * len(columns))})"
+        count = 0
+        for batch in _batches(rows, batch_size):
+            raw = self.engine.raw_connection()
+            try:
+                cursor = raw.cursor()
+                if self.use_copy:
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+                else:
+                    cursor.executemany(sql, batch)
+                raw.commit()
+            finally:
+                raw.close()
+            count += len(batch)
+        return count
+
+
+def _datetime_writer(engine) -> Callable[[datetime], object]:
+    """SQLite stores DateTime as text: write it the way SQLAlchemy does, so keyset comparisons stay exact."""
+    if engine.dialect.name == "sqlite":
+        return lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return lambda value: value
+
+
+def _users(rng: random.Random, first_id: int, count: int) -> Iterator[tuple]:
+    for user_id in range(first_id, first_id + count):
+        yield (user_id, f"user{user_id}", f"user{user_id}@example.com",
+               f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+
+
+def _accounts(rng: random.Random, first_user_id: int, first_account_id: int, count: int,
+              savings_share: float) -> Tuple[List[tuple], List[int]]:
+    """Account rows, and the ids of the checking accounts (which carry the transactions)."""
+    rows, checking = [], []
+    account_id = first_account_id
+    for user_id in range(first_user_id, first_user_id + count):
+        rows.append((account_id, round(rng.lognormvariate(7.0, 1.0), 3), "checking", user_id))
+        checking.append(account_id)
+        account_id += 1
+        if rng.random() < savings_share:
+            rows.append((account_id, round(rng.lognormvariate(8.5, 1.2), 3), "savings", user_id))
+            account_id += 1
+    return rows, checking
+
+
+def _products(rng: random.Random, first_id: int, count: int) -> Iterator[tuple]:
+    categories = list(PRODUCT_CATEGORIES)
+    for product_id in range(first_id, first_id + count):
+        category = rng.choice(categories)
+        mu, sigma, kinds, brands, sizes = PRODUCT_CATEGORIES[category]
+        kind, brand = rng.choice(kinds), rng.choice(brands)
+        # The id keeps names unique (products.name is a unique index)
+        name = f"{kind} {brand} ({rng.choice(sizes)}) #{product_id}"
+        yield (product_id, name, round(rng.lognormvariate(mu, sigma), 3), rng.randint(0, 500), category,
+               f"{kind} {brand}, {category.lower()}")
+
+
+def _carts(rng: random.Random, first_user_id: int, users: int, first_product_id: int, products: int,
+           cart_share: float) -> Iterator[tuple]:
+    for user_id in range(first_user_id, first_user_id + users):
+        if rng.random() >= cart_share:
+            continue
+        for product_id in rng.sample(range(first_product_id, first_product_id + products), min(products, rng.randint(1, 8))):
+            yield (user_id, product_id, rng.randint(1, 4))
+
+
+def _transactions(rng: random.Random, checking: List[int], count: int, months: int,
+                  write_datetime: Callable[[datetime], object]) -> Iterator[tuple]:
+    categories = list(TRANSACTION_CATEGORIES)
+    category_weights = list(accumulate(TRANSACTION_CATEGORIES[c][0] for c in categories))
+    # Pareto activity: a few accounts carry most of the history, like real customers
+    account_weights = list(accumulate(rng.paretovariate(2.5) for _ in checking))
+    end = datetime.utcnow()
+    span = int(timedelta(days=30 * months).total_seconds())
+    start = end - timedelta(seconds=span)
+
+    for offset in range(0, count, 10000):
+        chunk = min(10000, count - offset)
+        accounts = rng.choices(checking, cum_weights=account_weights, k=chunk)
+        kinds = rng.choices(categories, cum_weights=category_weights, k=chunk)
+        for account_id, category in zip(accounts, kinds):
+            _, mu, sigma, sign, merchants = TRANSACTION_CATEGORIES[category]
+            when = start + timedelta(seconds=rng.randrange(span), microseconds=rng.randrange(1000000))
+            if category == "Income":
+                when = when.replace(day=rng.randint(1, 5))
+            amount = round(rng.lognormvariate(mu, sigma), 3)
+            if sign < 0 or (sign == 0 and rng.random() < 0.6):
+                amount = -amount
+            yield (amount, rng.choice(merchants), category, write_datetime(when), account_id)
+
+
+def _next_id(db, column) -> int:
+    return (db.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset")
+    parser.add_argument("--database-url", default=SQLALCHEMY_DATABASE_URL, help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=10000000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--months", type=int, default=24, help="History length")
+    parser.add_argument("--savings-share", type=float, default=0.4, help="Share of users with a savings account")
+    parser.add_argument("--cart-share", type=float, default=0.2, help="Share of users with items in their cart")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per executemany/COPY")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-rollups", action="store_true", help="Do not rebuild the spending rollups")
+    args = parser.parse_args()
+
+    # Durability is pointless for a generated dataset: skip fsyncs during the load
+    engine = create_database_engine(args.database_url, pragmas={**SQLITE_PRAGMAS, "synchronous": "OFF"})
+    if args.reset:
+        drop_product_fts(engine)
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    # Secondary indexes are built once after the load instead of updated row by row
+    loaded_tables = [User.__table__, Account.__table__, Product.__table__, ShoppingList.__table__, Transaction.__table__]
+    indexes = [index for table in loaded_tables for index in table.indexes]
+    for index in indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+    rng = random.Random(args.seed)
+    loader = BulkLoader(engine)
+    with Session() as db:
+        first_user = _next_id(db, User.id)
+        first_account = _next_id(db, Account.id)
+        first_product = _next_id(db, Product.id)
+
+    def step(label: str, fn: Callable[[], int]):
+        start = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - start
+        print(f"✅ {label}: {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+    accounts, checking = _accounts(rng, first_user, first_account, args.users, args.savings_share)
+    step("users", lambda: loader.load("users", ("id", "username", "email", "full_name"),
+                                      _users(rng, first_user, args.users), args.batch_size))
+    step("accounts", lambda: loader.load("accounts", ("id", "balance", "account_type", "user_id"),
+                                         accounts, args.batch_size))
+    step("products", lambda: loader.load("products", ("id", "name", "price", "stock", "category", "description"),
+                                         _products(rng, first_product, args.products), args.batch_size))
+    step("shopping_list", lambda: loader.load(
+        "shopping_list", ("user_id", "product_id", "quantity"),
+        _carts(rng, first_user, args.users, first_product, args.products, args.cart_share), args.batch_size))
+    if checking:
+        step("transactions", lambda: loader.load(
+            "transactions", ("amount", "description", "category", "date", "account_id"),
+            _transactions(rng, checking, args.transactions, args.months, _datetime_writer(engine)), args.batch_size))
+
+    start = time.perf_counter()
+    for index in indexes:
+        index.create(bind=engine, checkfirst=True)
+    print(f"✅ {len(indexes)} indexes built in {time.perf_counter() - start:.1f}s")
+
+    if engine.dialect.name == "postgresql":
+        # Explicit ids were inserted: move the serial sequences past them
+        with engine.begin() as conn:
+            for table in ("users", "accounts", "products"):
+                conn.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                     f"(SELECT COALESCE(MAX(id), 1) FROM {table}))")
+
+    if not args.skip_rollups:
+        start = time.perf_counter()
+        with Session() as db:
+            written = rebuild_spending_rollups(db)
+        print(f"✅ spending rollups: {written} rows in {time.perf_counter() - start:.1f}s")
+    if engine.dialect.name == "sqlite":
+        ensure_product_fts(engine)
+    # Planner statistics for the new volumes
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
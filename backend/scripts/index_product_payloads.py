@@ -0,0 +1,29 @@
+"""
+Prepare an existing Qdrant product collection for filtered search.
+
+Stores the numeric price (price_value) on points ingested with only the
+"12,500 DT" string, then creates the payload indexes on category_folder,
+brand and price_value so filters are resolved inside the HNSW search.
+
+Usage (from backend/):
+    python -m scripts.index_product_payloads
+"""
+
+import argparse
+
+from app.services.vector_search_service import get_vector_search_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill price_value and create Qdrant payload indexes")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per scroll request")
+    args = parser.parse_args()
+
+    service = get_vector_search_service()
+    updated = service.backfill_price_values(batch_size=args.batch_size)
+    print(f"✅ price_value set on {updated} points")
+    service.ensure_payload_indexes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Bulk, resumable ingestion of a product image folder into Qdrant.
+
+Expected layout (the one served by /api/store/vector/image/...):
+
+    {root}/{category_folder}/images/{image_file}
+    {root}/{category_folder}/products.json   # optional metadata
+    {root}/{category_folder}/products.csv    # (either one)
+
+Metadata rows have product_id, name, brand, price and image_file; images
+without a row are ingested with a name derived from the file name.
+
+Pipeline: images are decoded and downscaled in a process pool (the next batch
+is decoded while the current one is embedded), embedded with SigLIP in large
+batches, and upserted to Qdrant in chunks from a thread pool. Each upserted
+chunk is appended to a checkpoint file, so a crashed run resumes where it
+stopped.
+
+Usage (from backend/):
+    python -m scripts.ingest_products --root data
+    python -m scripts.ingest_products --root data --restart   # ignore the checkpoint
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.services.vector_search_service import (
+    PRICE_VALUE_FIELD,
+    QDRANT_COLLECTION_NAME,
+    get_vector_search_service,
+)
+from app.utils.prices import parse_price
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Stable point IDs: re-ingesting a product overwrites its point instead of duplicating it
+POINT_NAMESPACE = uuid.UUID("6f1c1d4e-3b7a-4f0e-9a51-2a8d2f6c9b10")
+
+_checkpoint_lock = threading.Lock()
+
+
+def _read_metadata(category_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Metadata rows of a category folder, keyed by image_file."""
+    rows: List[Dict[str, Any]] = []
+    json_path = os.path.join(category_dir, "products.json")
+    csv_path = os.path.join(category_dir, "products.csv")
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    elif os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    return {row["image_file"]: row for row in rows if row.get("image_file")}
+
+
+def discover_products(root: str) -> List[Dict[str, Any]]:
+    """Walk {root}/{category_folder}/images/ and build one payload per image."""
+    products = []
+    for category_folder in sorted(os.listdir(root)):
+        images_dir = os.path.join(root, category_folder, "images")
+        if not os.path.isdir(images_dir):
+            continue
+        metadata = _read_metadata(os.path.join(root, category_folder))
+        for image_file in sorted(os.listdir(images_dir)):
+            if os.path.splitext(image_file)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            row = metadata.get(image_file, {})
+            name = row.get("name") or os.path.splitext(image_file)[0].replace("_", " ").strip()
+            product_id = str(row.get("product_id") or f"{category_folder}/{image_file}")
+            payload = {
+                "product_id": product_id,
+                "name": name,
+                "brand": row.get("brand"),
+                "price": row.get("price"),
+                "image_file": image_file,
+                "category_folder": category_folder,
+            }
+            # No price_value for an unknown price: 0.0 would match every max_price filter
+            price_value = parse_price(row.get("price"), default=None)
+            if price_value is not None:
+                payload[PRICE_VALUE_FIELD] = price_value
+            products.append({"path": os.path.join(images_dir, image_file), "payload": payload})
+    return products
+
+
+def decode_image(path: str, size: int):
+    """
+    Decode and downscale one image (runs in a worker process).
+    JPEG draft mode lets libjpeg decode at reduced scale instead of full resolution.
+    """
+    from PIL import Image
+
+    try:
+        image = Image.open(path)
+        image.draft("RGB", (size, size))
+        image = image.convert("RGB")
+        image.thumbnail((size, size))
+        return image
+    except Exception as e:
+        print(f"⚠️ Cannot decode {path}: {e}")
+        return None
+
+
+def _load_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _upsert_chunk(client, points, product_ids: List[str], checkpoint_path: str):
+    client.upsert(collection_name=QDRANT_COLLECTION_NAME, points=points, wait=True)
+    # Append-only resume log: a torn last line only means that chunk is re-ingested
+    with _checkpoint_lock, open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write("".join(f"{product_id}\n" for product_id in product_ids))
+
+
+def ingest(root: str, checkpoint_path: str, batch_size: int, upsert_chunk_size: int,
+           decode_workers: Optional[int], upsert_workers: int, image_size: int, restart: bool):
+    from qdrant_client import models
+
+    service = get_vector_search_service()
+    client = service.get_client()
+
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = _load_checkpoint(checkpoint_path)
+
+    products = [p for p in discover_products(root) if p["payload"]["product_id"] not in done]
+    print(f"{len(products)} products to ingest ({len(done)} already done per {checkpoint_path})")
+    if not products:
+        return
+
+    start = time.perf_counter()
+    ingested = 0
+    collection_ready = False
+    pending = []
+
+    with ProcessPoolExecutor(max_workers=decode_workers) as decoders, \
+            ThreadPoolExecutor(max_workers=upsert_workers) as uploaders:
+        batches = list(_chunks(products, batch_size))
+        next_images = decoders.map(decode_image, [p["path"] for p in batches[0]], [image_size] * len(batches[0]))
+
+        for index, batch in enumerate(batches):
+            images = list(next_images)
+            if index + 1 < len(batches):
+                # Prefetch: decode the next batch while this one is embedded
+                following = batches[index + 1]
+                next_images = decoders.map(decode_image, [p["path"] for p in following], [image_size] * len(following))
+
+            decoded = [(product, image) for product, image in zip(batch, images) if image is not None]
+            if not decoded:
+                continue
+            vectors = service.embed_images([image for _, image in decoded])
+
+            if not collection_ready:
+                service.ensure_collection(len(vectors[0]))
+                service.ensure_payload_indexes()
+                collection_ready = True
+
+            points = [
+                models.PointStruct(
+                    id=str(uuid.uuid5(POINT_NAMESPACE, product["payload"]["product_id"])),
+                    vector=vector,
+                    payload=product["payload"],
+                )
+                for (product, _), vector in zip(decoded, vectors)
+            ]
+            for chunk in _chunks(points, upsert_chunk_size):
+                product_ids = [point.payload["product_id"] for point in chunk]
+                pending.append(uploaders.submit(_upsert_chunk, client, chunk, product_ids, checkpoint_path))
+
+            # Backpressure: surface upsert errors early and keep queued points bounded
+            finished, still_pending = wait(pending, timeout=0)
+            while len(still_pending) > upsert_workers * 2:
+                more, still_pending = wait(still_pending, return_when=FIRST_COMPLETED)
+                finished |= more
+            for future in finished:
+                future.result()
+            pending = list(still_pending)
+
+            ingested += len(decoded)
+            elapsed = time.perf_counter() - start
+            print(f"  {ingested}/{len(products)} embedded - {ingested / elapsed:.1f} items/s")
+
+        for future in pending:
+            future.result()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Ingested {ingested} products in {elapsed:.1f}s ({ingested / elapsed:.1f} items/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a product image folder into Qdrant")
+    parser.add_argument("--root", default="data", help="Folder containing {category_folder}/images/")
+    parser.add_argument("--checkpoint", default=None, help="Resume log (default: {root}/.ingest_checkpoint)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Images per SigLIP forward pass")
+    parser.add_argument("--upsert-chunk-size", type=int, default=256, help="Points per Qdrant upsert request")
+    parser.add_argument("--decode-workers", type=int, default=None, help="Decoder processes (default: CPU count)")
+    parser.add_argument("--upsert-workers", type=int, default=4, help="Parallel upsert requests")
+    parser.add_argument("--image-size", type=int, default=384, help="Model input resolution")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and ingest everything")
+    args = parser.parse_args()
+
+    ingest(
+        root=args.root,
+        checkpoint_path=args.checkpoint or os.path.join(args.root, ".ingest_checkpoint"),
+        batch_size=args.batch_size,
+        upsert_chunk_size=args.upsert_chunk_size,
+        decode_workers=args.decode_workers,
+        upsert_workers=args.upsert_workers,
+        image_size=args.image_size,
+        restart=args.restart,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Migrate the products collection to quantized vector storage.
+
+Scalar quantization keeps an int8 copy of every vector in RAM (4x smaller),
+binary quantization a 1 bit/dimension copy (32x smaller); with --on-disk the
+original float32 vectors move to disk and are only read to rescore the
+oversampled candidates.
+
+Prints a before/after report: estimated memory footprint, and recall@k and
+latency of the default (rescored) search against a full-precision exact
+search of the same collection.
+
+Usage (from backend/):
+    python -m scripts.migrate_collection --report-only
+    python -m scripts.migrate_collection --quantization scalar --on-disk
+    python -m scripts.migrate_collection --quantization binary --target products_binary
+"""
+
+import argparse
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.vector_search_service import (
+    QDRANT_RESCORE_OVERSAMPLING,
+    QUANTIZATION_OPTIONS,
+    VectorSearchService,
+    build_search_params,
+    get_vector_search_service,
+)
+from benchmarks.ann_eval import evaluate, make_queries
+
+
+def estimate_memory(points: int, dim: int, quantization: str, on_disk: bool, hnsw_m: int = 16) -> Dict[str, int]:
+    """Approximate vector storage in bytes (payloads excluded)."""
+    originals = points * dim * 4
+    quantized = {"none": 0, "scalar": points * dim, "binary": points * ((dim + 7) // 8)}[quantization]
+    graph = points * hnsw_m * 2 * 4  # Layer-0 links dominate the HNSW index
+    return {
+        "ram_bytes": quantized + graph + (0 if on_disk else originals),
+        "disk_bytes": originals if on_disk else 0,
+    }
+
+
+def _sample_vectors(service: VectorSearchService, count: int) -> np.ndarray:
+    records, _ = service.get_client().scroll(
+        collection_name=service.collection_name,
+        limit=count,
+        with_payload=False,
+        with_vectors=True,
+    )
+    return np.asarray([record.vector for record in records], dtype=np.float32)
+
+
+def _wait_until_green(service: VectorSearchService, timeout: float = 600):
+    """Quantized segments are rebuilt in the background after update_collection."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = service.get_collection_info().get("status")
+        if status in ("green", "GREEN"):
+            return
+        time.sleep(2)
+    print(f"⚠️ Collection still optimizing after {timeout:.0f}s, quality figures may be partial")
+
+
+def report(service: VectorSearchService, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    """Memory estimate and search quality of one collection."""
+    from qdrant_client import models
+
+    config = service.get_vector_config()
+    memory = estimate_memory(config["points_count"], config["size"], config["quantization"], config["on_disk"])
+    print(f"\n{service.collection_name}: {config['points_count']} points, dim={config['size']}, "
+          f"quantization={config['quantization']}, on_disk={config['on_disk']}")
+    print(f"  estimated RAM {memory['ram_bytes'] / 2**20:.1f} MiB, disk {memory['disk_bytes'] / 2**20:.1f} MiB")
+
+    # Ground truth: brute force on the original vectors, bypassing the quantized copy
+    exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+    truth = [
+        [hit["product_id"] for hit in service.search_by_vector(query.tolist(), k, search_params=exact)]
+        for query in queries
+    ]
+
+    def searcher(params):
+        return lambda query, limit: [hit["product_id"] for hit in service.search_by_vector(query.tolist(), limit, search_params=params)]
+
+    rows = [evaluate("default", searcher(build_search_params(config["quantization"])), queries, truth, k)]
+    if config["quantization"] != "none":
+        no_rescore = models.SearchParams(quantization=models.QuantizationSearchParams(rescore=False))
+        rows.append(evaluate("quantized, no rescore", searcher(no_rescore), queries, truth, k))
+    return {**config, **memory, "quality": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the Qdrant products collection and report the impact")
+    parser.add_argument("--quantization", choices=QUANTIZATION_OPTIONS, default="scalar")
+    parser.add_argument("--on-disk", action="store_true", help="Move the original vectors to disk")
+    parser.add_argument("--target", default=None, help="Copy into this new collection instead of updating in place")
+    parser.add_argument("--report-only", action="store_true", help="Only report on the current collection")
+    parser.add_argument("--queries", type=int, default=100, help="Queries for the quality report")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for recall")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per request when copying")
+    args = parser.parse_args()
+
+    service = get_vector_search_service()
+    sample = _sample_vectors(service, args.queries)
+    if not len(sample):
+        print("Collection is empty, nothing to migrate")
+        return
+    queries = make_queries(sample, args.queries)
+
+    before = report(service, queries, args.k)
+    if args.report_only:
+        return
+
+    print(f"\nMigrating (quantization={args.quantization}, on_disk={args.on_disk}, "
+          f"rescore oversampling={QDRANT_RESCORE_OVERSAMPLING})...")
+    target = service.migrate_collection(args.quantization, args.on_disk, args.target, args.batch_size)
+    migrated: Optional[VectorSearchService] = service
+    if target != service.collection_name:
+        migrated = VectorSearchService(client=service.get_client(), collection_name=target, snapshot_path="")
+    _wait_until_green(migrated)
+    after = report(migrated, queries, args.k)
+
+    saved = before["ram_bytes"] - after["ram_bytes"]
+    print(f"\n✅ RAM {before['ram_bytes'] / 2**20:.1f} -> {after['ram_bytes'] / 2**20:.1f} MiB "
+          f"({saved / max(before['ram_bytes'], 1):.0%} saved), recall@{args.k} "
+          f"{before['quality'][0]['recall']:.4f} -> {after['quality'][0]['recall']:.4f}")
+    if args.target:
+        print(f"Point QDRANT_COLLECTION_NAME at {target} and set QDRANT_QUANTIZATION={args.quantization} to switch over")
+
+
+if __name__ == "__main__":
+    main()
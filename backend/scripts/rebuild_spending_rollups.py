@@ -0,0 +1,55 @@
+"""
+Recompute the spending rollups from the transactions table.
+
+Rollups are maintained on every payment and transfer; run this after
+importing transactions directly into the database, or with --check to
+verify that the maintained rollups still match the history.
+
+Usage (from backend/):
+    python -m scripts.rebuild_spending_rollups
+    python -m scripts.rebuild_spending_rollups --account-id 1
+    python -m scripts.rebuild_spending_rollups --check
+"""
+
+import argparse
+import sys
+import time
+
+from app.database import SessionLocal
+from app.models import SpendingRollup
+from app.services.spending_rollups import rebuild_spending_rollups
+
+
+def _snapshot(db, account_id=None):
+    query = db.query(SpendingRollup)
+    if account_id is not None:
+        query = query.filter(SpendingRollup.account_id == account_id)
+    return {
+        (r.account_id, r.period, str(r.period_start), r.category): (round(r.spent, 6), round(r.received, 6), r.count)
+        for r in query
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild spending rollups from transactions")
+    parser.add_argument("--account-id", type=int, default=None, help="Only this account")
+    parser.add_argument("--check", action="store_true", help="Report rollups that differ from a rebuild (exit 1 if any)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        before = _snapshot(db, args.account_id) if args.check else None
+        start = time.perf_counter()
+        written = rebuild_spending_rollups(db, args.account_id)
+        print(f"✅ {written} rollup rows rebuilt in {time.perf_counter() - start:.2f}s")
+
+        if args.check:
+            after = _snapshot(db, args.account_id)
+            drift = sorted(key for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+            for key in drift[:20]:
+                print(f"  {key}: maintained {before.get(key)} != rebuilt {after.get(key)}")
+            print(f"{'❌' if drift else '✅'} {len(drift)} rollup rows had drifted")
+            sys.exit(1 if drift else 0)
+
+
+if __name__ == "__main__":
+    main()
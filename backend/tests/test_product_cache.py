@@ -0,0 +1,56 @@
+"""
+Product catalog cache: a Qdrant outage must not be cached as "no such product".
+"""
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_database_engine
+from app.models import Product
+from app.schema import ensure_schema
+from app.services.product_catalog_cache import get_product_catalog_cache, normalize_name
+from app.services.store_service import StoreService
+from app.services.vector_search_service import VectorSearchService
+
+
+class _UnreachableQdrant:
+    def query_points(self, **kwargs):
+        raise ConnectionError("qdrant unreachable")
+
+    def query_batch_points(self, **kwargs):
+        raise ConnectionError("qdrant unreachable")
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    ensure_schema(engine)
+    cache = get_product_catalog_cache()
+    cache.invalidate()
+    with sessionmaker(bind=engine)() as db:
+        db.add(Product(name="Harissa Sicam (400g)", price=3.8, stock=10, category="Épicerie", description=""))
+        db.commit()
+        service = StoreService(db)
+        service.vector_service = VectorSearchService(client=_UnreachableQdrant(), collection_name="products",
+                                                     snapshot_path="")
+        # No SigLIP here: any vector will do, the search itself fails
+        service.vector_service.embed_texts = lambda texts: [[1.0, 0.0]] * len(texts)
+        yield service, cache
+    cache.invalidate()
+    engine.dispose()
+
+
+def test_find_product_does_not_cache_a_failed_lookup(store):
+    service, cache = store
+    assert service.find_product("produit inconnu") is None
+    assert cache.get(("name", normalize_name("produit inconnu"))) == (False, None)
+
+
+def test_find_products_does_not_cache_failed_lookups(store):
+    service, cache = store
+    resolved = service.find_products(["Harissa Sicam (400g)", "produit inconnu"])
+    assert resolved["Harissa Sicam (400g)"].name == "Harissa Sicam (400g)"
+    assert resolved["produit inconnu"] is None
+    assert cache.get(("name", normalize_name("produit inconnu"))) == (False, None)
+    # Names SQL resolved are still cached
+    assert cache.get(("name", normalize_name("Harissa Sicam (400g)")))[0]
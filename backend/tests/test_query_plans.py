@@ -0,0 +1,85 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot queries on a small seeded SQLite database.
+
+The plan checks are the ones of benchmarks/query_plans.py (which also times the
+queries on a large database); here they run on every test run.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_database_engine
+from app.models import Account, Product, ShoppingList, Transaction, User
+from app.schema import ensure_schema
+from benchmarks.query_plans import HOT_QUERIES, _compile, _samples, _sqlite_plan, _sqlite_problems
+
+USERS = 20
+PRODUCTS = 30
+TRANSACTIONS_PER_ACCOUNT = 15
+
+
+def _seeded_engine(path):
+    """A database whose tables predate the indexes: created, then stripped of every index and seeded."""
+    engine = create_database_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind=engine)
+
+    start = datetime(2024, 1, 1)
+    with sessionmaker(bind=engine)() as db:
+        for i in range(PRODUCTS):
+            db.add(Product(name=f"Produit test {i}", price=1.0 + i, stock=100, category="Test", description=""))
+        for user_id in range(1, USERS + 1):
+            db.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", full_name=f"U{user_id}"))
+            checking = Account(user_id=user_id, balance=1000.0, account_type="checking")
+            db.add_all([checking, Account(user_id=user_id, balance=5000.0, account_type="savings")])
+            db.flush()
+            for t in range(TRANSACTIONS_PER_ACCOUNT):
+                db.add(Transaction(account_id=checking.id, amount=-(t + 1.0), description=f"Achat {t}",
+                                   category="Courses", date=start + timedelta(days=user_id + 3 * t)))
+            db.add(ShoppingList(user_id=user_id, product_id=user_id % PRODUCTS + 1, quantity=1))
+        db.commit()
+    return engine
+
+
+@pytest.fixture(scope="module")
+def upgraded(tmp_path_factory):
+    engine = _seeded_engine(tmp_path_factory.mktemp("plans") / "bank.db")
+    ensure_schema(engine)
+    with sessionmaker(bind=engine)() as db:
+        sample = _samples(db, 1, seed=7)[0]
+    yield engine, sample
+    engine.dispose()
+
+
+def _problems(engine, query, sample):
+    with engine.connect() as conn:
+        plan = _sqlite_plan(conn, _compile(query.build(sample), engine.dialect))
+    return plan, _sqlite_problems(plan, query)
+
+
+@pytest.mark.parametrize("query", HOT_QUERIES, ids=[query.name for query in HOT_QUERIES])
+def test_hot_query_uses_an_index(upgraded, query):
+    engine, sample = upgraded
+    if query.sqlite_only and "products_fts" not in inspect(engine).get_table_names():
+        pytest.skip("SQLite built without FTS5")
+    assert sample.cursor is not None
+    plan, problems = _problems(engine, query, sample)
+    assert not problems, "\n".join(plan)
+
+
+def test_check_flags_a_database_without_the_indexes(tmp_path):
+    engine = _seeded_engine(tmp_path / "bank.db")
+    with sessionmaker(bind=engine)() as db:
+        sample = _samples(db, 1, seed=7)[0]
+    by_name = {query.name: query for query in HOT_QUERIES}
+    try:
+        for name in ("account_by_user", "cart_lines", "transactions_first_page"):
+            _, problems = _problems(engine, by_name[name], sample)
+            assert problems, name
+    finally:
+        engine.dispose()
@@ -6,6 +6,8 @@ import {
     addToCart,
     getVectorProducts,
     searchVectorProducts,
+    getAutocompleteSuggestions,
+    AutocompleteSuggestion,
     searchProductsByImage,
     getVectorProductImageUrl,
     VectorProduct,
@@ -31,6 +33,7 @@ export default function StorePage() {
     const [loading, setLoading] = useState(true);
     const [searchQuery, setSearchQuery] = useState('');
     const [searching, setSearching] = useState(false);
+    const [suggestions, setSuggestions] = useState<AutocompleteSuggestion[]>([]);
 
     // Image Search State
     const [selectedImage, setSelectedImage] = useState<File | null>(null);
@@ -142,6 +145,19 @@ export default function StorePage() {
         return () => clearTimeout(timer);
     }, [searchQuery, handleSearch]);
 
+    // Type-ahead: the endpoint answers from memory, so no debounce, just cancel stale requests
+    useEffect(() => {
+        if (!searchQuery.trim()) {
+            setSuggestions([]);
+            return;
+        }
+        const controller = new AbortController();
+        getAutocompleteSuggestions(searchQuery, 8, controller.signal)
+            .then(setSuggestions)
+            .catch(() => {});
+        return () => controller.abort();
+    }, [searchQuery]);
+
     // Image Search Handlers
     const handleImageUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
         const file = e.target.files?.[0];
@@ -262,9 +278,17 @@ export default function StorePage() {
                         placeholder="🔍 Recherche IA... (ex: chocolat, pâtes, harissa)"
                         value={searchQuery}
                         onChange={(e) => setSearchQuery(e.target.value)}
+                        list="product-suggestions"
                         disabled={!!selectedImage}
                         className={`w-full bg-gray-800 border border-gray-700 rounded-xl pl-12 pr-4 py-3 text-white placeholder-gray-500 focus:border-purple-500 focus:outline-none transition-colors ${selectedImage ? 'opacity-50 cursor-not-allowed' : ''}`}
                     />
+                    <datalist id="product-suggestions">
+                        {suggestions.map((suggestion) => (
+                            <option key={suggestion.name} value={suggestion.name}>
+                                {suggestion.brand ?? suggestion.category ?? ''}
+                            </option>
+                        ))}
+                    </datalist>
                     {searching && (
                         <Loader2 className="absolute right-4 top-1/2 -translate-y-1/2 text-purple-400 animate-spin" size={20} />
                     )}
@@ -343,7 +367,7 @@ export default function StorePage() {
                                         <div className="aspect-square bg-gray-700 relative overflow-hidden">
                                             {product.image_file && product.category_folder ? (
                                                 <img
-                                                    src={getVectorProductImageUrl(product.category_folder, product.image_file) || ''}
+                                                    src={getVectorProductImageUrl(product.category_folder, product.image_file, 256) || ''}
                                                     alt={product.name || 'Product'}
                                                     className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                                                     onError={(e) => {
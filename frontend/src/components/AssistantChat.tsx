@@ -8,6 +8,14 @@ import { chatWithAssistant, transcribeAudio } from '@/lib/api';
 import { useAudioRecorder } from '@/hooks/useAudioRecorder';
 import { MessageCircle, X, Send, Mic, Sparkles, Bot, Minimize2, Maximize2, Loader2, StopCircle } from 'lucide-react';
 
+function newIdempotencyKey(): string {
+    if (typeof crypto.randomUUID === 'function') {
+        return crypto.randomUUID();
+    }
+    // randomUUID only exists in secure contexts (not on the http:// LAN address used on mobile)
+    return Array.from(crypto.getRandomValues(new Uint8Array(16)), b => b.toString(16).padStart(2, '0')).join('');
+}
+
 interface Message {
     id: string;
     text: string;
@@ -26,6 +34,8 @@ export default function AssistantChat() {
 
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const handleSendRef = useRef<() => Promise<void>>(() => Promise.resolve());
+    // Last message whose request failed: the server may have run it, so resending it reuses the key
+    const failedSendRef = useRef<{ text: string; key: string } | null>(null);
     const { speak, stop, isSpeaking, audioEnabled } = useAudio();
     const { user } = useUser();
     const { autoListenMode } = useAccessibility();
@@ -152,6 +162,19 @@ export default function AssistantChat() {
         return () => clearTimeout(timer);
     }, [autoListenMode, isRecording, stopRecording, speak]);
 
+    // One Idempotency-Key per user message. Only a retry of the message that just failed reuses it,
+    // so a transfer or checkout it may have triggered is not repeated; a deliberate repeat
+    // ("oui" to confirm a second transfer) after a successful send gets a new key
+    const idempotencyKeyFor = (text: string) => {
+        const failed = failedSendRef.current;
+        failedSendRef.current = null;
+        return failed && failed.text === text.trim() ? failed.key : newIdempotencyKey();
+    };
+
+    const markSendFailed = (text: string, key: string) => {
+        failedSendRef.current = { text: text.trim(), key };
+    };
+
     // Direct send function that doesn't depend on input state
     const sendMessageDirect = async (text: string) => {
         if (!text.trim() || isLoading || !user) return;
@@ -166,6 +189,7 @@ export default function AssistantChat() {
         setMessages(prev => [...prev, userMsg]);
         setInput(""); // Clear any input
         setIsLoading(true);
+        const idempotencyKey = idempotencyKeyFor(text);
 
         try {
             const history = messages.map(m => ({
@@ -173,7 +197,7 @@ export default function AssistantChat() {
                 content: m.text
             }));
 
-            const data = await chatWithAssistant(text, user.id, history);
+            const data = await chatWithAssistant(text, user.id, history, idempotencyKey);
             const assistantMsg: Message = {
                 id: (Date.now() + 1).toString(),
                 text: data.response,
@@ -188,6 +212,7 @@ export default function AssistantChat() {
             }
         } catch (error) {
             console.error(error);
+            markSendFailed(text, idempotencyKey);
             setMessages(prev => [...prev, {
                 id: Date.now().toString(),
                 text: "Désolé, une erreur est survenue.",
@@ -235,6 +260,7 @@ export default function AssistantChat() {
         setMessages(prev => [...prev, userMsg]);
         setInput("");
         setIsLoading(true);
+        const idempotencyKey = idempotencyKeyFor(userMsg.text);
 
         try {
             const userId = user.id;
@@ -245,7 +271,7 @@ export default function AssistantChat() {
                 content: m.text
             }));
 
-            const data = await chatWithAssistant(userMsg.text, userId, history);
+            const data = await chatWithAssistant(userMsg.text, userId, history, idempotencyKey);
             const assistantMsg: Message = {
                 id: (Date.now() + 1).toString(), // Ensure unique ID
                 text: data.response,
@@ -262,6 +288,7 @@ export default function AssistantChat() {
             }
         } catch (error) {
             console.error(error);
+            markSendFailed(userMsg.text, idempotencyKey);
             setMessages(prev => [...prev, {
                 id: Date.now().toString(),
                 text: "Désolé, une erreur est survenue. Veuillez réessayer.",
@@ -131,11 +131,15 @@ export interface ChatMessage {
     content: string;
 }
 
-export async function chatWithAssistant(message: string, userId: number, history: ChatMessage[] = []) {
+// Pass the same idempotencyKey when retrying a message: transfers/checkout it triggered are not repeated
+export async function chatWithAssistant(message: string, userId: number, history: ChatMessage[] = [], idempotencyKey?: string) {
     if (!userId) throw new Error("User ID is required");
     const res = await fetch(API.chat, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+            'Content-Type': 'application/json',
+            ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+        },
         body: JSON.stringify({
             message,
             user_id: userId,
@@ -227,6 +231,16 @@ export interface VectorProduct {
     score?: number;
 }
 
+export interface AutocompleteSuggestion {
+    name: string;
+    brand?: string;
+    category?: string;
+    price?: number;
+    product_id?: string;
+    image_file?: string;
+    category_folder?: string;
+}
+
 export interface VectorCollectionInfo {
     name: string;
     vectors_count?: number;
@@ -247,6 +261,12 @@ export async function searchVectorProducts(query: string, limit: number = 10): P
     return res.json();
 }
 
+export async function getAutocompleteSuggestions(query: string, limit: number = 8, signal?: AbortSignal): Promise<AutocompleteSuggestion[]> {
+    const res = await fetch(`${API.products.replace('/products', '/autocomplete')}?q=${encodeURIComponent(query)}&limit=${limit}`, { signal });
+    if (!res.ok) throw new Error("Autocomplete failed");
+    return res.json();
+}
+
 export async function searchProductsByImage(imageFile: File, limit: number = 10): Promise<VectorProduct[]> {
     const formData = new FormData();
     formData.append('file', imageFile);
@@ -266,8 +286,9 @@ export async function getVectorCollectionInfo(): Promise<VectorCollectionInfo> {
     return res.json();
 }
 
-export function getVectorProductImageUrl(category: string, filename: string): string {
-    return `${API.products.replace('/products', '/vector/image')}/${encodeURIComponent(category)}/${encodeURIComponent(filename)}`;
+export function getVectorProductImageUrl(category: string, filename: string, width?: 128 | 256 | 512): string {
+    const url = `${API.products.replace('/products', '/vector/image')}/${encodeURIComponent(category)}/${encodeURIComponent(filename)}`;
+    return width ? `${url}?w=${width}` : url;
 }
 
 export async function sendVoiceCommand(command: string, currentPage: string = "/") {